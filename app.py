@@ -1,25 +1,90 @@
-from flask import Flask, render_template, jsonify, request
-import yfinance as yf
-import pandas as pd
-import numpy as np
+from flask import Flask, Response, render_template, jsonify, request
 from datetime import datetime, timedelta
-import ta
 import os
+import time
+import hashlib
+import click
 from flask_sqlalchemy import SQLAlchemy
 import uuid
+import base64
+import json
+import cProfile
+import io
+import pstats
+from contextlib import contextmanager
+from sqlalchemy import inspect, text, tuple_
+from sqlalchemy.orm import defer
+from concurrent.futures import ThreadPoolExecutor
+from market_data import BarStore, epoch_seconds
+from downsampling import select_points
+from indicator_cache import IndicatorCache, dataset_fingerprint
+from indicator_store import IndicatorStore, IndicatorRefresher, DEFAULT_CATALOGUE
+from jobs import JobQueue
+from result_cache import ResultCache, strategy_key
+from instrumentation import StageHistograms, StageTimer
+from lazy_imports import lazy_import, load_now
 from backtest import (
     calculate_indicators,
     evaluate_condition,
     evaluate_logic,
     generate_signals,
     calculate_risk_metrics,
-    calculate_metrics
+    calculate_metrics,
+    run_parameter_sweep,
+    run_walk_forward,
+    monte_carlo_trades,
+    MAX_MONTE_CARLO_TRADES,
+    backtest_strategies,
+    date_format,
+    MAX_SWEEP_COMBINATIONS,
+    TRADING_DAYS_MULTIPLIER
 )
 
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, init_db is still idempotent
+    fcntl = None
+
+# Heavy libraries load on first use; a preloading master loads them up front via warm_up()
+np = lazy_import('numpy')
+HEAVY_MODULES = ('numpy', 'pandas', 'ta', 'yfinance')
+
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///strategies.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///strategies.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
+# Histories are memory-mapped from MARKET_DATA_MMAP_DIR (set it empty to keep
+# them in process memory) and, as float64, served to every worker in place
+bar_store = BarStore(
+    os.environ.get('MARKET_DATA_DB', os.path.join(app.instance_path, 'market_data.db')),
+    memmap_dir=os.environ.get('MARKET_DATA_MMAP_DIR', os.path.join(app.instance_path, 'bars')) or None,
+    price_dtype=os.environ.get('MARKET_DATA_PRICE_DTYPE', 'float64')
+)
+indicator_cache = IndicatorCache(max_bytes=int(os.environ.get('INDICATOR_CACHE_BYTES', 256 * 1024 * 1024)))
+# Catalogue indicators are precomputed over each stored history in
+# INDICATOR_STORE_DIR (set it empty to disable) and kept current in the background
+INDICATOR_STORE_DIR = os.environ.get('INDICATOR_STORE_DIR', os.path.join(app.instance_path, 'indicators'))
+indicator_store = IndicatorStore(
+    INDICATOR_STORE_DIR, bar_store.history,
+    catalogue=json.loads(os.environ['INDICATOR_CATALOGUE']) if os.environ.get('INDICATOR_CATALOGUE') else DEFAULT_CATALOGUE
+) if INDICATOR_STORE_DIR else None
+indicator_refresher = IndicatorRefresher(
+    indicator_store, bar_store.keys,
+    interval_seconds=int(os.environ.get('INDICATOR_REFRESH_SECONDS', 60)),
+    logger=app.logger
+) if indicator_store else None
+result_cache = ResultCache(
+    os.environ.get('RESULT_CACHE_DB', os.path.join(app.instance_path, 'result_cache.db')),
+    max_entries=int(os.environ.get('RESULT_CACHE_ENTRIES', 1000))
+)
+# Shared by every worker; an empty METRICS_DB keeps per-process counts
+stage_histograms = StageHistograms(
+    path=os.environ.get('METRICS_DB', os.path.join(app.instance_path, 'metrics.db')) or None
+)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+# ?profile=1 is refused unless enabled; only the newest PROFILE_MAX_FILES dumps are kept
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 20))
 
 class Strategy(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -27,7 +92,14 @@ class Strategy(db.Model):
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     config = db.Column(db.JSON, nullable=False)
-    trades = db.Column(db.JSON)
+    
+    # Trades live in their own table and are only loaded by get_strategy
+    trade_rows = db.relationship(
+        'StrategyTrade',
+        lazy='dynamic',
+        cascade='all, delete-orphan',
+        order_by='StrategyTrade.seq'
+    )
     
     # Performance metrics
     total_return = db.Column(db.Float)
@@ -38,18 +110,213 @@ class Strategy(db.Model):
     total_trades = db.Column(db.Integer)
     time_in_market = db.Column(db.Float)
 
+    # Set when the server last computed the metrics: a hash of the config and
+    # the dataset they were computed on, so unchanged strategies are skipped
+    scored_key = db.Column(db.String(64))
+    scored_at = db.Column(db.DateTime)
+
+    # (metric, id) indexes back the keyset-paginated leaderboard
+    __table_args__ = tuple(
+        db.Index(f'ix_strategy_{metric}_id', metric, 'id')
+        for metric in ('total_return', 'sharpe_ratio', 'win_rate', 'risk_adjusted_return',
+                       'max_drawdown', 'total_trades', 'time_in_market')
+    )
+
+class StrategyTrade(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    strategy_id = db.Column(db.String(36), db.ForeignKey('strategy.id'), nullable=False, index=True)
+    seq = db.Column(db.Integer, nullable=False)
+    entry_date = db.Column(db.String(19))
+    entry_price = db.Column(db.Float)
+    exit_date = db.Column(db.String(19))
+    exit_price = db.Column(db.Float)
+    return_pct = db.Column(db.Float)
+
+def strategy_trades(strategy_id):
+    """Load a strategy's trades in order, in the shape the frontend expects."""
+    rows = db.session.query(
+        StrategyTrade.entry_date,
+        StrategyTrade.entry_price,
+        StrategyTrade.exit_date,
+        StrategyTrade.exit_price,
+        StrategyTrade.return_pct
+    ).filter(StrategyTrade.strategy_id == strategy_id).order_by(StrategyTrade.seq).all()
+    return [
+        {
+            'entry_date': entry_date,
+            'entry_price': entry_price,
+            'exit_date': exit_date,
+            'exit_price': exit_price,
+            'return': return_pct
+        }
+        for entry_date, entry_price, exit_date, exit_price, return_pct in rows
+    ]
+
+class BacktestJob(db.Model):
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    request_hash = db.Column(db.String(64), nullable=False, index=True)
+    request = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='queued', index=True)
+    stage = db.Column(db.String(32))
+    bars_processed = db.Column(db.Integer, default=0)
+    total_bars = db.Column(db.Integer)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # host:pid of the process running the job, refreshed through heartbeat_at
+    owner = db.Column(db.String(128))
+    heartbeat_at = db.Column(db.DateTime)
+
+def _migrate_legacy_trades(conn):
+    """Move trades stored as JSON on strategy rows into the strategy_trade table."""
+    if 'trades' not in [column['name'] for column in inspect(conn).get_columns('strategy')]:
+        return
+    rows = conn.execute(text("SELECT id, trades FROM strategy WHERE trades IS NOT NULL")).fetchall()
+    for strategy_id, trades in rows:
+        trades = json.loads(trades) if isinstance(trades, str) else trades
+        if trades:
+            conn.execute(StrategyTrade.__table__.insert(), [
+                {
+                    'strategy_id': strategy_id,
+                    'seq': seq,
+                    'entry_date': trade.get('entry_date'),
+                    'entry_price': trade.get('entry_price'),
+                    'exit_date': trade.get('exit_date'),
+                    'exit_price': trade.get('exit_price'),
+                    'return_pct': trade.get('return')
+                }
+                for seq, trade in enumerate(trades)
+            ])
+    conn.execute(text("UPDATE strategy SET trades = NULL"))
+
+def _add_strategy_scoring_columns(conn):
+    """Add the columns recording when a strategy was last scored by the server."""
+    columns = [column['name'] for column in inspect(conn).get_columns('strategy')]
+    if 'scored_key' not in columns:
+        conn.execute(text("ALTER TABLE strategy ADD COLUMN scored_key VARCHAR(64)"))
+    if 'scored_at' not in columns:
+        conn.execute(text("ALTER TABLE strategy ADD COLUMN scored_at DATETIME"))
+
+def _add_job_owner_columns(conn):
+    """Add the columns that tie a running job to the live process running it."""
+    columns = [column['name'] for column in inspect(conn).get_columns('backtest_job')]
+    if 'owner' not in columns:
+        conn.execute(text("ALTER TABLE backtest_job ADD COLUMN owner VARCHAR(128)"))
+    if 'heartbeat_at' not in columns:
+        conn.execute(text("ALTER TABLE backtest_job ADD COLUMN heartbeat_at DATETIME"))
+
+# Applied in order, each exactly once per database
+MIGRATIONS = [
+    (1, _migrate_legacy_trades),
+    (2, _add_strategy_scoring_columns),
+    (3, _add_job_owner_columns),
+]
+
+@contextmanager
+def _init_lock():
+    """Serialize schema setup across worker processes that boot at the same time."""
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, '.init_db.lock'), 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
 def init_db():
-    with app.app_context():
-        # Drop all tables
-        db.drop_all()
-        
-        # Create all tables
+    """Create missing tables and indexes and apply pending migrations.
+
+    Safe to run on every boot and from several processes at once; existing
+    data is never dropped.
+    """
+    with app.app_context(), _init_lock():
         db.create_all()
-        
-        app.logger.info("Database initialized successfully")
+        with db.engine.begin() as conn:
+            # create_all skips indexes added to tables that already exist
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, applied_at DATETIME)"
+            ))
+            applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+            for version, migrate in MIGRATIONS:
+                if version not in applied:
+                    migrate(conn)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations VALUES (:version, :applied_at)"),
+                        {'version': version, 'applied_at': datetime.utcnow()}
+                    )
+                    app.logger.info(f"Applied database migration {version}: {migrate.__name__}")
+
+        # Don't hand pooled connections to forked workers
+        db.engine.dispose()
+
+if os.environ.get('SKIP_DB_INIT') != '1':
+    init_db()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create tables and apply migrations without starting the server."""
+    init_db()
+
+job_queue = JobQueue(
+    app, db, BacktestJob,
+    runner=lambda data, progress: run_job(data, progress),
+    max_workers=int(os.environ.get('BACKTEST_JOB_WORKERS', 2)),
+    heartbeat_seconds=int(os.environ.get('BACKTEST_JOB_HEARTBEAT_SECONDS', 15)),
+    stale_seconds=int(os.environ.get('BACKTEST_JOB_STALE_SECONDS', 60))
+)
 
-# Initialize database on startup
-init_db()
+def preload_bars(spec):
+    """Load 'SYMBOL:period:interval' entries (comma separated) into the bar store."""
+    loaded = []
+    for entry in filter(None, (item.strip() for item in spec.split(','))):
+        symbol, period, interval = entry.split(':')
+        try:
+            bar_store.get_bars(symbol.upper(), period, interval)
+            loaded.append(entry)
+        except Exception as e:
+            app.logger.error(f"Could not preload {entry}: {str(e)}")
+    return loaded
+
+def warm_up():
+    """Load the lazily imported libraries now, so forked workers share them copy-on-write.
+
+    Histories listed in PRELOAD_BARS are also written to the shared bar files
+    here, so every worker maps them instead of building its own.
+    """
+    loaded = load_now(*HEAVY_MODULES)
+    preload_bars(os.environ.get('PRELOAD_BARS', ''))
+    return loaded
+
+def start_worker():
+    """Per-process startup that must not run in a preloading master."""
+    # Pick up queued jobs and jobs whose worker stopped without finishing them
+    with app.app_context():
+        job_queue.resume_pending()
+    if indicator_refresher:
+        indicator_refresher.start()
+
+def stored_columns(symbol, interval, df, indicator):
+    """An indicator's columns for df from the indicator store, or None when it is behind."""
+    columns = indicator_store.columns(symbol, interval, df, indicator)
+    if columns is None and indicator_refresher:
+        # The store is behind these bars; compute them here and let the refresher catch up
+        indicator_refresher.wake()
+    return columns
+
+def attach_indicator(df, symbol, interval, indicator, fingerprint):
+    """Attach an indicator's columns to df: cached for this dataset, else stored, else computed.
+
+    Every path gives the values calculate_indicators computes over df alone.
+    The store is only asked for catalogue indicators on windows longer than
+    their warm-up, the only ones it can serve.
+    """
+    source = None
+    if indicator_store and indicator_store.serves(indicator, len(df)):
+        source = lambda frame, component: stored_columns(symbol, interval, frame, component)
+    return indicator_cache.calculate(df, indicator, fingerprint, source=source)
 
 @app.route('/')
 def index():
@@ -59,76 +326,412 @@ def index():
 def leaderboard():
     return render_template('leaderboard.html')
 
-@app.route('/api/backtest', methods=['POST'])
-def backtest():
+DEFAULT_SYMBOL = 'BTC-USD'
+MAX_SYMBOLS = int(os.environ.get('MAX_SYMBOLS', 20))
+SYMBOL_WORKERS = int(os.environ.get('SYMBOL_WORKERS', 8))
+SWEEP_WORKERS = int(os.environ.get('SWEEP_WORKERS', os.cpu_count() or 1))
+
+def parse_symbol(value):
+    """Normalize a single symbol parameter, falling back to DEFAULT_SYMBOL when blank."""
+    return str(value or '').strip().upper() or DEFAULT_SYMBOL
+
+def parse_workers(value):
+    """Parse a client's max_workers, capped at the SWEEP_WORKERS processes a request may use."""
+    if value is None:
+        return SWEEP_WORKERS
     try:
-        data = request.get_json()
-        app.logger.info(f"Received backtest request with data: {data}")
-        
-        # Get timeframe parameters from the request
-        timeframe = data.get('timeframe', {})
-        period = timeframe.get('period', '1y')
-        interval = timeframe.get('interval', '1d')
-        
-        app.logger.info(f"Using timeframe: period={period}, interval={interval}")
-        
-        # Download data
-        df = yf.download(
-            'BTC-USD',
-            period=period,
-            interval=interval,
-            progress=False
-        )
-        
-        if df.empty:
-            raise ValueError("No data available for the specified timeframe")
-        
-        app.logger.info(f"Downloaded {len(df)} data points")
-        
-        # Calculate indicators
+        workers = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid max_workers: {value!r}") from None
+    return max(1, min(workers, SWEEP_WORKERS))
+
+def parse_symbols(value):
+    """Normalize a symbols parameter given as a list or comma-separated string."""
+    if isinstance(value, str):
+        value = value.split(',')
+    symbols = list(dict.fromkeys(s.strip().upper() for s in value if s and s.strip()))
+    if not symbols:
+        raise ValueError("No symbols provided")
+    if len(symbols) > MAX_SYMBOLS:
+        raise ValueError(f"At most {MAX_SYMBOLS} symbols can be requested at once")
+    return symbols
+
+def run_backtest(data, progress=None, df=None, timer=None):
+    """Run a single-strategy backtest request and return the response payload.
+
+    ``progress`` is called with (bars_processed, total_bars, stage) as the
+    pipeline advances. ``df`` can be passed when the bars are already loaded.
+    Each stage is timed on ``timer`` and recorded in the /metrics histograms.
+    """
+    timer = timer or StageTimer(stage_histograms)
+
+    def report(bars_processed, total_bars, stage):
+        if progress:
+            progress(bars_processed, total_bars, stage)
+
+    # Get timeframe parameters from the request
+    timeframe = data.get('timeframe', {})
+    period = timeframe.get('period', '1y')
+    interval = timeframe.get('interval', '1d')
+    
+    symbol = parse_symbol(data.get('symbol'))
+    
+    app.logger.info(f"Using timeframe: period={period}, interval={interval}")
+    
+    # Load data from the local bar store
+    if df is None:
+        with timer.span('load_data'):
+            df = bar_store.get_bars(symbol, period, interval)
+    
+    if df.empty:
+        raise ValueError("No data available for the specified timeframe")
+    
+    app.logger.info(f"Loaded {len(df)} data points")
+    
+    # Identical strategy on an unchanged dataset returns the cached response
+    cache_key = strategy_key(data, symbol, period, interval)
+    last_bar = int(df.index[-1].timestamp())
+    with timer.span('cache_lookup'):
+        fingerprint = dataset_fingerprint(df)
+        cached = result_cache.get(cache_key, last_bar, fingerprint)
+    if cached is not None:
+        app.logger.info("Returning cached backtest result")
+        report(len(df), len(df), 'cached')
+        return cached
+    
+    report(0, len(df), 'indicators')
+    
+    # Attach indicators from the precomputed store, or cached columns for this dataset
+    with timer.span('indicators'):
         for indicator in data['indicators']:
             app.logger.info(f"Calculating indicator: {indicator}")
-            df = calculate_indicators(df, indicator)
-        
-        # Generate signals
-        app.logger.info("Generating signals...")
+            df = attach_indicator(df, symbol, interval, indicator, fingerprint)
+    
+    # Generate signals
+    app.logger.info("Generating signals...")
+    report(0, len(df), 'signals')
+    with timer.span('signals'):
         signals = generate_signals(df, data)
-        
-        # Calculate strategy metrics
-        app.logger.info("Calculating strategy metrics...")
-        strategy_results = calculate_metrics(df, signals, interval)
-        
-        # Calculate buy & hold metrics
-        app.logger.info("Calculating buy & hold metrics...")
+    
+    # Calculate strategy metrics
+    app.logger.info("Calculating strategy metrics...")
+    report(len(df), len(df), 'metrics')
+    with timer.span('metrics'):
+        strategy_results = calculate_metrics(
+            df, signals, interval,
+            equity_points=int(data.get('equity_curve_points', 0)),
+            execution=data.get('execution')
+        )
+    
+    # Calculate buy & hold metrics
+    app.logger.info("Calculating buy & hold metrics...")
+    with timer.span('buy_hold'):
         buy_hold_return = ((df['Close'].iloc[-1] - df['Close'].iloc[0]) / df['Close'].iloc[0]) * 100
-        
+    
         # Calculate buy & hold drawdown
         buy_hold_prices = df['Close']
         buy_hold_peaks = buy_hold_prices.expanding(min_periods=1).max()
         buy_hold_drawdowns = ((buy_hold_prices - buy_hold_peaks) / buy_hold_peaks) * 100
         buy_hold_max_drawdown = abs(buy_hold_drawdowns.min())
-        
+    
         # Calculate buy & hold risk metrics
         buy_hold_returns = df['Close'].pct_change().dropna().values
-        buy_hold_risk_metrics = calculate_risk_metrics(buy_hold_returns, 100, trading_days_multiplier=252)
-        
-        # Combine results
-        results = {
-            'strategy_metrics': strategy_results,
-            'buy_hold_metrics': {
-                'total_return': round(buy_hold_return, 2),
-                'max_drawdown': round(buy_hold_max_drawdown, 2),
-                'risk_metrics': buy_hold_risk_metrics
-            },
-            'timeframe': {
-                'period': period,
-                'interval': interval,
-                'start_date': df.index[0].strftime('%Y-%m-%d'),
-                'end_date': df.index[-1].strftime('%Y-%m-%d')
+        buy_hold_risk_metrics = calculate_risk_metrics(
+            buy_hold_returns, 100, trading_days_multiplier=TRADING_DAYS_MULTIPLIER.get(interval, 252)
+        )
+    
+    # Combine results
+    results = {
+        'strategy_metrics': strategy_results,
+        'buy_hold_metrics': {
+            'total_return': round(buy_hold_return, 2),
+            'max_drawdown': round(buy_hold_max_drawdown, 2),
+            'risk_metrics': buy_hold_risk_metrics
+        },
+        'timeframe': {
+            'period': period,
+            'interval': interval,
+            'start_date': df.index[0].strftime(date_format(interval)),
+            'end_date': df.index[-1].strftime(date_format(interval))
+        },
+        'symbol': symbol
+    }
+    
+    with timer.span('cache_store'):
+        result_cache.put(cache_key, last_bar, fingerprint, results)
+    return results
+
+def aggregate_metrics(results):
+    """Combine per-symbol strategy metrics into an equal-weight basket summary."""
+    metrics = [r['strategy_metrics'] for r in results]
+    if not metrics:
+        return {}
+
+    def mean(name):
+        return round(float(np.mean([m[name] for m in metrics])), 2)
+
+    all_returns = [t['return'] for m in metrics for t in m['trades']]
+    return {
+        'symbols': len(metrics),
+        'total_return': mean('total_return'),
+        'win_rate': round(sum(1 for r in all_returns if r > 0) / len(all_returns) * 100, 2) if all_returns else 0,
+        'max_drawdown': round(max(m['max_drawdown'] for m in metrics), 2),
+        'total_trades': sum(m['total_trades'] for m in metrics),
+        'sharpe_ratio': mean('sharpe_ratio'),
+        'time_in_market': mean('time_in_market'),
+        'risk_adjusted_return': mean('risk_adjusted_return')
+    }
+
+def run_multi_backtest(data, symbols, progress=None, timer=None, profilers=None):
+    """Backtest one strategy over a basket of symbols.
+
+    Bars for every symbol are loaded concurrently, then each symbol is
+    backtested on a bounded thread pool, so wall time tracks the slowest
+    symbol rather than the sum. When ``profilers`` is a list, each symbol's
+    backtest runs under its own cProfile profiler, appended to it, since a
+    profiler only sees the thread that enabled it.
+    """
+    timeframe = data.get('timeframe', {})
+    period = timeframe.get('period', '1y')
+    interval = timeframe.get('interval', '1d')
+
+    timer = timer or StageTimer(stage_histograms)
+    with timer.span('load_data'):
+        frames = bar_store.get_many(symbols, period, interval, max_workers=SYMBOL_WORKERS)
+
+    def run(symbol):
+        frame = frames[symbol]
+        if isinstance(frame, Exception):
+            raise frame
+        if profilers is None:
+            return run_backtest(dict(data, symbol=symbol), df=frame)
+        profiler = cProfile.Profile()
+        profilers.append(profiler)
+        return profiler.runcall(run_backtest, dict(data, symbol=symbol), df=frame)
+
+    per_symbol = {}
+    completed = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(SYMBOL_WORKERS, len(symbols)))) as executor:
+        futures = {symbol: executor.submit(run, symbol) for symbol in symbols}
+        for symbol, future in futures.items():
+            try:
+                per_symbol[symbol] = future.result()
+            except Exception as e:
+                app.logger.error(f"Backtest failed for {symbol}: {str(e)}")
+                per_symbol[symbol] = {'status': 'error', 'message': str(e)}
+            completed += 1
+            if progress:
+                progress(completed, len(symbols), 'symbols')
+
+    succeeded = [r for r in per_symbol.values() if 'strategy_metrics' in r]
+    if not succeeded:
+        raise ValueError("No data available for any of the requested symbols")
+
+    return {
+        'symbols': symbols,
+        'results': per_symbol,
+        'aggregate_metrics': aggregate_metrics(succeeded)
+    }
+
+def run_backtest_request(data, progress=None, timer=None, profilers=None):
+    """Dispatch a backtest request to the single- or multi-symbol runner."""
+    if data.get('symbols'):
+        return run_multi_backtest(data, parse_symbols(data['symbols']), progress, timer, profilers)
+    return run_backtest(data, progress, timer=timer)
+
+def run_job(data, progress=None):
+    """Dispatch a queued job to the backtest runner or the leaderboard re-scoring."""
+    if data.get('job') == 'rescore':
+        return rescore_strategies(force=bool(data.get('force')), progress=progress)
+    return run_backtest_request(data, progress)
+
+RESCORE_WORKERS = int(os.environ.get('RESCORE_WORKERS', 4))
+RESCORE_CHUNK_SIZE = int(os.environ.get('RESCORE_CHUNK_SIZE', 100))
+STRATEGY_METRICS = ('total_return', 'sharpe_ratio', 'win_rate', 'risk_adjusted_return',
+                    'max_drawdown', 'total_trades', 'time_in_market')
+
+def strategy_request(config):
+    """Turn a saved strategy config back into a backtest request."""
+    timeframe = config.get('timeframe') or {}
+    return {
+        'symbol': parse_symbol(config.get('symbol')),
+        'indicators': config.get('indicators', []),
+        'entry_conditions': config.get('entry_conditions', []),
+        'exit_conditions': config.get('exit_conditions', []),
+        'execution': config.get('execution'),
+        'timeframe': {'period': timeframe.get('period', '1y'), 'interval': timeframe.get('interval', '1d')}
+    }
+
+def save_scores(strategy_id, config, scored_key, results):
+    """Replace a strategy's stored metrics and trades with a server-side backtest result."""
+    metrics = results['strategy_metrics']
+    Strategy.query.filter_by(id=strategy_id).update({
+        **{name: metrics[name] for name in STRATEGY_METRICS},
+        'config': dict(config, buy_hold_metrics=results['buy_hold_metrics']),
+        'scored_key': scored_key,
+        'scored_at': datetime.utcnow()
+    }, synchronize_session=False)
+
+    StrategyTrade.query.filter_by(strategy_id=strategy_id).delete(synchronize_session=False)
+    if metrics.get('trades'):
+        db.session.execute(StrategyTrade.__table__.insert(), [
+            {
+                'strategy_id': strategy_id,
+                'seq': seq,
+                'entry_date': trade.get('entry_date'),
+                'entry_price': trade.get('entry_price'),
+                'exit_date': trade.get('exit_date'),
+                'exit_price': trade.get('exit_price'),
+                'return_pct': trade.get('return')
             }
-        }
+            for seq, trade in enumerate(metrics['trades'])
+        ])
+
+def rescore_strategies(max_workers=None, chunk_size=None, force=False, progress=None):
+    """Re-run every saved strategy against the latest bars and store the server's metrics.
+
+    Strategies are read in chunks and backtested on a bounded thread pool;
+    each chunk's updates are committed together. A strategy is skipped when
+    its config and the last bar of its dataset match the ones it was last
+    scored on. Each dataset is loaded once per run.
+    """
+    max_workers = max(1, max_workers or RESCORE_WORKERS)
+    chunk_size = max(1, chunk_size or RESCORE_CHUNK_SIZE)
+    started = time.perf_counter()
+    total = Strategy.query.count()
+    counts = {'rescored': 0, 'skipped': 0, 'failed': 0}
+    datasets = {}
+
+    def dataset(symbol, period, interval):
+        key = (symbol, period, interval)
+        if key not in datasets:
+            try:
+                datasets[key] = bar_store.get_bars(symbol, period, interval)
+            except Exception as e:
+                datasets[key] = e
+        return datasets[key]
+
+    last_id = ''
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rescore') as executor:
+        while True:
+            # Keyset pagination, so the updates of earlier chunks never shift later ones
+            chunk = db.session.query(Strategy.id, Strategy.config, Strategy.scored_key).filter(
+                Strategy.id > last_id
+            ).order_by(Strategy.id).limit(chunk_size).all()
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            pending = {}
+            for strategy_id, config, previous_key in chunk:
+                data = strategy_request(config)
+                symbol, timeframe = data['symbol'], data['timeframe']
+                df = dataset(symbol, timeframe['period'], timeframe['interval'])
+                if isinstance(df, Exception) or df.empty:
+                    app.logger.error(f"No data to rescore strategy {strategy_id} on {symbol}")
+                    counts['failed'] += 1
+                    continue
+
+                scored_key = hashlib.sha256(
+                    f"{strategy_key(data, symbol, timeframe['period'], timeframe['interval'])}:"
+                    f"{dataset_fingerprint(df)}".encode()
+                ).hexdigest()
+                if scored_key == previous_key and not force:
+                    counts['skipped'] += 1
+                    continue
+                # Indicator columns are attached to the frame, so each run gets its own
+                future = executor.submit(run_backtest, data, df=df.copy(deep=False))
+                pending[strategy_id] = (config, scored_key, future)
+
+            for strategy_id, (config, scored_key, future) in pending.items():
+                try:
+                    save_scores(strategy_id, config, scored_key, future.result())
+                    counts['rescored'] += 1
+                except Exception as e:
+                    app.logger.error(f"Rescoring strategy {strategy_id} failed: {str(e)}")
+                    counts['failed'] += 1
+            db.session.commit()
+
+            if progress:
+                progress(sum(counts.values()), total, 'rescoring')
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'strategies': total,
+        **counts,
+        'seconds': round(elapsed, 3),
+        'strategies_per_second': round(total / elapsed, 2) if elapsed > 0 else 0
+    }
+    app.logger.info(f"Rescored strategies: {json.dumps(summary)}")
+    return summary
+
+@app.cli.command('rescore-strategies')
+@click.option('--workers', type=int, default=None, help='Concurrent backtests (default RESCORE_WORKERS).')
+@click.option('--chunk-size', type=int, default=None, help='Strategies per chunk (default RESCORE_CHUNK_SIZE).')
+@click.option('--force', is_flag=True, help='Rescore strategies even when nothing changed.')
+def rescore_strategies_command(workers, chunk_size, force):
+    """Recompute the leaderboard metrics of every saved strategy."""
+    click.echo(json.dumps(rescore_strategies(workers, chunk_size, force)))
+
+def save_profile(profilers, limit=25):
+    """Write a request's merged cProfile stats to PROFILE_DIR and summarize the top entries.
+
+    The oldest dumps beyond PROFILE_MAX_FILES are removed.
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(
+        PROFILE_DIR,
+        f"backtest-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof"
+    )
+    summary = io.StringIO()
+    stats = pstats.Stats(*profilers, stream=summary)
+    stats.dump_stats(path)
+    stats.sort_stats('cumulative').print_stats(limit)
+
+    dumps = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith('.prof')),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in dumps[:max(len(dumps) - PROFILE_MAX_FILES, 0)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+    return {'path': path, 'top': summary.getvalue()}
+
+@app.route('/api/backtest', methods=['POST'])
+def backtest():
+    try:
+        data = request.get_json()
+        app.logger.info(f"Received backtest request with data: {data}")
+        
+        timer = StageTimer(stage_histograms)
+        profilers = None
+        if request.args.get('profile') == '1':
+            if not PROFILING_ENABLED:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Profiling is disabled on this server'
+                }), 403
+            # Multi-symbol runs add a profiler per worker thread to this list
+            profilers = [cProfile.Profile()]
+        
+        with timer.span('total'):
+            if profilers:
+                profilers[0].enable()
+            try:
+                results = run_backtest_request(data, timer=timer, profilers=profilers)
+            finally:
+                if profilers:
+                    profilers[0].disable()
+        
+        app.logger.info(f"Backtest timings (ms): {json.dumps(timer.as_ms())}")
+        app.logger.info("Backtest completed successfully")
         
-        app.logger.info(f"Backtest completed successfully. Results: {results}")
+        if request.args.get('timings') == '1' or data.get('timings'):
+            results = dict(results, timings=timer.as_ms())
+        if profilers:
+            results = dict(results, profile=save_profile(profilers))
         return jsonify(results)
         
     except ValueError as e:
@@ -144,6 +747,269 @@ def backtest():
             'message': str(e)
         }), 500
 
+@app.route('/api/backtest-batch', methods=['POST'])
+def backtest_batch():
+    try:
+        data = request.get_json()
+        strategies = data.get('strategies', [])
+        app.logger.info(f"Received batch backtest request for {len(strategies)} strategies")
+
+        if not strategies:
+            raise ValueError("No strategies provided")
+
+        timeframe = data.get('timeframe', {})
+        period = timeframe.get('period', '1y')
+        interval = timeframe.get('interval', '1d')
+
+        df = bar_store.get_bars(parse_symbol(data.get('symbol')), period, interval)
+        if df.empty:
+            raise ValueError("No data available for the specified timeframe")
+
+        results = backtest_strategies(df, strategies, interval)
+
+        return jsonify({
+            'status': 'success',
+            'results': results,
+            'timeframe': {
+                'period': period,
+                'interval': interval,
+                'start_date': df.index[0].strftime(date_format(interval)),
+                'end_date': df.index[-1].strftime(date_format(interval))
+            }
+        })
+
+    except (ValueError, KeyError) as e:
+        app.logger.error(f"Validation error in batch backtest: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        app.logger.error(f"Batch backtest error: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/sweep', methods=['POST'])
+def sweep():
+    try:
+        data = request.get_json()
+        app.logger.info(f"Received sweep request with ranges: {data.get('parameter_ranges')}")
+
+        timeframe = data.get('timeframe', {})
+        period = timeframe.get('period', '1y')
+        interval = timeframe.get('interval', '1d')
+        max_combinations = min(
+            int(data.get('max_combinations', MAX_SWEEP_COMBINATIONS)),
+            MAX_SWEEP_COMBINATIONS
+        )
+
+        df = bar_store.get_bars(parse_symbol(data.get('symbol')), period, interval)
+        if df.empty:
+            raise ValueError("No data available for the specified timeframe")
+
+        def log_progress(completed, total):
+            app.logger.info(f"Sweep progress: {completed}/{total} combinations")
+
+        results = run_parameter_sweep(
+            df,
+            data,
+            data.get('parameter_ranges', []),
+            interval,
+            sort_by=data.get('sort_by', 'total_return'),
+            max_workers=parse_workers(data.get('max_workers')),
+            max_combinations=max_combinations,
+            progress=log_progress
+        )
+
+        return jsonify({
+            'status': 'success',
+            'total_combinations': len(results),
+            'results': results[:int(data.get('top', len(results)))]
+        })
+
+    except (ValueError, KeyError) as e:
+        app.logger.error(f"Validation error in sweep: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        app.logger.error(f"Sweep error: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/backtest/jobs', methods=['POST'])
+def submit_backtest_job():
+    try:
+        data = request.get_json()
+        if not data or 'indicators' not in data:
+            raise ValueError("Missing strategy configuration")
+
+        job, created = job_queue.submit(data)
+        app.logger.info(f"Backtest job {job.id} {'queued' if created else 'already in flight'}")
+
+        return jsonify({
+            'status': job.status,
+            'job_id': job.id,
+            'deduplicated': not created
+        }), 202
+
+    except ValueError as e:
+        app.logger.error(f"Validation error in backtest job: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        app.logger.error(f"Backtest job submit error: {str(e)}", exc_info=True)
+        db.session.rollback()
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+# Queues a re-scoring of every saved strategy as a backtest job; poll it at
+# /api/backtest/<job_id>, where progress counts strategies instead of bars
+@app.route('/api/strategies/rescore', methods=['POST'])
+def submit_rescore_job():
+    try:
+        data = request.get_json(silent=True) or {}
+        job, created = job_queue.submit({'job': 'rescore', 'force': bool(data.get('force'))})
+        app.logger.info(f"Rescore job {job.id} {'queued' if created else 'already in flight'}")
+
+        return jsonify({
+            'status': job.status,
+            'job_id': job.id,
+            'deduplicated': not created
+        }), 202
+
+    except Exception as e:
+        app.logger.error(f"Rescore job submit error: {str(e)}", exc_info=True)
+        db.session.rollback()
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/backtest/<job_id>', methods=['GET'])
+def get_backtest_job(job_id):
+    job = db.session.get(BacktestJob, job_id)
+    if not job:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job not found'
+        }), 404
+
+    response = {
+        'job_id': job.id,
+        'status': job.status,
+        'progress': {
+            'stage': job.stage,
+            'bars_processed': job.bars_processed,
+            'total_bars': job.total_bars
+        },
+        'created_at': job.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'updated_at': job.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    if job.status == 'completed':
+        response['result'] = job.result
+    elif job.status == 'failed':
+        response['message'] = job.error
+    return jsonify(response)
+
+@app.route('/api/walk-forward', methods=['POST'])
+def walk_forward():
+    try:
+        data = request.get_json()
+        settings = data.get('walk_forward', {})
+        app.logger.info(f"Received walk-forward request with settings: {settings}")
+
+        timeframe = data.get('timeframe', {})
+        period = timeframe.get('period', '1y')
+        interval = timeframe.get('interval', '1d')
+
+        df = bar_store.get_bars(parse_symbol(data.get('symbol')), period, interval)
+        if df.empty:
+            raise ValueError("No data available for the specified timeframe")
+
+        def log_progress(completed, total):
+            app.logger.info(f"Walk-forward progress: {completed}/{total} windows")
+
+        results = run_walk_forward(
+            df,
+            data,
+            data.get('parameter_ranges', []),
+            interval,
+            train_bars=int(settings.get('train_bars', len(df) // 2)),
+            test_bars=int(settings.get('test_bars', max(len(df) // 10, 1))),
+            anchored=bool(settings.get('anchored', False)),
+            sort_by=data.get('sort_by', 'total_return'),
+            max_workers=parse_workers(data.get('max_workers')),
+            max_combinations=min(
+                int(data.get('max_combinations', MAX_SWEEP_COMBINATIONS)),
+                MAX_SWEEP_COMBINATIONS
+            ),
+            progress=log_progress
+        )
+
+        return jsonify(dict(results, status='success'))
+
+    except (ValueError, KeyError) as e:
+        app.logger.error(f"Validation error in walk-forward: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        app.logger.error(f"Walk-forward error: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/monte-carlo', methods=['POST'])
+def monte_carlo():
+    try:
+        data = request.get_json()
+        
+        # Accept raw fractional returns or the trades list calculate_metrics produces
+        if 'returns' in data:
+            returns = data['returns']
+        else:
+            returns = data.get('trades', [])
+        if len(returns) > MAX_MONTE_CARLO_TRADES:
+            raise ValueError(f"At most {MAX_MONTE_CARLO_TRADES} trade returns are supported")
+        if 'returns' not in data:
+            returns = [trade['return'] / 100 for trade in returns]
+        
+        results = monte_carlo_trades(
+            returns,
+            simulations=data.get('simulations', 10000),
+            method=data.get('method', 'bootstrap'),
+            seed=data.get('seed'),
+            confidence=float(data.get('confidence', 0.95)),
+            interval=data.get('interval', '1d')
+        )
+        
+        return jsonify(dict(results, status='success'))
+        
+    except (ValueError, KeyError, TypeError) as e:
+        app.logger.error(f"Validation error in Monte Carlo: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        app.logger.error(f"Monte Carlo error: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @app.route('/api/save-strategy', methods=['POST'])
 def save_strategy():
     try:
@@ -152,16 +1018,12 @@ def save_strategy():
         
         # Create new strategy
         strategy = Strategy(
+            id=str(uuid.uuid4()),
             name=data['name'],
             description=data.get('description', ''),
             config=data['config']
         )
         
-        # Add trades if available
-        if 'trades' in data:
-            app.logger.info(f"Saving {len(data['trades'])} trades")
-            strategy.trades = data['trades']
-        
         # Add performance metrics
         metrics = data['metrics']
         strategy.total_return = metrics['total_return']
@@ -184,6 +1046,24 @@ def save_strategy():
         
         app.logger.info("Saving strategy to database...")
         db.session.add(strategy)
+        db.session.flush()
+        
+        # Add trades if available, as one bulk insert
+        if data.get('trades'):
+            app.logger.info(f"Saving {len(data['trades'])} trades")
+            db.session.execute(StrategyTrade.__table__.insert(), [
+                {
+                    'strategy_id': strategy.id,
+                    'seq': seq,
+                    'entry_date': trade.get('entry_date'),
+                    'entry_price': trade.get('entry_price'),
+                    'exit_date': trade.get('exit_date'),
+                    'exit_price': trade.get('exit_price'),
+                    'return_pct': trade.get('return')
+                }
+                for seq, trade in enumerate(data['trades'])
+            ])
+        
         db.session.commit()
         app.logger.info(f"Strategy saved successfully with ID: {strategy.id}")
         
@@ -215,7 +1095,7 @@ def get_strategy(strategy_id):
             'name': strategy.name,
             'description': strategy.description,
             'config': strategy.config,
-            'trades': strategy.trades,
+            'trades': strategy_trades(strategy.id) if request.args.get('trades', '1') != '0' else None,
             'metrics': {
                 'total_return': strategy.total_return,
                 'sharpe_ratio': strategy.sharpe_ratio,
@@ -242,19 +1122,78 @@ def get_strategy(strategy_id):
             'message': str(e)
         }), 500
 
+# Upper bound on the points a chart request can ask for
+CHART_MAX_POINTS = int(os.environ.get('CHART_MAX_POINTS', 5000))
+CHART_FORMATS = ('labels', 'columns', 'binary')
+
+def chart_series(df, args):
+    """Pick the bars a price chart needs, returning (row positions, epoch seconds, info).
+
+    ``start``/``end`` (epoch seconds) limit the series to the visible window,
+    which is sent at full resolution when it fits in ``width`` points and is
+    otherwise downsampled with ``method`` (lttb or minmax). Without ``width``
+    every bar in the window is returned.
+    """
+    timestamps = epoch_seconds(df.index)
+    prices = df['Close'].to_numpy(dtype=float)
+    info = {'range': {'start': int(timestamps[0]), 'end': int(timestamps[-1])}}
+
+    lo = int(np.searchsorted(timestamps, int(args['start']))) if args.get('start') else 0
+    hi = int(np.searchsorted(timestamps, int(args['end']), side='right')) if args.get('end') else len(df)
+    rows = np.arange(lo, max(lo, hi))
+    rows = rows[np.isfinite(prices[rows])]
+    info['total_points'] = len(rows)
+
+    if args.get('width'):
+        width = min(int(args['width']), CHART_MAX_POINTS)
+        rows = rows[select_points(timestamps[rows], prices[rows], width, args.get('method', 'lttb'))]
+    info['points'] = len(rows)
+    return rows, timestamps[rows], info
+
+def chart_payload(df, interval, args, fmt):
+    """JSON body for one price series in the ``labels`` or ``columns`` format."""
+    rows, timestamps, info = chart_series(df, args)
+    prices = df['Close'].to_numpy(dtype=float)[rows]
+    if fmt == 'columns':
+        return dict(info, timestamps=timestamps.tolist(), prices=prices.tolist())
+    return dict(info, labels=df.index[rows].strftime(date_format(interval)).tolist(), prices=prices.tolist())
+
+# ``format`` is labels (date strings, the default), columns (epoch seconds) or
+# binary: little-endian float64 timestamps followed by the prices, with the
+# counts and full range in X- headers. See chart_series for width, method,
+# start and end.
 @app.route('/api/fetch-btc-data')
 def fetch_btc_data():
     try:
         period = request.args.get('period', '1y')
         interval = request.args.get('interval', '1d')
+        fmt = request.args.get('format', 'labels')
+        if fmt not in CHART_FORMATS:
+            raise ValueError(f"Unknown format: {fmt}")
         
-        # Download data
-        df = yf.download(
-            'BTC-USD',
-            period=period,
-            interval=interval,
-            progress=False
-        )
+        if request.args.get('symbols'):
+            if fmt == 'binary':
+                raise ValueError("The binary format only supports a single symbol")
+            symbols = parse_symbols(request.args['symbols'])
+            frames = bar_store.get_many(symbols, period, interval, max_workers=SYMBOL_WORKERS)
+            
+            series = {}
+            for symbol, df in frames.items():
+                if isinstance(df, Exception) or df.empty:
+                    series[symbol] = {
+                        'status': 'error',
+                        'message': str(df) if isinstance(df, Exception) else 'No data available for the specified timeframe'
+                    }
+                    continue
+                series[symbol] = dict(chart_payload(df, interval, request.args, fmt), status='success')
+            
+            return jsonify({
+                'status': 'success',
+                'series': series
+            })
+        
+        # Load data from the local bar store
+        df = bar_store.get_bars(parse_symbol(request.args.get('symbol')), period, interval)
         
         if df.empty:
             return jsonify({
@@ -262,50 +1201,96 @@ def fetch_btc_data():
                 'message': 'No data available for the specified timeframe'
             })
 
-        # Format dates and prices for the chart
-        dates = df.index.strftime('%Y-%m-%d').tolist()
-        prices = df['Close'].tolist()
+        if fmt == 'binary':
+            rows, timestamps, info = chart_series(df, request.args)
+            prices = df['Close'].to_numpy(dtype=float)[rows]
+            body = np.concatenate([timestamps, prices]).astype('<f8').tobytes()
+            return Response(body, mimetype='application/octet-stream', headers={
+                'X-Points': str(info['points']),
+                'X-Total-Points': str(info['total_points']),
+                'X-Range-Start': str(info['range']['start']),
+                'X-Range-End': str(info['range']['end'])
+            })
 
-        return jsonify({
-            'status': 'success',
-            'labels': dates,
-            'prices': prices
-        })
+        return jsonify(dict(chart_payload(df, interval, request.args, fmt), status='success'))
         
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
-        app.logger.error(f"Error fetching BTC data: {str(e)}", exc_info=True)
+        app.logger.error(f"Error fetching price data: {str(e)}", exc_info=True)
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
+LEADERBOARD_PAGE_SIZE = 50
+LEADERBOARD_MAX_PAGE_SIZE = 200
+
+def encode_cursor(value, strategy_id):
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps([value, strategy_id]).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        value, strategy_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return value, strategy_id
+
+def leaderboard_page(sort_metric, cursor=None, limit=LEADERBOARD_PAGE_SIZE, with_config=False):
+    """One page of strategies ordered by a metric, best first with unscored ones last.
+
+    The page continues strictly after ``cursor``, the sort key of the previous
+    page's last row. Scored and unscored strategies are read by separate range
+    scans of the (metric, id) index: SQLite answers a single OR predicate by
+    scanning the index from the top, so deep pages would cost more than the first.
+    """
+    sort_attr = getattr(Strategy, sort_metric)
+    
+    # Config is opt-in
+    query = Strategy.query
+    if not with_config:
+        query = query.options(defer(Strategy.config))
+    
+    last_value, last_id = decode_cursor(cursor) if cursor else (None, None)
+    strategies = []
+    if not cursor or last_value is not None:
+        scored = query.filter(sort_attr.isnot(None))
+        if cursor:
+            scored = scored.filter(tuple_(sort_attr, Strategy.id) < tuple_(last_value, last_id))
+        strategies = scored.order_by(sort_attr.desc(), Strategy.id.desc()).limit(limit).all()
+    if len(strategies) < limit:
+        unscored = query.filter(sort_attr.is_(None))
+        if cursor and last_value is None:
+            unscored = unscored.filter(Strategy.id < last_id)
+        strategies += unscored.order_by(Strategy.id.desc()).limit(limit - len(strategies)).all()
+    return strategies
+
 @app.route('/api/leaderboard')
 def get_leaderboard():
     try:
         # Get sort metric from query params, default to total_return
         sort_metric = request.args.get('metric', 'total_return')
+        if sort_metric not in STRATEGY_METRICS:
+            sort_metric = 'total_return'
         
-        # Map metric names to model attributes
-        metric_map = {
-            'total_return': Strategy.total_return,
-            'sharpe_ratio': Strategy.sharpe_ratio,
-            'win_rate': Strategy.win_rate,
-            'risk_adjusted_return': Strategy.risk_adjusted_return,
-            'max_drawdown': Strategy.max_drawdown,
-            'total_trades': Strategy.total_trades,
-            'time_in_market': Strategy.time_in_market
-        }
-        
-        # Get sort attribute, default to total_return if invalid metric provided
-        sort_attr = metric_map.get(sort_metric, Strategy.total_return)
+        page_size = min(max(int(request.args.get('limit', LEADERBOARD_PAGE_SIZE)), 1), LEADERBOARD_MAX_PAGE_SIZE)
+        fields = set(filter(None, request.args.get('fields', '').split(',')))
         
-        # Query strategies ordered by the selected metric
-        strategies = Strategy.query.order_by(sort_attr.desc()).all()
+        # Query one page of strategies ordered by the selected metric
+        strategies = leaderboard_page(
+            sort_metric, request.args.get('cursor'), page_size + 1, with_config='config' in fields
+        )
+        has_more = len(strategies) > page_size
+        strategies = strategies[:page_size]
         
         # Format response
         response = []
         for strategy in strategies:
-            response.append({
+            row = {
                 'id': strategy.id,
                 'name': strategy.name,
                 'description': strategy.description,
@@ -318,15 +1303,29 @@ def get_leaderboard():
                     'max_drawdown': strategy.max_drawdown,
                     'total_trades': strategy.total_trades,
                     'time_in_market': strategy.time_in_market
-                },
-                'config': strategy.config
-            })
+                }
+            }
+            if 'config' in fields:
+                row['config'] = strategy.config
+            response.append(row)
+        
+        next_cursor = None
+        if has_more:
+            last = strategies[-1]
+            next_cursor = encode_cursor(getattr(last, sort_metric), last.id)
         
         return jsonify({
             'status': 'success',
-            'strategies': response
+            'strategies': response,
+            'next_cursor': next_cursor,
+            'page_size': page_size
         })
         
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         app.logger.error(f"Error fetching leaderboard: {str(e)}", exc_info=True)
         return jsonify({
@@ -334,5 +1333,19 @@ def get_leaderboard():
             'message': str(e)
         }), 500
 
+@app.route('/api/cache-stats')
+def cache_stats():
+    return jsonify({
+        'status': 'success',
+        'indicator_cache': indicator_cache.stats(),
+        'indicator_store': indicator_store.stats() if indicator_store else None,
+        'result_cache': result_cache.stats()
+    })
+
+@app.route('/metrics')
+def metrics():
+    return Response(stage_histograms.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
+    start_worker()
     app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000))) 
\ No newline at end of file
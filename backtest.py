@@ -1,8 +1,43 @@
-import pandas as pd
-import numpy as np
-import ta
+import copy
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 from datetime import datetime, timedelta
 
+from expressions import ExpressionDAG
+from lazy_imports import lazy_import
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+ta = lazy_import('ta')
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Bump whenever a change alters the result of an unchanged request, so results
+# cached or scored by older code are recomputed
+ENGINE_VERSION = 2
+
+# Parameters that affect the columns each indicator produces, with their defaults
+INDICATOR_DEFAULTS = {
+    'sma': {'Period': 20},
+    'ema': {'Period': 20},
+    'rsi': {'Period': 14},
+    'macd': {'Fast Period': 12, 'Slow Period': 26, 'Signal Period': 9},
+    'bb': {'Period': 20, 'StdDev': 2},
+    'stoch': {'K Period': 14, 'D Period': 3},
+    'atr': {'Period': 14},
+    'obv': {},
+    'vwap': {},
+}
+
+def indicator_spec(component):
+    """Normalize an indicator component to a hashable (type, params) key."""
+    indicator_type = component['type'].lower()
+    defaults = INDICATOR_DEFAULTS.get(indicator_type, {})
+    params = component.get('params', {})
+    return indicator_type, tuple((name, params.get(name, default)) for name, default in sorted(defaults.items()))
+
 def calculate_indicators(df, component):
     """Calculate technical indicators based on strategy parameters."""
     if component['type'].lower() == 'sma':
@@ -89,9 +124,11 @@ def evaluate_condition(df, component, i, strategy):
         if not ind_config:
             return False
             
-        if indicator == 'sma':
-            period = ind_config['params'].get('Period', 20)
-            sma_col = f'SMA_{period}'
+        if indicator in ('sma', 'ema', 'vwap'):
+            if indicator == 'vwap':
+                sma_col = 'VWAP'
+            else:
+                sma_col = f"{indicator.upper()}_{ind_config['params'].get('Period', 20)}"
             
             if condition == 'crosses-above':
                 return i > 0 and df['Close'].iloc[i-1] <= df[sma_col].iloc[i-1] and df['Close'].iloc[i] > df[sma_col].iloc[i]
@@ -130,10 +167,11 @@ def evaluate_condition(df, component, i, strategy):
     return False
 
 def evaluate_logic(df, components, i, strategy):
-    """Evaluate a list of components with logical operators."""
+    """Evaluate a list of components with logical operators; 'and' binds tighter than 'or'."""
     if not components:
         return False
         
+    any_term = False
     result = evaluate_condition(df, components[0], i, strategy)
     
     for j in range(1, len(components), 2):
@@ -146,12 +184,270 @@ def evaluate_logic(df, components, i, strategy):
         if operator == 'and':
             result = result and next_condition
         elif operator == 'or':
-            result = result or next_condition
+            any_term = any_term or result
+            result = next_condition
             
-    return result
+    return bool(any_term or result)
+
+def compile_strategy(strategy, dag=None):
+    """Compile a strategy's entry and exit chains into ``dag``.
+
+    Returns (dag, entry_root, exit_root); pass the same dag for several
+    strategies to share their common subexpressions.
+    """
+    dag = dag or ExpressionDAG()
+    entry_root = dag.add(strategy['entry_conditions'], strategy)
+    exit_root = dag.add(strategy['exit_conditions'], strategy)
+    return dag, entry_root, exit_root
+
+def _column_resolver(df):
+    return lambda config, column: df[column]
+
+def evaluate_logic_array(df, components, strategy):
+    """Evaluate a list of components with logical operators over every bar.
+
+    ``df`` may be a DataFrame or any mapping of column name to array.
+    """
+    dag = ExpressionDAG()
+    root = dag.add(components, strategy)
+    return dag.evaluate([root], _column_resolver(df), len(df['Close']))[0]
+
+def resolve_positions(entry_mask, exit_mask):
+    """Run the entry/exit state machine over precomputed boolean arrays.
+
+    Flat, a bar with an entry opens a position; in a position, a bar with an
+    exit closes it. So a bar with only one of the two sets the state outright,
+    a bar with both toggles it, and a bar with neither carries it forward. The
+    state is therefore the last outright value flipped by the parity of the
+    toggles since then, which is computed without a per-bar loop.
+    """
+    entry_mask = np.asarray(entry_mask, dtype=bool)
+    exit_mask = np.asarray(exit_mask, dtype=bool)
+    n = len(entry_mask)
+
+    toggles = np.cumsum(entry_mask & exit_mask)
+    last_set = np.maximum.accumulate(np.where(entry_mask ^ exit_mask, np.arange(n), -1))
+    has_set = last_set >= 0
+    last_set = np.where(has_set, last_set, 0)
+
+    set_value = np.where(has_set, entry_mask[last_set], False).astype(np.int64)
+    toggles_since = toggles - np.where(has_set, toggles[last_set], 0)
+    position = set_value ^ (toggles_since & 1)
+
+    return np.diff(position, prepend=0)
+
+# Execution model applied to every trade; fractions are of price or equity
+EXECUTION_DEFAULTS = {
+    'commission': 0.0,     # charged on the traded value of each fill
+    'slippage': 0.0,       # adverse price move on each fill
+    'position_size': 1.0,  # share of equity committed to each trade
+    'stop_loss': None,     # exit once price moves this far against the entry fill
+    'take_profit': None,   # exit once price moves this far in favour of the entry fill
+    'direction': 'long',   # 'long' or 'short'
+}
+
+def execution_settings(execution=None):
+    """Validate an execution config and fill in the defaults."""
+    execution = execution or {}
+    unknown = set(execution) - set(EXECUTION_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown execution settings: {', '.join(sorted(unknown))}")
+    settings = dict(EXECUTION_DEFAULTS, **execution)
+
+    for name in ('commission', 'slippage'):
+        settings[name] = float(settings[name] or 0)
+        if not 0 <= settings[name] < 1:
+            raise ValueError(f"{name} must be at least 0 and below 1")
+    settings['position_size'] = float(settings['position_size'])
+    if not 0 < settings['position_size'] <= 1:
+        raise ValueError("position_size must be above 0 and at most 1")
+    for name in ('stop_loss', 'take_profit'):
+        if settings[name] is not None:
+            settings[name] = float(settings[name])
+            if settings[name] <= 0:
+                raise ValueError(f"{name} must be positive")
+    if settings['direction'] not in ('long', 'short'):
+        raise ValueError(f"Unknown direction: {settings['direction']}")
+
+    settings['side'] = 1 if settings['direction'] == 'long' else -1
+    settings['has_stops'] = settings['stop_loss'] is not None or settings['take_profit'] is not None
+    return settings
+
+def entry_fill(price, settings):
+    return price * (1 + settings['side'] * settings['slippage'])
+
+def exit_fill(price, settings):
+    return price * (1 - settings['side'] * settings['slippage'])
+
+def trade_returns(entry_price, exit_price, settings):
+    """Net return of trades between two fill prices, after commission on both legs."""
+    commission = settings['commission']
+    if settings['side'] == 1:
+        cost = entry_price * (1 + commission)
+        return (exit_price * (1 - commission) - cost) / cost
+    return (entry_price * (1 - commission) - exit_price * (1 + commission)) / entry_price
+
+def mark_to_market(price, entry_price, settings):
+    """Return of an open trade valued at ``price``, net of the entry commission."""
+    commission = settings['commission']
+    if settings['side'] == 1:
+        cost = entry_price * (1 + commission)
+        return (price - cost) / cost
+    return (entry_price * (1 - commission) - price) / entry_price
+
+def exit_levels(entry_price, settings):
+    """Stop-loss and take-profit prices for trades filled at ``entry_price``.
+
+    A disabled level is NaN, which never compares as hit.
+    """
+    side = settings['side']
+    stop = entry_price * (1 - side * settings['stop_loss']) if settings['stop_loss'] is not None else entry_price * np.nan
+    target = entry_price * (1 + side * settings['take_profit']) if settings['take_profit'] is not None else entry_price * np.nan
+    return stop, target
+
+def level_hits(high, low, stop, target, settings):
+    """Whether each bar's range reached the stop and the target."""
+    with np.errstate(invalid='ignore'):
+        if settings['side'] == 1:
+            return low <= stop, high >= target
+        return high >= stop, low <= target
+
+def level_exit_prices(open_, stop, target, stop_hit, target_hit, fallback, settings):
+    """Raw exit price of bars that reached a level, ``fallback`` elsewhere.
+
+    A bar that gaps through a level fills at its open. When a bar reaches
+    both levels the stop is assumed to have come first.
+    """
+    worse, better = (np.fmin, np.fmax) if settings['side'] == 1 else (np.fmax, np.fmin)
+    return np.where(stop_hit, worse(open_, stop), np.where(target_hit, better(open_, target), fallback))
+
+def _next_true(mask):
+    """Index of the first True at or after each position, n where there is none.
+
+    Has one extra trailing element so index n can be looked up too.
+    """
+    n = len(mask)
+    index = np.where(mask, np.arange(n), n)
+    return np.append(np.minimum.accumulate(index[::-1])[::-1], n)
+
+def execute_positions(columns, entry_mask, exit_mask, execution=None):
+    """Resolve entries and exits into 0/1/-1 transitions under an execution model.
+
+    Without a stop-loss or take-profit this is resolve_positions. With them,
+    each trade's bars are scanned as one array comparison of High/Low against
+    its levels up to its natural exit, so the Python loop runs once per trade
+    rather than once per bar. Levels are never checked on the entry bar, and
+    a trade closed by a level cannot reopen on the same bar.
+    """
+    settings = execution_settings(execution)
+    if not settings['has_stops']:
+        return resolve_positions(entry_mask, exit_mask)
+    if 'High' not in columns or 'Low' not in columns:
+        raise ValueError("Stop-loss and take-profit need High and Low prices")
+
+    close = np.asarray(columns['Close'], dtype=float)
+    high = np.asarray(columns['High'], dtype=float)
+    low = np.asarray(columns['Low'], dtype=float)
+    n = len(close)
+    next_entry = _next_true(np.asarray(entry_mask, dtype=bool))
+    next_exit = _next_true(np.asarray(exit_mask, dtype=bool))
+
+    transitions = np.zeros(n, dtype=np.int64)
+    i = next_entry[0]
+    while i < n:
+        transitions[i] = 1
+        stop, target = exit_levels(entry_fill(close[i], settings), settings)
+        natural = next_exit[i + 1]
+        end = min(natural, n - 1) + 1
+        stop_hit, target_hit = level_hits(high[i + 1:end], low[i + 1:end], stop, target, settings)
+        hits = np.flatnonzero(stop_hit | target_hit)
+        if len(hits):
+            exit_bar = i + 1 + hits[0]
+        elif natural < n:
+            exit_bar = natural
+        else:
+            break
+        transitions[exit_bar] = -1
+        i = next_entry[exit_bar + 1]
+
+    return transitions
+
+def generate_signals(df, strategy, vectorized=True):
+    """Generate buy/sell signals based on entry and exit conditions.
+
+    The vectorized path compiles both condition chains into one expression DAG
+    and evaluates it as whole-column operations; ``vectorized=False`` runs the
+    original per-bar loop and is kept as the reference implementation for the
+    price-level and indicator-compare conditions. Only the vectorized path
+    applies the strategy's stop-loss and take-profit.
+    """
+    if not vectorized:
+        return generate_signals_loop(df, strategy)
+
+    dag, entry_root, exit_root = compile_strategy(strategy)
+    entry_mask, exit_mask = dag.evaluate([entry_root, exit_root], _column_resolver(df), len(df))
 
-def generate_signals(df, strategy):
-    """Generate buy/sell signals based on entry and exit conditions."""
+    signals = pd.DataFrame(index=df.index)
+    # 0: no signal, 1: open a trade, -1: close it
+    signals['signal'] = execute_positions(df, entry_mask, exit_mask, strategy.get('execution'))
+    return signals
+
+def compute_spec_columns(df, strategies):
+    """Compute each distinct indicator spec used by the strategies exactly once.
+
+    Returns {spec: {column name: array}}.
+    """
+    inputs = [col for col in PRICE_COLUMNS if col in df.columns]
+    spec_columns = {}
+    for strategy in strategies:
+        for indicator in strategy['indicators']:
+            spec = indicator_spec(indicator)
+            if spec not in spec_columns:
+                computed = calculate_indicators(df[inputs].copy(), indicator)
+                spec_columns[spec] = {
+                    col: computed[col].to_numpy()
+                    for col in computed.columns if col not in inputs
+                }
+    return spec_columns
+
+def strategy_columns(base, spec_columns, strategy):
+    """Assemble the column mapping one strategy's conditions read from."""
+    columns = dict(base)
+    for indicator in strategy['indicators']:
+        columns.update(spec_columns[indicator_spec(indicator)])
+    return columns
+
+def generate_signals_batch(df, strategies):
+    """Generate signals for many strategies against the same bars.
+
+    Each distinct indicator spec across all strategies is computed once, and
+    all condition chains share one expression DAG, so a subexpression common
+    to several strategies is evaluated once. Returns an int8 array of shape
+    (bars, strategies) using the same 0/1/-1 encoding as generate_signals.
+    """
+    base = {col: df[col].to_numpy() for col in PRICE_COLUMNS if col in df.columns}
+    spec_columns = compute_spec_columns(df, strategies)
+
+    def resolve(config, column):
+        if config is None:
+            return base[column]
+        return spec_columns[indicator_spec(config)][column]
+
+    dag = ExpressionDAG()
+    roots = []
+    for strategy in strategies:
+        _, entry_root, exit_root = compile_strategy(strategy, dag)
+        roots.extend([entry_root, exit_root])
+    masks = dag.evaluate(roots, resolve, len(df))
+
+    signals = np.zeros((len(df), len(strategies)), dtype=np.int8)
+    for j, strategy in enumerate(strategies):
+        signals[:, j] = execute_positions(base, masks[2 * j], masks[2 * j + 1], strategy.get('execution'))
+
+    return signals
+
+def generate_signals_loop(df, strategy):
+    """Generate buy/sell signals by evaluating the conditions bar by bar."""
     signals = pd.DataFrame(index=df.index)
     signals['signal'] = 0  # 0: no signal, 1: buy, -1: sell
     
@@ -160,11 +456,11 @@ def generate_signals(df, strategy):
     for i in range(len(df)):
         if position == 0:  # Looking for entry
             if evaluate_logic(df, strategy['entry_conditions'], i, strategy):
-                signals.iloc[i]['signal'] = 1
+                signals.iloc[i, 0] = 1
                 position = 1
         else:  # Looking for exit
             if evaluate_logic(df, strategy['exit_conditions'], i, strategy):
-                signals.iloc[i]['signal'] = -1
+                signals.iloc[i, 0] = -1
                 position = 0
     
     return signals
@@ -201,77 +497,123 @@ def calculate_risk_metrics(returns, time_in_market_pct, trading_days_multiplier=
         'risk_adjusted_return': round(risk_adjusted_return, 2)
     }
 
-def calculate_metrics(df, signals, interval):
-    """Calculate backtest performance metrics."""
-    position = 0
-    trades = []
-    returns = []
-    days_in_market = 0
-    total_days = len(df)
-    
-    # Determine trading days multiplier based on interval
-    trading_days_multiplier = {
-        '1d': 252,  # Daily
-        '1wk': 52,  # Weekly
-        '1mo': 12,  # Monthly
-    }.get(interval, 252)  # Default to daily if interval not recognized
+# Periods per year used to annualize returns for each interval
+TRADING_DAYS_MULTIPLIER = {
+    '1d': 252,  # Daily
+    '1wk': 52,  # Weekly
+    '1mo': 12,  # Monthly
+    # Intraday bars assume round-the-clock trading, as for BTC
+    '1m': 365 * 24 * 60,
+    '2m': 365 * 24 * 30,
+    '5m': 365 * 24 * 12,
+    '15m': 365 * 24 * 4,
+    '30m': 365 * 24 * 2,
+    '60m': 365 * 24,
+    '90m': 365 * 16,
+    '1h': 365 * 24,
+}
+
+INTRADAY_INTERVALS = {'1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h'}
+
+def date_format(interval):
+    """strftime format for bar dates; intraday bars keep the time of day."""
+    return '%Y-%m-%d %H:%M' if interval in INTRADAY_INTERVALS else '%Y-%m-%d'
+
+MAX_SIMULATIONS = 100000
+MAX_MONTE_CARLO_TRADES = 20000
+# Sample cells (simulations x trades) resampled at once; about 8 MB per float matrix
+MONTE_CARLO_CHUNK_CELLS = 1_000_000
+
+def _interval_summary(values, confidence):
+    tail = (1 - confidence) / 2 * 100
+    lower, median, upper = np.percentile(values, [tail, 50, 100 - tail])
+    return {
+        'mean': round(float(np.mean(values)), 2),
+        'median': round(float(median), 2),
+        'lower': round(float(lower), 2),
+        'upper': round(float(upper), 2)
+    }
+
+def monte_carlo_trades(returns, simulations=10000, method='bootstrap', seed=None,
+                       confidence=0.95, chunk_cells=MONTE_CARLO_CHUNK_CELLS, interval='1d'):
+    """Resample trade returns to put confidence intervals on the headline metrics.
+
+    ``bootstrap`` draws trades with replacement; ``shuffle`` permutes their
+    order, which leaves total return unchanged but moves the drawdown. Each
+    chunk is a (simulations x trades) matrix of at most ``chunk_cells`` cells
+    (one simulation per chunk at minimum), so memory stays bounded whatever
+    the number of simulations or trades.
+    """
+    if len(returns) > MAX_MONTE_CARLO_TRADES:
+        raise ValueError(f"At most {MAX_MONTE_CARLO_TRADES} trade returns are supported")
+    returns = np.asarray(returns, dtype=float)
+    returns = returns[~np.isnan(returns)]
+    if len(returns) == 0:
+        raise ValueError("At least one trade return is required")
+    if method not in ('bootstrap', 'shuffle'):
+        raise ValueError(f"Unknown resampling method: {method}")
+    if not 0 < confidence < 1:
+        raise ValueError("Confidence must be between 0 and 1")
+    simulations = min(int(simulations), MAX_SIMULATIONS)
     
-    entry_price = None
-    entry_date = None
+    rng = np.random.default_rng(seed)
+    trading_days_multiplier = TRADING_DAYS_MULTIPLIER.get(interval, 252)
+    risk_free_rate = 0.04
+    n = len(returns)
+    chunk_size = max(1, chunk_cells // n)
     
-    # Iterate through the entire dataset
-    for i in range(len(df)):
-        if signals['signal'].iloc[i] == 1 and position == 0:  # Buy signal
-            position = 1
-            entry_price = df['Close'].iloc[i]
-            entry_date = df.index[i].strftime('%Y-%m-%d')
-            days_in_market += 1
-        elif signals['signal'].iloc[i] == -1 and position == 1:  # Sell signal
-            exit_price = df['Close'].iloc[i]
-            exit_date = df.index[i].strftime('%Y-%m-%d')
-            
-            # Calculate trade return
-            trade_return = (exit_price - entry_price) / entry_price
-            returns.append(trade_return)
-            
-            trades.append({
-                'entry_date': entry_date,
-                'entry_price': round(entry_price, 2),
-                'exit_date': exit_date,
-                'exit_price': round(exit_price, 2),
-                'return': round(trade_return * 100, 2)
-            })
-            
-            position = 0
-            entry_price = None
-            entry_date = None
-        elif position == 1:  # In position
-            days_in_market += 1
+    total_returns = np.empty(simulations)
+    max_drawdowns = np.empty(simulations)
+    sharpe_ratios = np.empty(simulations)
     
-    # Close any open position at the end
-    if position == 1:
-        exit_price = df['Close'].iloc[-1]
-        exit_date = df.index[-1].strftime('%Y-%m-%d')
-        trade_return = (exit_price - entry_price) / entry_price
-        returns.append(trade_return)
+    for start in range(0, simulations, chunk_size):
+        size = min(chunk_size, simulations - start)
+        if method == 'bootstrap':
+            sample = returns[rng.integers(0, n, size=(size, n))]
+        else:
+            sample = rng.permuted(np.broadcast_to(returns, (size, n)), axis=1)
         
-        trades.append({
-            'entry_date': entry_date,
-            'entry_price': round(entry_price, 2),
-            'exit_date': exit_date,
-            'exit_price': round(exit_price, 2),
-            'return': round(trade_return * 100, 2)
-        })
+        chunk = slice(start, start + size)
+        equity = np.cumprod(1 + sample, axis=1)
+        total_returns[chunk] = (equity[:, -1] - 1) * 100
+        
+        running_max = np.maximum(np.maximum.accumulate(equity, axis=1), 1)
+        max_drawdowns[chunk] = -np.minimum(((equity - running_max) / running_max).min(axis=1), 0) * 100
+        
+        # Same annualization as calculate_risk_metrics
+        annualized_return = sample.mean(axis=1) * trading_days_multiplier
+        annualized_volatility = sample.std(axis=1) * np.sqrt(trading_days_multiplier)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = (annualized_return - risk_free_rate) / annualized_volatility
+        sharpe_ratios[chunk] = np.where(annualized_volatility == 0, 0, sharpe)
     
-    # Calculate metrics
-    total_return = sum(returns) * 100 if returns else 0
-    win_rate = (sum(1 for r in returns if r > 0) / len(returns) * 100) if returns else 0
+    return {
+        'method': method,
+        'simulations': simulations,
+        'trades': n,
+        'confidence': confidence,
+        'seed': seed,
+        'total_return': _interval_summary(total_returns, confidence),
+        'max_drawdown': _interval_summary(max_drawdowns, confidence),
+        'sharpe_ratio': _interval_summary(sharpe_ratios, confidence),
+        'probability_of_loss': round(float(np.mean(total_returns < 0)) * 100, 2)
+    }
+
+def summarize_trades(returns, trades, max_drawdown, days_in_market, total_days, interval):
+    """Build the metrics dict from trade returns and bar-level exposure figures.
+
+    ``returns`` are the trades' returns on total equity, after position sizing.
+    ``trades`` is None when the caller does not want the trade list.
+    """
+    returns = np.asarray(returns, dtype=float)
     
-    # Calculate maximum drawdown
-    cumulative_returns = np.cumprod(np.array(returns) + 1)
-    running_max = np.maximum.accumulate(cumulative_returns)
-    drawdowns = (cumulative_returns - running_max) / running_max
-    max_drawdown = abs(min(drawdowns)) * 100 if len(drawdowns) > 0 else 0
+    # Determine trading days multiplier based on interval
+    trading_days_multiplier = TRADING_DAYS_MULTIPLIER.get(interval, 252)  # Default to daily if interval not recognized
+    
+    # Calculate metrics
+    # Trades are taken one after another, so their returns compound
+    total_return = (np.prod(1 + returns) - 1) * 100 if len(returns) else 0
+    win_rate = (int(np.count_nonzero(returns > 0)) / len(returns) * 100) if len(returns) else 0
     
     # Calculate time in market
     time_in_market_pct = (days_in_market / total_days) * 100 if total_days > 0 else 0
@@ -279,13 +621,408 @@ def calculate_metrics(df, signals, interval):
     # Calculate risk metrics with appropriate trading days multiplier
     risk_metrics = calculate_risk_metrics(returns, time_in_market_pct, trading_days_multiplier)
     
-    return {
+    metrics = {
         'total_return': round(total_return, 2),
         'win_rate': round(win_rate, 2),
         'max_drawdown': round(max_drawdown, 2),
-        'total_trades': len(trades),
+        'total_trades': len(returns),
         'trades': trades,
         'sharpe_ratio': risk_metrics['sharpe_ratio'],
         'time_in_market': risk_metrics['time_in_market'],
         'risk_adjusted_return': risk_metrics['risk_adjusted_return']
-    } 
\ No newline at end of file
+    }
+    if trades is None:
+        del metrics['trades']
+    return metrics
+
+def downsample_indices(n, points):
+    """Return up to ``points`` evenly spaced indices into n bars, always keeping the last."""
+    if points <= 0 or n == 0:
+        return np.array([], dtype=np.int64)
+    if n <= points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, points).round().astype(np.int64))
+
+def calculate_metrics(df, signals, interval, equity_points=0, execution=None, include_trades=True):
+    """Calculate backtest performance metrics.
+
+    Trades are located from the signal transitions and filled under the
+    ``execution`` model the signals were generated with: slippage and
+    commission on both legs, and a stop-loss or take-profit fill on exit
+    bars whose range reached a level. The equity curve marks each open
+    trade to market bar by bar, so max drawdown includes moves inside open
+    trades. ``equity_points`` adds a downsampled equity curve for charting.
+    With ``include_trades`` false the per-trade list, which formats a date
+    for every entry and exit, is left out.
+    """
+    settings = execution_settings(execution)
+    total_days = len(df)
+    
+    close = np.asarray(df['Close'], dtype=float)
+    signal = np.asarray(signals['signal'])
+    
+    # Position held after each bar; repeated buys or sells without a position are ignored
+    transitions = resolve_positions(signal == 1, signal == -1)
+    position = np.cumsum(transitions)
+    entry_idx = np.flatnonzero(transitions == 1)
+    exit_idx = np.flatnonzero(transitions == -1)
+    closed = len(exit_idx)
+    
+    # Close any open position at the end
+    if len(exit_idx) < len(entry_idx):
+        exit_idx = np.append(exit_idx, total_days - 1)
+    
+    entry_prices = entry_fill(close[entry_idx], settings)
+    raw_exit_prices = close[exit_idx]
+    if settings['has_stops'] and len(exit_idx):
+        stop, target = exit_levels(entry_prices, settings)
+        stop_hit, target_hit = level_hits(
+            np.asarray(df['High'], dtype=float)[exit_idx], np.asarray(df['Low'], dtype=float)[exit_idx],
+            stop, target, settings
+        )
+        # Levels are not checked on the bar a trade was opened
+        opened_here = exit_idx == entry_idx
+        open_ = np.asarray(df['Open'], dtype=float)[exit_idx] if 'Open' in df else np.full(len(exit_idx), np.nan)
+        raw_exit_prices = level_exit_prices(
+            open_, stop, target, stop_hit & ~opened_here, target_hit & ~opened_here, raw_exit_prices, settings
+        )
+    exit_prices = exit_fill(raw_exit_prices, settings)
+    returns = trade_returns(entry_prices, exit_prices, settings)
+    equity_returns = settings['position_size'] * returns
+    
+    trades = None
+    if include_trades:
+        entry_dates = df.index[entry_idx].strftime(date_format(interval))
+        exit_dates = df.index[exit_idx].strftime(date_format(interval))
+        trades = [
+            {
+                'entry_date': entry_date,
+                'entry_price': round(entry_price, 2),
+                'exit_date': exit_date,
+                'exit_price': round(exit_price, 2),
+                'return': round(trade_return * 100, 2)
+            }
+            for entry_date, entry_price, exit_date, exit_price, trade_return in zip(
+                entry_dates, entry_prices.tolist(), exit_dates, exit_prices.tolist(), returns.tolist()
+            )
+        ]
+    
+    # Equity after each closed trade, carried forward until the next exit
+    settled = np.concatenate([[1.0], np.cumprod(1 + equity_returns[:closed])])
+    trade_number = np.zeros(total_days, dtype=np.int64)
+    trade_number[exit_idx[:closed]] = np.arange(1, closed + 1)
+    equity = settled[np.maximum.accumulate(trade_number)] if total_days else np.ones(0)
+    
+    # Bars inside a trade are marked to market from the equity it started with
+    held = position == 1
+    if held.any():
+        trade = np.cumsum(transitions == 1)[held] - 1
+        marks = mark_to_market(close[held], entry_prices[trade], settings)
+        equity[held] = settled[trade] * (1 + settings['position_size'] * marks)
+    
+    # Calculate maximum drawdown from the starting capital
+    running_max = np.maximum(np.maximum.accumulate(equity), 1) if total_days else equity
+    drawdowns = (equity - running_max) / running_max
+    max_drawdown = abs(drawdowns.min()) * 100 if total_days else 0
+    
+    days_in_market = int(np.count_nonzero(position))
+    metrics = summarize_trades(equity_returns, trades, max_drawdown, days_in_market, total_days, interval)
+    
+    if equity_points:
+        sampled = downsample_indices(total_days, equity_points)
+        metrics['equity_curve'] = {
+            'dates': df.index[sampled].strftime(date_format(interval)).tolist(),
+            'equity': np.round(equity[sampled], 6).tolist()
+        }
+    
+    return metrics
+
+MAX_SWEEP_COMBINATIONS = 500
+MAX_WALK_FORWARD_WINDOWS = 200
+
+def pool_workers(max_workers, tasks):
+    """Worker processes for a pool: the request, clamped to the CPUs and the tasks."""
+    cpus = os.cpu_count() or 1
+    return max(1, min(int(max_workers or cpus), cpus, tasks))
+
+# Metrics where a lower value ranks higher
+ASCENDING_METRICS = {'max_drawdown'}
+
+def parameter_values(param_range):
+    """Expand a parameter range spec into the list of values it covers."""
+    if 'values' in param_range:
+        return list(param_range['values'])
+
+    start, stop = param_range['start'], param_range['stop']
+    step = param_range.get('step', 1)
+    if step <= 0:
+        raise ValueError(f"Step must be positive for {param_range['param']}")
+
+    values = np.arange(start, stop + step / 2, step)
+    if all(isinstance(v, int) for v in (start, stop, step)):
+        return [int(v) for v in values]
+    return [round(float(v), 10) for v in values]
+
+def expand_parameter_grid(strategy, param_ranges, max_combinations=MAX_SWEEP_COMBINATIONS):
+    """Return every parameter assignment of a sweep as a list of dicts.
+
+    Each assignment maps (indicator type, param name) to a value.
+    """
+    indicator_types = {ind['type'] for ind in strategy['indicators']}
+    axes = []
+    for param_range in param_ranges:
+        if param_range['indicator'] not in indicator_types:
+            raise ValueError(f"Indicator {param_range['indicator']} is not part of the strategy")
+        values = parameter_values(param_range)
+        if not values:
+            raise ValueError(f"Empty range for {param_range['indicator']} {param_range['param']}")
+        axes.append([((param_range['indicator'], param_range['param']), v) for v in values])
+
+    total = int(np.prod([len(axis) for axis in axes])) if axes else 0
+    if total > max_combinations:
+        raise ValueError(f"Sweep has {total} combinations, the limit is {max_combinations}")
+
+    return [dict(combo) for combo in itertools.product(*axes)]
+
+def apply_parameters(strategy, assignment):
+    """Return a copy of the strategy with the assigned indicator parameters."""
+    strategy = copy.deepcopy(strategy)
+    for (indicator_type, param), value in assignment.items():
+        for ind in strategy['indicators']:
+            if ind['type'] == indicator_type:
+                ind.setdefault('params', {})[param] = value
+    return strategy
+
+# Per-process sweep state, set once by the pool initializer
+_sweep_state = {}
+
+def _init_sweep_worker(df, strategy, interval):
+    _sweep_state['df'] = df
+    _sweep_state['strategy'] = strategy
+    _sweep_state['interval'] = interval
+    _sweep_state['columns'] = {}
+
+def _run_sweep_batch(batch):
+    """Backtest a batch of (index, assignment) pairs against the shared bars."""
+    df = _sweep_state['df']
+    columns = _sweep_state['columns']
+    results = []
+
+    for index, assignment in batch:
+        strategy = apply_parameters(_sweep_state['strategy'], assignment)
+        frame = df.copy()
+        for indicator in strategy['indicators']:
+            # Reuse columns already computed in this worker for the same spec
+            spec = indicator_spec(indicator)
+            if spec not in columns:
+                computed = calculate_indicators(df.copy(), indicator)
+                columns[spec] = {col: computed[col].to_numpy() for col in computed.columns if col not in df.columns}
+            for col, values in columns[spec].items():
+                frame[col] = values
+
+        signals = generate_signals(frame, strategy)
+        metrics = calculate_metrics(
+            frame, signals, _sweep_state['interval'], execution=strategy.get('execution'), include_trades=False
+        )
+        results.append((index, metrics))
+
+    return results
+
+def run_parameter_sweep(df, strategy, param_ranges, interval, sort_by='total_return',
+                        max_workers=None, max_combinations=MAX_SWEEP_COMBINATIONS,
+                        batch_size=8, progress=None):
+    """Backtest every combination of the parameter ranges and rank the results.
+
+    The bars are handed to each worker process once through the pool
+    initializer; combinations are then dispatched in batches. ``progress`` is
+    called with (completed, total) as batches finish.
+    """
+    assignments = expand_parameter_grid(strategy, param_ranges, max_combinations)
+    total = len(assignments)
+    if total == 0:
+        return []
+
+    base = df[[col for col in PRICE_COLUMNS if col in df.columns]]
+    indexed = list(enumerate(assignments))
+    batches = [indexed[i:i + batch_size] for i in range(0, total, batch_size)]
+    max_workers = pool_workers(max_workers, len(batches))
+
+    metrics_by_index = {}
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_sweep_worker,
+        initargs=(base, strategy, interval)
+    ) as executor:
+        futures = [executor.submit(_run_sweep_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            for index, metrics in future.result():
+                metrics_by_index[index] = metrics
+            if progress:
+                progress(len(metrics_by_index), total)
+
+    results = [
+        {
+            'params': [
+                {'indicator': indicator_type, 'param': param, 'value': value}
+                for (indicator_type, param), value in assignments[index].items()
+            ],
+            'metrics': metrics
+        }
+        for index, metrics in metrics_by_index.items()
+    ]
+    results.sort(
+        key=lambda r: r['metrics'].get(sort_by, 0),
+        reverse=sort_by not in ASCENDING_METRICS
+    )
+    for rank, result in enumerate(results, start=1):
+        result['rank'] = rank
+    return results
+
+def backtest_strategies(df, strategies, interval, include_trades=True):
+    """Backtest many strategies against the same bars, sharing indicator work."""
+    signals = generate_signals_batch(df, strategies)
+    return [
+        calculate_metrics(
+            df, pd.DataFrame({'signal': signals[:, j]}, index=df.index), interval,
+            execution=strategy.get('execution'), include_trades=include_trades
+        )
+        for j, strategy in enumerate(strategies)
+    ]
+
+def walk_forward_windows(n, train_bars, test_bars, anchored=False, max_windows=MAX_WALK_FORWARD_WINDOWS):
+    """Split n bars into consecutive (train_start, train_end, test_start, test_end) windows.
+
+    Test windows tile the series after the first training window; rolling
+    windows keep a fixed training length, anchored ones always start at bar 0.
+    """
+    if train_bars <= 0 or test_bars <= 0:
+        raise ValueError("Train and test windows must contain at least one bar")
+    if n < train_bars + test_bars:
+        raise ValueError(f"Need at least {train_bars + test_bars} bars for one walk-forward window, got {n}")
+    total = -(-(n - train_bars) // test_bars)
+    if total > max_windows:
+        raise ValueError(f"Walk-forward has {total} windows, the limit is {max_windows}")
+
+    windows = []
+    test_start = train_bars
+    while test_start < n:
+        train_start = 0 if anchored else test_start - train_bars
+        windows.append((train_start, test_start, test_start, min(test_start + test_bars, n)))
+        test_start += test_bars
+    return windows
+
+def _slice_signals(columns, strategy, start, end):
+    """Signals for a strategy on bars [start, end) of precomputed columns."""
+    window = {col: values[start:end] for col, values in columns.items()}
+    entry_mask = evaluate_logic_array(window, strategy['entry_conditions'], strategy)
+    exit_mask = evaluate_logic_array(window, strategy['exit_conditions'], strategy)
+    return execute_positions(window, entry_mask, exit_mask, strategy.get('execution'))
+
+# Per-process walk-forward state, set once by the pool initializer
+_walk_forward_state = {}
+
+def _init_walk_forward_worker(index, base, spec_columns, strategies, interval, sort_by):
+    _walk_forward_state.update(
+        index=index, base=base, spec_columns=spec_columns,
+        strategies=strategies, interval=interval, sort_by=sort_by
+    )
+
+def _run_walk_forward_window(window):
+    """Optimize on a window's training bars and score the winner on its test bars."""
+    state = _walk_forward_state
+    train_start, train_end, test_start, test_end = window
+    index = state['index']
+
+    best, best_score = None, None
+    descending = state['sort_by'] not in ASCENDING_METRICS
+    for k, strategy in enumerate(state['strategies']):
+        columns = strategy_columns(state['base'], state['spec_columns'], strategy)
+        signal = _slice_signals(columns, strategy, train_start, train_end)
+        frame = pd.DataFrame(
+            {col: values[train_start:train_end] for col, values in state['base'].items()},
+            index=index[train_start:train_end]
+        )
+        score = calculate_metrics(
+            frame, {'signal': signal}, state['interval'], execution=strategy.get('execution'), include_trades=False
+        ).get(state['sort_by'], 0)
+        if best is None or (score > best_score if descending else score < best_score):
+            best, best_score = k, score
+
+    strategy = state['strategies'][best]
+    columns = strategy_columns(state['base'], state['spec_columns'], strategy)
+    signal = _slice_signals(columns, strategy, test_start, test_end)
+    return window, best, best_score, signal
+
+def run_walk_forward(df, strategy, param_ranges, interval, train_bars, test_bars,
+                     anchored=False, sort_by='total_return', max_workers=None,
+                     max_combinations=MAX_SWEEP_COMBINATIONS, max_windows=MAX_WALK_FORWARD_WINDOWS,
+                     progress=None):
+    """Walk-forward optimization over rolling or anchored train/test windows.
+
+    Indicator columns for every parameter combination are computed once over
+    the full series and sliced per window, so training windows start with
+    warmed-up indicators. Windows run in parallel across processes. The
+    out-of-sample test segments are stitched together, with any open position
+    closed at the end of each test window, and scored as one run.
+    """
+    assignments = expand_parameter_grid(strategy, param_ranges, max_combinations) or [{}]
+    strategies = [apply_parameters(strategy, assignment) for assignment in assignments]
+    windows = walk_forward_windows(len(df), train_bars, test_bars, anchored, max_windows)
+    # Parameter assignments never touch the execution model
+    execution = strategy.get('execution')
+
+    base = {col: df[col].to_numpy(dtype=float) for col in PRICE_COLUMNS if col in df.columns}
+    spec_columns = compute_spec_columns(df, strategies)
+
+    results = {}
+    max_workers = pool_workers(max_workers, len(windows))
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_walk_forward_worker,
+        initargs=(df.index, base, spec_columns, strategies, interval, sort_by)
+    ) as executor:
+        futures = [executor.submit(_run_walk_forward_window, window) for window in windows]
+        for future in as_completed(futures):
+            window, best, best_score, signal = future.result()
+            results[window] = (best, best_score, signal)
+            if progress:
+                progress(len(results), len(windows))
+
+    oos_start, oos_end = windows[0][2], windows[-1][3]
+    stitched = np.zeros(oos_end - oos_start, dtype=np.int64)
+    window_reports = []
+    for window in windows:
+        best, best_score, signal = results[window]
+        train_start, train_end, test_start, test_end = window
+
+        # Close any position still open when the test window ends
+        signal = signal.copy()
+        if signal.sum() > 0:
+            signal[-1] = -1 if signal[-1] == 0 else 0
+        stitched[test_start - oos_start:test_end - oos_start] = signal
+
+        test_frame = df.iloc[test_start:test_end]
+        test_metrics = calculate_metrics(
+            test_frame, {'signal': signal}, interval, execution=execution, include_trades=False
+        )
+        window_reports.append({
+            'train_start': df.index[train_start].strftime(date_format(interval)),
+            'train_end': df.index[train_end - 1].strftime(date_format(interval)),
+            'test_start': df.index[test_start].strftime(date_format(interval)),
+            'test_end': df.index[test_end - 1].strftime(date_format(interval)),
+            'params': [
+                {'indicator': indicator_type, 'param': param, 'value': value}
+                for (indicator_type, param), value in assignments[best].items()
+            ],
+            'train_score': best_score,
+            'test_metrics': test_metrics
+        })
+
+    return {
+        'sort_by': sort_by,
+        'anchored': anchored,
+        'windows': window_reports,
+        'out_of_sample_metrics': calculate_metrics(
+            df.iloc[oos_start:oos_end], {'signal': stitched}, interval, execution=execution
+        )
+    }
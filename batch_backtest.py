@@ -0,0 +1,155 @@
+"""Command-line batch runner that backtests strategy files against a local OHLCV file.
+
+Strategies are JSON files shaped like an /api/backtest request (or a saved
+strategy with a ``config``); a file may hold a list of them and a directory
+contributes every *.json file in it. They are backtested in batches across
+worker processes, each batch sharing indicator work, and one JSON line is
+written per strategy as soon as its batch finishes.
+
+    python batch_backtest.py strategies/ --data btc_1h.csv --interval 1h > results.jsonl
+    python batch_backtest.py sma.json rsi.json --data bars.parquet --workers 4 --trades
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from backtest import PRICE_COLUMNS, backtest_strategies
+from lazy_imports import lazy_import
+
+pd = lazy_import('pandas')
+
+TIME_COLUMNS = ('Date', 'Datetime', 'Timestamp', 'Time')
+
+def load_bars(path):
+    """Read a CSV or Parquet OHLCV file into a frame indexed by bar time."""
+    if path.endswith(('.parquet', '.pq')):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    # Accept lowercase headers such as open/high/low/close/volume
+    df = df.rename(columns={col: str(col).strip().title() for col in df.columns})
+
+    if not isinstance(df.index, pd.DatetimeIndex):
+        time_columns = [col for col in TIME_COLUMNS if col in df.columns]
+        if not time_columns:
+            raise ValueError(f"{path} has no {'/'.join(TIME_COLUMNS)} column")
+        times = df.pop(time_columns[0])
+        # Numeric timestamps are taken as epoch seconds
+        unit = 's' if pd.api.types.is_numeric_dtype(times) else None
+        df.index = pd.DatetimeIndex(pd.to_datetime(times, unit=unit))
+    df.index.name = 'Date'
+
+    if 'Close' not in df.columns:
+        raise ValueError(f"{path} has no Close column")
+    df = df[[col for col in PRICE_COLUMNS if col in df.columns]].astype(float)
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+def load_strategies(paths):
+    """Collect (name, strategy) pairs from JSON files and directories of them."""
+    strategies = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, '*.json'))) if os.path.isdir(path) else [path]
+        for file in files:
+            with open(file) as f:
+                content = json.load(f)
+            items = content if isinstance(content, list) else [content]
+            base = os.path.splitext(os.path.basename(file))[0]
+            for i, item in enumerate(items):
+                # Saved strategies keep the request under 'config'
+                strategy = item['config'] if 'config' in item and 'indicators' not in item else item
+                name = item.get('name') or (base if len(items) == 1 else f"{base}[{i}]")
+                strategies.append((name, strategy))
+    return strategies
+
+# Per-process batch state, set once by the pool initializer
+_batch_state = {}
+
+def _init_batch_worker(df, interval, include_trades):
+    _batch_state['df'] = df
+    _batch_state['interval'] = interval
+    _batch_state['include_trades'] = include_trades
+
+def _result_line(index, name, metrics):
+    return {'index': index, 'name': name, 'status': 'success', 'metrics': metrics}
+
+def _run_batch(batch):
+    """Backtest a batch of (index, name, strategy) against the shared bars."""
+    df = _batch_state['df']
+    interval = _batch_state['interval']
+    include_trades = _batch_state['include_trades']
+    try:
+        metrics = backtest_strategies(df, [strategy for _, _, strategy in batch], interval, include_trades)
+        return [_result_line(index, name, m) for (index, name, _), m in zip(batch, metrics)]
+    except Exception:
+        pass
+
+    # One invalid strategy fails the shared evaluation; rerun each on its own
+    lines = []
+    for index, name, strategy in batch:
+        try:
+            lines.append(_result_line(index, name, backtest_strategies(df, [strategy], interval, include_trades)[0]))
+        except Exception as e:
+            lines.append({'index': index, 'name': name, 'status': 'error', 'message': str(e)})
+    return lines
+
+def run_batch(df, strategies, interval, out, max_workers=None, batch_size=16, include_trades=False):
+    """Backtest (name, strategy) pairs in parallel, writing a JSON line for each as it finishes.
+
+    Returns the number of strategies that failed.
+    """
+    indexed = [(index, name, strategy) for index, (name, strategy) in enumerate(strategies)]
+    batches = [indexed[i:i + batch_size] for i in range(0, len(indexed), batch_size)]
+    if not batches:
+        return 0
+    max_workers = min(max_workers or os.cpu_count() or 1, len(batches))
+
+    failed = 0
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_batch_worker,
+        initargs=(df, interval, include_trades)
+    ) as executor:
+        futures = [executor.submit(_run_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            for line in future.result():
+                failed += line['status'] == 'error'
+                out.write(json.dumps(line, default=str) + '\n')
+            out.flush()
+    return failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('strategies', nargs='+', help='strategy JSON files or directories of them')
+    parser.add_argument('--data', required=True, help='OHLCV bars as CSV or Parquet')
+    parser.add_argument('--interval', default='1d', help='bar interval, used to annualize returns')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per core)')
+    parser.add_argument('--batch-size', type=int, default=16,
+                        help='strategies per task; a batch computes shared indicators once')
+    parser.add_argument('--trades', action='store_true', help='include each trade in the output')
+    parser.add_argument('--output', help='write JSON lines to this path instead of stdout')
+    args = parser.parse_args(argv)
+
+    df = load_bars(args.data)
+    strategies = load_strategies(args.strategies)
+
+    started = time.perf_counter()
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        failed = run_batch(df, strategies, args.interval, out, args.workers,
+                           max(1, args.batch_size), args.trades)
+    finally:
+        if args.output:
+            out.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(strategies)} strategies on {len(df)} bars in {elapsed:.2f}s "
+          f"({len(strategies) / elapsed if elapsed > 0 else 0:.1f}/s), {failed} failed",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
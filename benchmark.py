@@ -0,0 +1,573 @@
+"""Offline benchmark harness for the backtest pipeline.
+
+Times calculate_indicators, generate_signals and calculate_metrics (and
+optionally the /api/backtest handler) on synthetic OHLCV series, records peak
+memory per stage, writes the results as JSON and compares them against a
+saved baseline. ``--compare`` adds before/after cases that time an
+optimized path against the implementation it replaced.
+
+    python benchmark.py --output bench.json
+    python benchmark.py --sizes 1000 10000 --baseline bench.json --tolerance 0.25
+    python benchmark.py --sizes 10000 --compare multi_strategy
+    python benchmark.py --sizes 100000 --compare leaderboard
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backtest import (
+    calculate_indicators, generate_signals, calculate_metrics, calculate_risk_metrics, backtest_strategies,
+    indicator_spec
+)
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+STRATEGIES = {
+    'sma_cross': {
+        'indicators': [{'type': 'sma', 'params': {'Period': 20}}],
+        'entry_conditions': [{'type': 'indicator-compare', 'indicator': 'sma', 'condition': 'crosses-above'}],
+        'exit_conditions': [{'type': 'indicator-compare', 'indicator': 'sma', 'condition': 'crosses-below'}]
+    },
+    'rsi_threshold': {
+        'indicators': [{'type': 'rsi', 'params': {'Period': 14, 'Overbought': 70, 'Oversold': 30}}],
+        'entry_conditions': [{'type': 'indicator-compare', 'indicator': 'rsi', 'condition': 'crosses-below'}],
+        'exit_conditions': [{'type': 'indicator-compare', 'indicator': 'rsi', 'condition': 'crosses-above'}]
+    },
+    'macd_cross': {
+        'indicators': [{'type': 'macd', 'params': {'Fast Period': 12, 'Slow Period': 26, 'Signal Period': 9}}],
+        'entry_conditions': [{'type': 'indicator-compare', 'indicator': 'macd', 'condition': 'crosses-above'}],
+        'exit_conditions': [{'type': 'indicator-compare', 'indicator': 'macd', 'condition': 'crosses-below'}]
+    },
+    'mixed_chain': {
+        'indicators': [
+            {'type': 'sma', 'params': {'Period': 50}},
+            {'type': 'rsi', 'params': {'Period': 14, 'Overbought': 65, 'Oversold': 35}},
+            {'type': 'macd', 'params': {'Fast Period': 12, 'Slow Period': 26, 'Signal Period': 9}}
+        ],
+        'entry_conditions': [
+            {'type': 'indicator-compare', 'indicator': 'sma', 'condition': 'is-above'},
+            {'type': 'and'},
+            {'type': 'indicator-compare', 'indicator': 'macd', 'condition': 'crosses-above'},
+            {'type': 'or'},
+            {'type': 'indicator-compare', 'indicator': 'rsi', 'condition': 'crosses-below'}
+        ],
+        'exit_conditions': [
+            {'type': 'indicator-compare', 'indicator': 'rsi', 'condition': 'crosses-above'},
+            {'type': 'or'},
+            {'type': 'indicator-compare', 'indicator': 'sma', 'condition': 'crosses-below'}
+        ]
+    }
+}
+
+def synthetic_ohlcv(n, seed=0, freq='h', start='2015-01-01'):
+    """Geometric random-walk OHLCV bars, reproducible for a given seed."""
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.004, n))
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * (1 + spread),
+        'Low': np.minimum(open_, close) * (1 - spread),
+        'Close': close,
+        'Adj Close': close,
+        'Volume': rng.uniform(1e3, 1e5, n)
+    }, index=pd.date_range(start, periods=n, freq=freq, name='Date'))
+
+def _measure(fn, repeats):
+    """Best wall time over ``repeats`` runs, then peak traced memory of one run."""
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak / 1024 / 1024
+
+def _isolate_app():
+    """Point the app's databases and caches at a temporary directory before importing it."""
+    # Keep the app's on-disk caches out of the working tree
+    store_dir = tempfile.mkdtemp()
+    os.environ.setdefault('MARKET_DATA_DB', os.path.join(store_dir, 'market_data.db'))
+    os.environ.setdefault('RESULT_CACHE_DB', os.path.join(store_dir, 'result_cache.db'))
+    os.environ.setdefault('METRICS_DB', os.path.join(store_dir, 'metrics.db'))
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(store_dir, 'strategies.db'))
+    os.environ.setdefault('MARKET_DATA_MMAP_DIR', os.path.join(store_dir, 'bars'))
+    os.environ.setdefault('INDICATOR_STORE_DIR', os.path.join(store_dir, 'indicators'))
+    os.environ.setdefault('PROFILE_DIR', os.path.join(store_dir, 'profiles'))
+    return store_dir
+
+def _api_runner(df):
+    """Build a /api/backtest caller that serves ``df`` from an offline bar store."""
+    store_dir = _isolate_app()
+
+    import app as webapp
+    from indicator_store import IndicatorStore
+    from market_data import BarStore
+
+    webapp.bar_store = BarStore(
+        os.path.join(store_dir, 'bars.db'),
+        downloader=lambda symbol, interval, period=None, start=None: df,
+        clock=lambda: df.index[-1].to_pydatetime()
+    )
+    webapp.result_cache.max_entries = 0
+    # The app's indicator store reads bars from the bar store it was built with;
+    # refresh it up front, as the background refresher would have in production
+    if webapp.indicator_store:
+        webapp.indicator_store = IndicatorStore(
+            os.path.join(store_dir, 'indicators'), webapp.bar_store.history,
+            catalogue=list(webapp.indicator_store.catalogue.values())
+        )
+        webapp.indicator_refresher = None
+        webapp.bar_store.get_bars(webapp.DEFAULT_SYMBOL, 'max', '1h')
+        webapp.indicator_store.refresh(webapp.DEFAULT_SYMBOL, '1h')
+    client = webapp.app.test_client()
+
+    def run(strategy):
+        body = dict(strategy, timeframe={'period': 'max', 'interval': '1h'})
+        response = client.post('/api/backtest', json=body)
+        if response.status_code != 200:
+            raise RuntimeError(response.get_json())
+        return response
+
+    return run
+
+def run_benchmarks(sizes=DEFAULT_SIZES, strategies=None, repeats=3, include_api=False):
+    """Benchmark each stage for every (size, strategy) pair."""
+    strategies = strategies or list(STRATEGIES)
+    results = []
+
+    for size in sizes:
+        df = synthetic_ohlcv(size)
+        api = _api_runner(df) if include_api else None
+
+        for name in strategies:
+            strategy = STRATEGIES[name]
+
+            def indicators():
+                frame = df.copy()
+                for indicator in strategy['indicators']:
+                    frame = calculate_indicators(frame, indicator)
+                return frame
+
+            frame, seconds, peak = _measure(indicators, repeats)
+            results.append({'size': size, 'strategy': name, 'stage': 'calculate_indicators',
+                            'seconds': seconds, 'peak_mb': peak})
+
+            signals, seconds, peak = _measure(lambda: generate_signals(frame, strategy), repeats)
+            results.append({'size': size, 'strategy': name, 'stage': 'generate_signals',
+                            'seconds': seconds, 'peak_mb': peak})
+
+            _, seconds, peak = _measure(lambda: calculate_metrics(frame, signals, '1h'), repeats)
+            results.append({'size': size, 'strategy': name, 'stage': 'calculate_metrics',
+                            'seconds': seconds, 'peak_mb': peak})
+
+            if api:
+                _, seconds, peak = _measure(lambda: api(strategy), repeats)
+                results.append({'size': size, 'strategy': name, 'stage': 'api_backtest',
+                                'seconds': seconds, 'peak_mb': peak})
+
+            print(f"{size:>8} bars  {name:<14} " + '  '.join(
+                f"{r['stage']}={r['seconds'] * 1000:.1f}ms/{r['peak_mb']:.1f}MB"
+                for r in results if r['size'] == size and r['strategy'] == name
+            ), file=sys.stderr)
+
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'repeats': repeats
+        },
+        'results': results
+    }
+
+# Variants of one strategy that share most indicator specs, as in a leaderboard
+MULTI_STRATEGY_VARIANTS = [
+    dict(STRATEGIES['mixed_chain'], execution={'commission': commission})
+    for commission in (0, 0.0005, 0.001, 0.002)
+] + [
+    {
+        'indicators': [{'type': 'sma', 'params': {'Period': period}}],
+        'entry_conditions': STRATEGIES['sma_cross']['entry_conditions'],
+        'exit_conditions': STRATEGIES['sma_cross']['exit_conditions']
+    }
+    for period in (10, 20, 50, 100)
+] + [STRATEGIES['rsi_threshold'], STRATEGIES['macd_cross']] * 4
+
+def compare_multi_strategy(size, repeats):
+    """Many strategies on one dataset: one at a time versus backtest_strategies."""
+    df = synthetic_ohlcv(size)
+    strategies = MULTI_STRATEGY_VARIANTS
+
+    def sequential():
+        results = []
+        for strategy in strategies:
+            frame = df.copy()
+            for indicator in strategy['indicators']:
+                frame = calculate_indicators(frame, indicator)
+            signals = generate_signals(frame, strategy)
+            results.append(calculate_metrics(frame, signals, '1h', execution=strategy.get('execution')))
+        return results
+
+    before, before_seconds, before_peak = _measure(sequential, repeats)
+    after, after_seconds, after_peak = _measure(lambda: backtest_strategies(df, strategies, '1h'), repeats)
+    assert [m['total_return'] for m in before] == [m['total_return'] for m in after]
+    return [
+        {'stage': 'before', 'seconds': before_seconds, 'peak_mb': before_peak, 'strategies': len(strategies)},
+        {'stage': 'after', 'seconds': after_seconds, 'peak_mb': after_peak, 'strategies': len(strategies)}
+    ]
+
+def legacy_calculate_metrics(df, signals, interval):
+    """calculate_metrics as it was before vectorization: one Python pass over the bars."""
+    position = 0
+    trades = []
+    returns = []
+    days_in_market = 0
+    entry_price = None
+    entry_date = None
+
+    for i in range(len(df)):
+        if signals['signal'].iloc[i] == 1 and position == 0:
+            position = 1
+            entry_price = df['Close'].iloc[i]
+            entry_date = df.index[i].strftime('%Y-%m-%d')
+            days_in_market += 1
+        elif signals['signal'].iloc[i] == -1 and position == 1:
+            exit_price = df['Close'].iloc[i]
+            trade_return = (exit_price - entry_price) / entry_price
+            returns.append(trade_return)
+            trades.append({
+                'entry_date': entry_date,
+                'entry_price': round(entry_price, 2),
+                'exit_date': df.index[i].strftime('%Y-%m-%d'),
+                'exit_price': round(exit_price, 2),
+                'return': round(trade_return * 100, 2)
+            })
+            position = 0
+        elif position == 1:
+            days_in_market += 1
+
+    if position == 1:
+        exit_price = df['Close'].iloc[-1]
+        trade_return = (exit_price - entry_price) / entry_price
+        returns.append(trade_return)
+        trades.append({
+            'entry_date': entry_date,
+            'entry_price': round(entry_price, 2),
+            'exit_date': df.index[-1].strftime('%Y-%m-%d'),
+            'exit_price': round(exit_price, 2),
+            'return': round(trade_return * 100, 2)
+        })
+
+    cumulative_returns = np.cumprod(np.array(returns) + 1)
+    running_max = np.maximum.accumulate(cumulative_returns)
+    drawdowns = (cumulative_returns - running_max) / running_max
+    time_in_market_pct = days_in_market / len(df) * 100 if len(df) else 0
+    return {
+        'total_return': round(sum(returns) * 100, 2),
+        'max_drawdown': round(abs(min(drawdowns)) * 100, 2) if len(drawdowns) else 0,
+        'total_trades': len(trades),
+        'trades': trades,
+        **calculate_risk_metrics(returns, time_in_market_pct, 252)
+    }
+
+def compare_metrics(size, repeats):
+    """Trade extraction and equity curve: the per-bar loop versus calculate_metrics."""
+    df = calculate_indicators(synthetic_ohlcv(size), STRATEGIES['sma_cross']['indicators'][0])
+    signals = generate_signals(df, STRATEGIES['sma_cross'])
+
+    before, before_seconds, before_peak = _measure(lambda: legacy_calculate_metrics(df, signals, '1h'), repeats)
+    after, after_seconds, after_peak = _measure(lambda: calculate_metrics(df, signals, '1h'), repeats)
+    assert before['total_trades'] == after['total_trades']
+    return [
+        {'stage': 'before', 'seconds': before_seconds, 'peak_mb': before_peak},
+        {'stage': 'after', 'seconds': after_seconds, 'peak_mb': after_peak}
+    ]
+
+METRIC_COLUMNS = ['total_return', 'sharpe_ratio', 'win_rate', 'risk_adjusted_return',
+                  'max_drawdown', 'total_trades', 'time_in_market']
+TRADES_PER_STRATEGY = 100
+
+def _seed_strategies(path, strategies, normalized):
+    """Write saved strategies with the trades inline as JSON or in their own table."""
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(path)
+    columns = ', '.join(f'{name} REAL' for name in METRIC_COLUMNS)
+    conn.execute(f"CREATE TABLE strategy (id TEXT PRIMARY KEY, name TEXT, config TEXT, {columns}"
+                 f"{'' if normalized else ', trades TEXT'})")
+    conn.execute("CREATE INDEX ix_strategy_total_return_id ON strategy (total_return, id)")
+    if normalized:
+        conn.execute("CREATE TABLE strategy_trade (id INTEGER PRIMARY KEY, strategy_id TEXT, seq INTEGER, "
+                     "entry_date TEXT, entry_price REAL, exit_date TEXT, exit_price REAL, return_pct REAL)")
+        conn.execute("CREATE INDEX ix_strategy_trade_strategy_id ON strategy_trade (strategy_id)")
+
+    config = json.dumps(STRATEGIES['mixed_chain'])
+    for k in range(strategies):
+        strategy_id = f'{k:08d}'
+        trades = [
+            {'entry_date': '2020-01-01 00:00', 'entry_price': round(float(price), 2),
+             'exit_date': '2020-01-02 00:00', 'exit_price': round(float(price) * 1.01, 2), 'return': 1.0}
+            for price in rng.uniform(1e3, 1e5, TRADES_PER_STRATEGY)
+        ]
+        row = [strategy_id, f'strategy {k}', config] + rng.normal(0, 10, len(METRIC_COLUMNS)).tolist()
+        if normalized:
+            conn.execute(f"INSERT INTO strategy VALUES ({', '.join('?' * len(row))})", row)
+            conn.executemany("INSERT INTO strategy_trade VALUES (NULL, ?, ?, ?, ?, ?, ?, ?)", [
+                (strategy_id, seq, t['entry_date'], t['entry_price'], t['exit_date'], t['exit_price'], t['return'])
+                for seq, t in enumerate(trades)
+            ])
+        else:
+            conn.execute(f"INSERT INTO strategy VALUES ({', '.join('?' * (len(row) + 1))})", row + [json.dumps(trades)])
+    conn.commit()
+    return conn
+
+def compare_trade_storage(size, repeats):
+    """Saved trades as a JSON column on each strategy versus a normalized table.
+
+    ``size`` is the total number of stored trades, 100 per strategy. Times one
+    leaderboard page and loading 50 strategies' trades, and reports file sizes.
+    """
+    directory = tempfile.mkdtemp()
+    strategies = max(1, size // TRADES_PER_STRATEGY)
+    legacy = _seed_strategies(os.path.join(directory, 'json.db'), strategies, normalized=False)
+    table = _seed_strategies(os.path.join(directory, 'table.db'), strategies, normalized=True)
+    sizes = {'before': os.path.getsize(os.path.join(directory, 'json.db')),
+             'after': os.path.getsize(os.path.join(directory, 'table.db'))}
+    page = "ORDER BY total_return DESC, id DESC LIMIT 50"
+    ids = [f'{k:08d}' for k in range(0, strategies, max(1, strategies // 50))][:50]
+
+    def legacy_leaderboard():
+        # The model loaded every column, deserializing config and trades per row
+        return [(json.loads(row[2]), json.loads(row[-1])) for row in legacy.execute(f"SELECT * FROM strategy {page}")]
+
+    def table_leaderboard():
+        return [list(row) for row in table.execute(f"SELECT id, name, {', '.join(METRIC_COLUMNS)} FROM strategy {page}")]
+
+    def legacy_trades():
+        return [json.loads(legacy.execute("SELECT trades FROM strategy WHERE id = ?", (i,)).fetchone()[0]) for i in ids]
+
+    def table_trades():
+        return [
+            [
+                {'entry_date': entry_date, 'entry_price': entry_price, 'exit_date': exit_date,
+                 'exit_price': exit_price, 'return': return_pct}
+                for entry_date, entry_price, exit_date, exit_price, return_pct in table.execute(
+                    "SELECT entry_date, entry_price, exit_date, exit_price, return_pct FROM strategy_trade "
+                    "WHERE strategy_id = ? ORDER BY seq", (i,)
+                )
+            ]
+            for i in ids
+        ]
+
+    rows = []
+    for part, before, after in (('leaderboard', legacy_leaderboard, table_leaderboard),
+                                ('strategy_trades', legacy_trades, table_trades)):
+        for stage, fn in (('before', before), ('after', after)):
+            _, seconds, peak = _measure(fn, repeats)
+            rows.append({'part': part, 'stage': stage, 'seconds': seconds, 'peak_mb': peak,
+                         'db_bytes': sizes[stage], 'strategies': strategies})
+    legacy.close()
+    table.close()
+    return rows
+
+def compare_leaderboard(size, repeats):
+    """OFFSET paging versus the keyset cursor of /api/leaderboard.
+
+    ``size`` is the number of saved strategies, one in twenty of them unscored.
+    Times the first page, a page halfway down and the last page, which lies
+    among the unscored strategies; the cursor should cost the same at every depth.
+    """
+    _isolate_app()
+    import app as webapp
+    from sqlalchemy.orm import defer
+
+    Strategy = webapp.Strategy
+    rng = np.random.default_rng(0)
+    scores = rng.normal(0, 10, size)
+    with webapp.app.app_context():
+        webapp.db.session.query(Strategy).delete()
+        webapp.db.session.execute(Strategy.__table__.insert(), [
+            {'id': f'{k:08d}', 'name': f'strategy {k}', 'config': {},
+             'total_return': None if k % 20 == 0 else float(scores[k])}
+            for k in range(size)
+        ])
+        webapp.db.session.commit()
+
+        def offset_page(depth):
+            return Strategy.query.options(defer(Strategy.config)).order_by(
+                Strategy.total_return.desc().nullslast(), Strategy.id.desc()
+            ).offset(depth).limit(webapp.LEADERBOARD_PAGE_SIZE + 1).all()
+
+        rows = []
+        for part, depth in (('first_page', 0), ('middle_page', size // 2),
+                            ('last_page', max(0, size - webapp.LEADERBOARD_PAGE_SIZE))):
+            cursor = None
+            if depth:
+                last = offset_page(depth - 1)[0]
+                cursor = webapp.encode_cursor(last.total_return, last.id)
+
+            def before():
+                return [s.id for s in offset_page(depth)]
+
+            def after():
+                return [s.id for s in webapp.leaderboard_page(
+                    'total_return', cursor, webapp.LEADERBOARD_PAGE_SIZE + 1
+                )]
+
+            before_ids, before_seconds, before_peak = _measure(before, repeats)
+            after_ids, after_seconds, after_peak = _measure(after, repeats)
+            assert before_ids == after_ids
+            rows.append({'part': part, 'stage': 'before', 'seconds': before_seconds, 'peak_mb': before_peak})
+            rows.append({'part': part, 'stage': 'after', 'seconds': after_seconds, 'peak_mb': after_peak})
+    return rows
+
+STORE_INDICATORS = [
+    {'type': 'sma', 'params': {'Period': 20}},
+    {'type': 'ema', 'params': {'Period': 200}},
+    {'type': 'rsi', 'params': {'Period': 14}},
+    {'type': 'macd', 'params': {'Fast Period': 12, 'Slow Period': 26, 'Signal Period': 9}},
+    {'type': 'bb', 'params': {'Period': 20, 'StdDev': 2}},
+    {'type': 'atr', 'params': {'Period': 14}},
+]
+
+def compare_indicator_store(size, repeats):
+    """Recomputing an indicator over a window versus reading it from the indicator store.
+
+    ``size`` is the window, the last bars of a stored history long enough for
+    every indicator's warm-up. Indicators whose warm-up is longer than the
+    window are skipped, as the store cannot serve them.
+    """
+    from indicator_store import IndicatorStore, warmup_bars
+
+    history = synthetic_ohlcv(size + 3000)
+    store = IndicatorStore(tempfile.mkdtemp(), lambda symbol, interval: history, catalogue=STORE_INDICATORS)
+    store.refresh('BENCH', '1h')
+    window = history.iloc[-size:]
+
+    rows = []
+    for config in STORE_INDICATORS:
+        spec = indicator_spec(config)
+        if size <= warmup_bars(spec):
+            continue
+        computed, before_seconds, before_peak = _measure(
+            lambda: calculate_indicators(window[['High', 'Low', 'Close', 'Volume']].copy(), config), repeats
+        )
+        stored, after_seconds, after_peak = _measure(lambda: store.columns('BENCH', '1h', window, config), repeats)
+        for col, values in stored.items():
+            np.testing.assert_allclose(values, computed[col].to_numpy(dtype=float), rtol=1e-9, atol=1e-9)
+        part = '_'.join([config['type']] + [str(value) for value in config['params'].values()])
+        rows.append({'part': part, 'stage': 'before', 'seconds': before_seconds, 'peak_mb': before_peak})
+        rows.append({'part': part, 'stage': 'after', 'seconds': after_seconds, 'peak_mb': after_peak})
+    return rows
+
+# Each case returns a 'before' and an 'after' row for one size, per measured part
+COMPARISONS = {
+    'multi_strategy': compare_multi_strategy,
+    'metrics': compare_metrics,
+    'trade_storage': compare_trade_storage,
+    'leaderboard': compare_leaderboard,
+    'indicator_store': compare_indicator_store,
+}
+
+def run_comparisons(sizes=DEFAULT_SIZES, names=None, repeats=3):
+    """Run the before/after cases, in the same row format as run_benchmarks."""
+    results = []
+    for name in names or list(COMPARISONS):
+        for size in sizes:
+            rows = [
+                dict(row, size=size, strategy=f"{name}/{row.pop('part')}" if 'part' in row else name)
+                for row in COMPARISONS[name](size, repeats)
+            ]
+            results.extend(rows)
+            for before, after in zip(rows[::2], rows[1::2]):
+                extra = (f"  {before['db_bytes'] / 1e6:.1f}MB -> {after['db_bytes'] / 1e6:.1f}MB"
+                         if 'db_bytes' in before else '')
+                print(f"{size:>8}  {before['strategy']:<28} before={before['seconds'] * 1000:.1f}ms  "
+                      f"after={after['seconds'] * 1000:.1f}ms  "
+                      f"({before['seconds'] / after['seconds']:.1f}x){extra}", file=sys.stderr)
+    return results
+
+def compare_to_baseline(current, baseline, tolerance=0.2, min_seconds=0.001):
+    """Return the stages that got slower than the baseline by more than ``tolerance``.
+
+    Stages faster than ``min_seconds`` in the baseline are skipped, since
+    timer noise dominates at that scale.
+    """
+    reference = {
+        (r['size'], r['strategy'], r['stage']): r
+        for r in baseline['results']
+    }
+    regressions = []
+    for r in current['results']:
+        base = reference.get((r['size'], r['strategy'], r['stage']))
+        if base is None or base['seconds'] < min_seconds:
+            continue
+        ratio = r['seconds'] / base['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append({
+                'size': r['size'],
+                'strategy': r['strategy'],
+                'stage': r['stage'],
+                'baseline_seconds': base['seconds'],
+                'seconds': r['seconds'],
+                'ratio': round(ratio, 2)
+            })
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--strategies', nargs='+', choices=sorted(STRATEGIES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--include-api', action='store_true',
+                        help='also time the /api/backtest handler against an offline bar store')
+    parser.add_argument('--compare', nargs='*', choices=sorted(COMPARISONS),
+                        help='also run before/after cases (all of them when no name is given)')
+    parser.add_argument('--output', help='write results JSON to this path')
+    parser.add_argument('--baseline', help='compare against a previously saved results JSON')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown versus the baseline (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.sizes, args.strategies, args.repeats, args.include_api)
+    if args.compare is not None:
+        current['results'].extend(run_comparisons(args.sizes, args.compare, args.repeats))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+    else:
+        json.dump(current, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(current, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['stage']} {r['strategy']} @ {r['size']} bars: "
+                  f"{r['baseline_seconds'] * 1000:.1f}ms -> {r['seconds'] * 1000:.1f}ms ({r['ratio']}x)",
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Reduce long price series to roughly one point per pixel for charting.
+
+``lttb`` (Largest-Triangle-Three-Buckets) keeps the points that best preserve
+the visual shape of the line. ``minmax`` keeps the lowest and highest point of
+each bucket, so every spike survives at the cost of twice the points. Both
+always keep the first and last point and return sorted indices into the
+original series. Values are expected to be finite.
+"""
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+METHODS = ('lttb', 'minmax')
+
+def lttb_indices(x, y, threshold):
+    """Indices of ``threshold`` points chosen by Largest-Triangle-Three-Buckets.
+
+    The loop runs once per output bucket; each step is an array operation over
+    the bucket's points, so the cost is dominated by one pass over the data.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets split the interior points; the first and last points are fixed
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # The third vertex is the mean of the next bucket, or the last point
+        if i + 2 < len(edges):
+            avg_x = x[end:edges[i + 2]].mean()
+            avg_y = y[end:edges[i + 2]].mean()
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+
+        px, py = x[previous], y[previous]
+        area = np.abs((px - avg_x) * (y[start:end] - py) - (px - x[start:end]) * (avg_y - py))
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+
+    return selected
+
+def minmax_indices(y, buckets):
+    """Indices of the minimum and maximum of each of ``buckets`` equal buckets.
+
+    Fully vectorized: the series is padded to a whole number of buckets and
+    reshaped so each row is one bucket.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= 2 * buckets or buckets < 1:
+        return np.arange(n)
+
+    size = -(-n // buckets)
+    rows = -(-n // size)
+    # Pad with the last value so padding never becomes a bucket's extreme
+    padded = np.pad(y, (0, rows * size - n), mode='edge').reshape(rows, size)
+    lows = padded.argmin(axis=1)
+    highs = padded.argmax(axis=1)
+    offsets = np.arange(rows) * size
+    indices = np.concatenate([[0, n - 1], offsets + lows, offsets + highs])
+    return np.unique(np.minimum(indices, n - 1))
+
+def select_points(x, y, points, method='lttb'):
+    """Indices of about ``points`` points of the series using ``method``."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    points = int(points)
+    if points < 3:
+        raise ValueError("At least 3 points are required")
+    if method == 'lttb':
+        return lttb_indices(x, y, points)
+    # Each bucket contributes two points
+    return minmax_indices(y, max(1, points // 2))
@@ -0,0 +1,315 @@
+"""Compile strategy condition lists into a deduplicated expression DAG.
+
+A condition list is a chain of conditions joined by ``and``/``or`` items, where
+any condition may be preceded by one or more ``not`` items. ``not`` binds
+tightest, then ``and``, then ``or``. A comparison is unknown on bars where an
+operand is NaN, such as indicator warm-up bars, and ``not`` of an unknown
+value is still False there. Besides the original ``price-level`` and
+``indicator-compare`` conditions, a chain may contain:
+
+    {'type': 'compare', 'left': <operand>, 'condition': 'crosses-above', 'right': <operand>}
+    {'type': 'group', 'conditions': [<chain>]}
+
+An operand is a number, ``{'value': 70}``, ``{'price': 'close'}`` or
+``{'indicator': 'bb', 'field': 'upper'}``. An indicator operand refers to the
+first indicator of that type in the strategy, or to the one whose params match
+the operand's ``params`` when several are configured.
+
+Every node is interned by its structure, so a subexpression that appears in
+several places (or in both the entry and exit chains) is evaluated once.
+"""
+import json
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+CONDITIONS = ('crosses-above', 'crosses-below', 'is-above', 'is-below')
+
+PRICE_FIELDS = {
+    'open': 'Open',
+    'high': 'High',
+    'low': 'Low',
+    'close': 'Close',
+    'volume': 'Volume',
+}
+
+def indicator_fields(config):
+    """Map each output field of an indicator config to its column name.
+
+    The first field is the one used when an operand does not name a field.
+    """
+    indicator_type = config['type'].lower()
+    params = config.get('params', {})
+
+    if indicator_type == 'sma':
+        return {'value': f"SMA_{params.get('Period', 20)}"}
+    elif indicator_type == 'ema':
+        return {'value': f"EMA_{params.get('Period', 20)}"}
+    elif indicator_type == 'rsi':
+        return {'value': f"RSI_{params.get('Period', 14)}"}
+    elif indicator_type == 'macd':
+        return {'macd': 'MACD', 'signal': 'MACD_Signal'}
+    elif indicator_type == 'bb':
+        return {'middle': 'BB_Middle', 'upper': 'BB_Upper', 'lower': 'BB_Lower'}
+    elif indicator_type == 'stoch':
+        return {'k': 'Stoch_K', 'd': 'Stoch_D'}
+    elif indicator_type == 'atr':
+        return {'value': 'ATR'}
+    elif indicator_type == 'obv':
+        return {'value': 'OBV'}
+    elif indicator_type == 'vwap':
+        return {'value': 'VWAP'}
+    raise ValueError(f"Unknown indicator: {config['type']}")
+
+def _config_key(config):
+    return json.dumps([config['type'].lower(), config.get('params', {})], sort_keys=True, default=str)
+
+class ExpressionDAG:
+    """Interned expression nodes shared by any number of condition chains.
+
+    ``add`` compiles a chain and returns its root node id; ``evaluate`` computes
+    a set of roots over the same bars, visiting each distinct node once.
+    Nodes are created after their children, so ids are a topological order.
+    """
+
+    FALSE = 0
+
+    def __init__(self):
+        self.nodes = [('false',)]
+        self.payloads = [None]
+        self._ids = {('false',): self.FALSE}
+
+    def _intern(self, key, payload=None):
+        node_id = self._ids.get(key)
+        if node_id is None:
+            node_id = len(self.nodes)
+            self.nodes.append(key)
+            self.payloads.append(payload)
+            self._ids[key] = node_id
+        return node_id
+
+    # Node constructors
+
+    def const(self, value):
+        return self._intern(('const', float(value)))
+
+    def column(self, column, config=None):
+        # Columns from different indicator configs may share a name, so the
+        # config is part of the key and is handed to the resolver
+        return self._intern(('column', column, _config_key(config) if config else None), config)
+
+    def compare(self, left, condition, right):
+        if condition not in CONDITIONS:
+            raise ValueError(f"Unknown condition: {condition}")
+        return self._intern(('compare', condition, left, right))
+
+    def negate(self, node_id):
+        if self.nodes[node_id][0] == 'not':
+            return self.nodes[node_id][1]
+        return self._intern(('not', node_id))
+
+    def _combine(self, op, node_ids):
+        # Flatten nested and/or and sort the operands, so a & b and b & a share a node
+        operands = set()
+        for node_id in node_ids:
+            if self.nodes[node_id][0] == op:
+                operands.update(self.nodes[node_id][1:])
+            else:
+                operands.add(node_id)
+        if op == 'and' and self.FALSE in operands:
+            return self.FALSE
+        if op == 'or':
+            operands.discard(self.FALSE)
+        if not operands:
+            return self.FALSE
+        if len(operands) == 1:
+            return operands.pop()
+        return self._intern((op,) + tuple(sorted(operands)))
+
+    # Parsing
+
+    def add(self, components, strategy):
+        """Compile a condition chain and return its root node id."""
+        or_terms = []
+        and_terms = []
+        negated = False
+        expect_condition = True
+
+        for component in components or []:
+            kind = component.get('type')
+            if kind == 'not':
+                if not expect_condition:
+                    raise ValueError("'not' must come before a condition")
+                negated = not negated
+                continue
+
+            if kind in ('and', 'or'):
+                if expect_condition:
+                    raise ValueError(f"'{kind}' must follow a condition")
+                if kind == 'or':
+                    or_terms.append(self._combine('and', and_terms))
+                    and_terms = []
+                expect_condition = True
+                continue
+
+            if not expect_condition:
+                raise ValueError("Conditions must be joined by 'and' or 'or'")
+            node_id = self._condition(component, strategy)
+            and_terms.append(self.negate(node_id) if negated else node_id)
+            negated = False
+            expect_condition = False
+
+        # A trailing operator is ignored, as the per-bar evaluator always did
+        if and_terms:
+            or_terms.append(self._combine('and', and_terms))
+        return self._combine('or', or_terms)
+
+    def _condition(self, component, strategy):
+        kind = component.get('type')
+        if kind == 'group':
+            return self.add(component.get('conditions', []), strategy)
+
+        if kind == 'compare':
+            return self.compare(
+                self._operand(component['left'], strategy),
+                component['condition'],
+                self._operand(component['right'], strategy)
+            )
+
+        condition = component.get('condition')
+        if condition not in CONDITIONS:
+            return self.FALSE
+
+        if kind == 'price-level':
+            value = component.get('params', {}).get('Value', 0)
+            return self.compare(self.column('Close'), condition, self.const(value))
+
+        if kind == 'indicator-compare':
+            indicator = component['indicator']
+            config = next((ind for ind in strategy['indicators'] if ind['type'] == indicator), None)
+            if not config or indicator not in ('sma', 'ema', 'vwap', 'rsi', 'macd'):
+                return self.FALSE
+            fields = indicator_fields(config)
+
+            if indicator in ('sma', 'ema', 'vwap'):
+                return self.compare(self.column('Close'), condition, self.column(fields['value'], config))
+            elif indicator == 'rsi':
+                # Upward conditions test the overbought level, downward ones the oversold level
+                params = config.get('params', {})
+                upward = condition in ('crosses-above', 'is-above')
+                threshold = params.get('Overbought', 70) if upward else params.get('Oversold', 30)
+                return self.compare(self.column(fields['value'], config), condition, self.const(threshold))
+            elif indicator == 'macd':
+                return self.compare(
+                    self.column(fields['macd'], config), condition, self.column(fields['signal'], config)
+                )
+
+        raise ValueError(f"Unknown condition type: {kind}")
+
+    def _operand(self, operand, strategy):
+        if isinstance(operand, (int, float)):
+            return self.const(operand)
+        if 'value' in operand:
+            return self.const(operand['value'])
+        if 'price' in operand:
+            field = operand['price'].lower()
+            if field not in PRICE_FIELDS:
+                raise ValueError(f"Unknown price field: {operand['price']}")
+            return self.column(PRICE_FIELDS[field])
+        if 'indicator' in operand:
+            config = self._find_indicator(operand, strategy)
+            fields = indicator_fields(config)
+            field = operand.get('field', next(iter(fields)))
+            if field not in fields:
+                raise ValueError(f"Unknown field '{field}' for indicator {operand['indicator']}")
+            return self.column(fields[field], config)
+        raise ValueError(f"Invalid operand: {operand}")
+
+    def _find_indicator(self, operand, strategy):
+        wanted = operand.get('params', {})
+        for config in strategy['indicators']:
+            if config['type'] != operand['indicator']:
+                continue
+            params = config.get('params', {})
+            if all(params.get(name) == value for name, value in wanted.items()):
+                return config
+        raise ValueError(f"Indicator {operand['indicator']} with params {wanted} is not part of the strategy")
+
+    # Evaluation
+
+    def evaluate(self, roots, resolve, n):
+        """Evaluate root nodes over n bars, returning one boolean array per root.
+
+        ``resolve(config, column)`` returns the values of a column; ``config``
+        is None for price columns.
+        """
+        needed = set()
+        stack = list(roots)
+        while stack:
+            node_id = stack.pop()
+            if node_id in needed:
+                continue
+            needed.add(node_id)
+            key = self.nodes[node_id]
+            if key[0] == 'compare':
+                stack.extend(key[2:])
+            elif key[0] in ('not', 'and', 'or'):
+                stack.extend(key[1:])
+
+        # Boolean nodes also carry a mask of the bars where their value is
+        # known; a comparison is unknown where an operand is NaN, so negating
+        # it cannot turn warm-up bars into signals (Kleene logic)
+        values = {}
+        known = {}
+        prev, curr = slice(None, -1), slice(1, None)
+        for node_id in sorted(needed):
+            key = self.nodes[node_id]
+            op = key[0]
+
+            if op == 'false':
+                values[node_id] = np.zeros(n, dtype=bool)
+                known[node_id] = np.ones(n, dtype=bool)
+            elif op == 'const':
+                values[node_id] = key[1]
+            elif op == 'column':
+                values[node_id] = np.asarray(resolve(self.payloads[node_id], key[1]), dtype=float)
+            elif op == 'compare':
+                condition, left, right = key[1], values[key[2]], values[key[3]]
+                result = np.zeros(n, dtype=bool)
+                valid = np.broadcast_to(~(np.isnan(left) | np.isnan(right)), (n,))
+                # NaN comparisons are False, so warm-up bars never trigger
+                with np.errstate(invalid='ignore'):
+                    if condition == 'crosses-above':
+                        result[1:] = (_at(left, prev) <= _at(right, prev)) & (_at(left, curr) > _at(right, curr))
+                    elif condition == 'crosses-below':
+                        result[1:] = (_at(left, prev) >= _at(right, prev)) & (_at(left, curr) < _at(right, curr))
+                    elif condition == 'is-above':
+                        result[:] = left > right
+                    else:
+                        result[:] = left < right
+                if condition in ('crosses-above', 'crosses-below'):
+                    # A cross needs the previous bar as well
+                    valid = np.concatenate(([False], valid[1:] & valid[:-1]))[:n]
+                values[node_id] = result
+                known[node_id] = valid
+            elif op == 'not':
+                values[node_id] = known[key[1]] & ~values[key[1]]
+                known[node_id] = known[key[1]]
+            elif op in ('and', 'or'):
+                operands = [values[i] for i in key[1:]]
+                all_known = np.logical_and.reduce([known[i] for i in key[1:]])
+                if op == 'and':
+                    values[node_id] = np.logical_and.reduce(operands)
+                    # One known False operand settles a conjunction
+                    decided = np.logical_or.reduce([known[i] & ~values[i] for i in key[1:]])
+                else:
+                    values[node_id] = np.logical_or.reduce(operands)
+                    decided = values[node_id]
+                known[node_id] = all_known | decided
+
+        return [values[root] for root in roots]
+
+def _at(values, index):
+    """Slice an operand that may be a scalar or a per-bar array."""
+    return values[index] if isinstance(values, np.ndarray) else values
@@ -1,4 +1,20 @@
+import os
+
 bind = "0.0.0.0:10000"
 workers = 2
 threads = 4
-timeout = 120 
\ No newline at end of file
+timeout = 120
+
+# Import the app (and run init_db) once in the master, then fork workers that
+# share its memory copy-on-write. Set GUNICORN_PRELOAD=0 to boot each worker
+# separately with heavy libraries loaded on first use.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+def on_starting(server):
+    if server.cfg.preload_app:
+        import app
+        app.warm_up()
+
+def post_worker_init(worker):
+    import app
+    app.start_worker()
@@ -0,0 +1,105 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from backtest import calculate_indicators, indicator_spec
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+INPUT_COLUMNS = ['High', 'Low', 'Close', 'Volume']
+
+def dataset_fingerprint(df):
+    """Hash the bar timestamps and the price columns indicators are computed from."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(df.index.asi8).tobytes())
+    for col in INPUT_COLUMNS:
+        if col in df.columns:
+            digest.update(col.encode())
+            digest.update(np.ascontiguousarray(df[col].to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()
+
+class IndicatorCache:
+    """Bounded LRU of indicator columns keyed by (dataset fingerprint, indicator spec).
+
+    Entries are evicted least-recently-used first once the stored column bytes
+    exceed ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def calculate(self, df, component, fingerprint=None, source=None):
+        """Attach the columns for an indicator to df, computing them only on a miss.
+
+        On a miss ``source(df, component)``, when given, is tried first; it
+        returns the columns as a dict of arrays, or None to compute them.
+        """
+        if fingerprint is None:
+            fingerprint = dataset_fingerprint(df)
+        key = (fingerprint, indicator_spec(component))
+
+        with self._lock:
+            columns = self._entries.get(key)
+            if columns is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if columns is None and source is not None:
+            columns = source(df, component)
+            if columns is not None:
+                self._store(key, columns)
+        if columns is None:
+            inputs = [col for col in INPUT_COLUMNS if col in df.columns]
+            computed = calculate_indicators(df[inputs].copy(), component)
+            columns = {
+                col: computed[col].to_numpy()
+                for col in computed.columns if col not in inputs
+            }
+            self._store(key, columns)
+
+        for col, values in columns.items():
+            df[col] = values
+        return df
+
+    def _store(self, key, columns):
+        size = sum(values.nbytes for values in columns.values())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = columns
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= sum(values.nbytes for values in evicted.values())
+                self.evictions += 1
+
+    def stats(self):
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,331 @@
+"""Indicator columns precomputed over each stored bar history and kept on disk.
+
+Every (symbol, interval) in the bar store gets a directory of raw float64
+column files, one per indicator output, plus the bar inputs they were computed
+from. When bars are appended (or the tail of the history is revised) only the
+rows from the first changed bar onward are recomputed, starting far enough
+back for each indicator to reproduce them, and written in place.
+
+Values served for a request match calculate_indicators run on the
+request's bars alone, the same semantics as every other backtest path: the
+first warm-up rows of the window are computed from the window itself and
+the rest are read from the store, where the earlier history no longer
+affects them.
+"""
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:  # Windows: processes are not serialized
+    fcntl = None
+
+from backtest import calculate_indicators, indicator_spec
+from market_data import epoch_seconds
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+INPUT_COLUMNS = ['High', 'Low', 'Close', 'Volume']
+
+# Only indicators that are slower to recompute than to read back and check
+# against the request's bars; `benchmark.py --compare indicator_store` times
+# recomputing against the store for these and the common moving averages,
+# oscillators and bands, which pandas computes faster than the store serves them
+DEFAULT_CATALOGUE = [
+    {'type': 'atr', 'params': {'Period': 14}},
+]
+
+# Recursive indicators forget their starting point geometrically; resume far
+# enough back that it contributes less than this relative error
+RESUME_TOLERANCE = 1e-12
+
+def _decay_bars(alpha):
+    return int(math.ceil(math.log(RESUME_TOLERANCE) / math.log(1 - alpha)))
+
+def warmup_bars(spec):
+    """Bars after which an indicator no longer depends on where its input started.
+
+    An incremental recompute starts this far before the first changed row,
+    and a window's first this many rows are computed from the window. None
+    means the indicator depends on the whole history; such indicators are
+    not stored.
+    """
+    indicator_type, params = spec
+    params = dict(params)
+    if indicator_type in ('sma', 'bb'):
+        return params['Period']
+    if indicator_type == 'ema':
+        return params['Period'] + _decay_bars(2 / (params['Period'] + 1))
+    if indicator_type in ('rsi', 'atr'):
+        return params['Period'] + 1 + _decay_bars(1 / params['Period'])
+    if indicator_type == 'macd':
+        slow = max(params['Fast Period'], params['Slow Period'])
+        return (slow + _decay_bars(2 / (slow + 1))
+                + params['Signal Period'] + _decay_bars(2 / (params['Signal Period'] + 1)))
+    if indicator_type == 'stoch':
+        return params['K Period'] + params['D Period']
+    if indicator_type == 'vwap':
+        return 14
+    return None
+
+def _spec_name(spec):
+    indicator_type, params = spec
+    return '_'.join([indicator_type] + [str(value) for _, value in params])
+
+def _first_difference(old, new):
+    """Index of the first row where two equally long arrays differ, NaN equal to NaN."""
+    differs = (old != new) & ~(np.isnan(old) & np.isnan(new)) if old.dtype.kind == 'f' else old != new
+    changed = np.flatnonzero(differs)
+    return int(changed[0]) if len(changed) else len(old)
+
+class IndicatorStore:
+    """On-disk indicator columns for a catalogue of indicator configs.
+
+    ``bar_source(symbol, interval)`` returns the full stored history as a
+    DataFrame, or None. Writers hold an exclusive lock per history and
+    readers a shared one, so a reader never sees a half-written update;
+    readers copy out only the rows of their window. Construction does no I/O
+    and touches none of the lazily imported libraries, so the web app can
+    build a store at import time.
+    """
+
+    def __init__(self, directory, bar_source, catalogue=DEFAULT_CATALOGUE):
+        self.directory = directory
+        self.bar_source = bar_source
+        self.catalogue = {
+            indicator_spec(config): config for config in catalogue
+            if warmup_bars(indicator_spec(config)) is not None
+        }
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.rows_computed = 0
+        self._lock = threading.Lock()
+
+    def covers(self, component):
+        return indicator_spec(component) in self.catalogue
+
+    def serves(self, component, bars):
+        """Whether columns() can serve a catalogue indicator for a window of ``bars`` rows."""
+        spec = indicator_spec(component)
+        return spec in self.catalogue and bars > warmup_bars(spec)
+
+    def _key_dir(self, symbol, interval):
+        return os.path.join(self.directory, f"{quote(symbol, safe='')}_{interval}")
+
+    @contextmanager
+    def _locked(self, key_dir, exclusive):
+        os.makedirs(key_dir, exist_ok=True)
+        with open(os.path.join(key_dir, '.lock'), 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _read_meta(self, key_dir):
+        try:
+            with open(os.path.join(key_dir, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, key_dir, meta):
+        path = os.path.join(key_dir, 'meta.json')
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def _read_column(self, key_dir, name, dtype='<f8', start=0, count=-1):
+        path = os.path.join(key_dir, name)
+        return np.fromfile(path, dtype=dtype, count=count, offset=start * np.dtype(dtype).itemsize)
+
+    def _map_column(self, key_dir, name, rows, dtype='<f8'):
+        # Callers hold the history's lock while they read the map
+        return np.memmap(os.path.join(key_dir, name), dtype=dtype, mode='r', shape=(rows,))
+
+    def _write_column(self, key_dir, name, values, start, dtype='<f8'):
+        # Rows before ``start`` are unchanged; overwrite the rest and trim any excess
+        path = os.path.join(key_dir, name)
+        itemsize = np.dtype(dtype).itemsize
+        with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+            f.seek(start * itemsize)
+            f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            f.truncate((start + len(values)) * itemsize)
+
+    def refresh(self, symbol, interval):
+        """Bring a history's columns up to date with its bars; returns rows recomputed."""
+        bars = self.bar_source(symbol, interval)
+        if bars is None or bars.empty:
+            return 0
+
+        key_dir = self._key_dir(symbol, interval)
+        inputs = {'ts': epoch_seconds(bars.index)}
+        for col in INPUT_COLUMNS:
+            values = bars[col].to_numpy(dtype=float) if col in bars.columns else np.full(len(bars), np.nan)
+            inputs[col] = values
+        n = len(bars)
+
+        with self._locked(key_dir, exclusive=True):
+            meta = self._read_meta(key_dir)
+            start = 0
+            if meta and meta['catalogue'] == sorted(_spec_name(spec) for spec in self.catalogue):
+                # First bar that is new or differs from the ones the columns were built on
+                start = min(meta['rows'], n)
+                for col, values in inputs.items():
+                    stored = self._read_column(key_dir, f'input.{col}', '<i8' if col == 'ts' else '<f8', count=start)
+                    start = min(start, _first_difference(stored, values[:start]))
+                if start == n and meta['rows'] == n:
+                    return 0
+
+            frame = pd.DataFrame({col: inputs[col] for col in INPUT_COLUMNS})
+            specs = {}
+            for spec, config in self.catalogue.items():
+                begin = max(0, start - warmup_bars(spec))
+                computed = calculate_indicators(frame.iloc[begin:].reset_index(drop=True), config)
+                columns = [col for col in computed.columns if col not in INPUT_COLUMNS]
+                for col in columns:
+                    values = computed[col].to_numpy(dtype=float)[start - begin:]
+                    self._write_column(key_dir, f'{_spec_name(spec)}.{col}', values, start)
+                specs[_spec_name(spec)] = columns
+
+            for col, values in inputs.items():
+                self._write_column(key_dir, f'input.{col}', values[start:], start, '<i8' if col == 'ts' else '<f8')
+            self._write_meta(key_dir, {
+                'rows': n,
+                'catalogue': sorted(specs),
+                'specs': specs,
+                'updated_at': int(time.time())
+            })
+
+        with self._lock:
+            self.refreshes += 1
+            self.rows_computed += n - start
+        return n - start
+
+    def columns(self, symbol, interval, df, component):
+        """Columns of a catalogue indicator for the bars of ``df``, or None.
+
+        The values are those of calculate_indicators run on ``df``: its first
+        warmup_bars rows are computed from ``df`` and the rest read from the
+        store. None means the window is too short to gain from the store, or
+        the store does not hold exactly these bars, either because it has not
+        caught up with them yet or because they were revised.
+        """
+        spec = indicator_spec(component)
+        if spec not in self.catalogue:
+            return None
+        head = warmup_bars(spec)
+        if len(df) <= head:
+            return None
+
+        key_dir = self._key_dir(symbol, interval)
+        with self._locked(key_dir, exclusive=False):
+            meta = self._read_meta(key_dir)
+            columns = meta['specs'].get(_spec_name(spec)) if meta else None
+            if columns is None:
+                return self._miss()
+
+            # Binary search the mapped timestamps, reading only the pages it visits
+            ts = epoch_seconds(df.index)
+            stored_ts = self._map_column(key_dir, 'input.ts', meta['rows'], '<i8')
+            start = int(np.searchsorted(stored_ts, ts[0]))
+            matches = start + len(df) <= meta['rows'] and np.array_equal(stored_ts[start:start + len(df)], ts)
+            del stored_ts
+            if not matches:
+                return self._miss()
+            for col in INPUT_COLUMNS:
+                if col not in df.columns:
+                    continue
+                stored = self._read_column(key_dir, f'input.{col}', start=start, count=len(df))
+                if not np.array_equal(stored, df[col].to_numpy(dtype=float), equal_nan=True):
+                    return self._miss()
+
+            stored = {
+                col: self._read_column(key_dir, f'{_spec_name(spec)}.{col}', start=start + head, count=len(df) - head)
+                for col in columns
+            }
+
+        computed = calculate_indicators(df.iloc[:head].reset_index(drop=True), self.catalogue[spec])
+        result = {col: np.concatenate([computed[col].to_numpy(dtype=float), stored[col]]) for col in columns}
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'catalogue': len(self.catalogue),
+                'hits': self.hits,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'rows_computed': self.rows_computed
+            }
+
+class IndicatorRefresher:
+    """Background thread that refreshes every stored history on a fixed period.
+
+    ``keys()`` lists the (symbol, interval) pairs to keep current. ``wake()``
+    starts a round early, for a request that found the store behind. When
+    several processes run a refresher, a non-blocking lock lets one of them
+    do each round and the others skip it.
+    """
+
+    def __init__(self, store, keys, interval_seconds=60, logger=None):
+        self.store = store
+        self.keys = keys
+        self.interval_seconds = interval_seconds
+        self.logger = logger
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.interval_seconds > 0:
+            self._thread = threading.Thread(target=self._loop, name='indicator-refresh', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self):
+        self._wake.set()
+
+    def run_once(self):
+        """Refresh every history once, returning {(symbol, interval): rows recomputed}."""
+        os.makedirs(self.store.directory, exist_ok=True)
+        lock_path = os.path.join(self.store.directory, '.refresh.lock')
+        with open(lock_path, 'w') as lock_file:
+            if fcntl:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return {}
+            results = {}
+            for symbol, interval in self.keys():
+                try:
+                    results[(symbol, interval)] = self.store.refresh(symbol, interval)
+                except Exception as e:
+                    if self.logger:
+                        self.logger.error(f"Indicator refresh failed for {symbol} {interval}: {str(e)}")
+            return results
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            if not self._stop.is_set():
+                self.run_once()
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds; the +Inf bucket is implicit
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+class StageHistograms:
+    """Per-stage latency histograms rendered in Prometheus text format.
+
+    With a ``path`` the counts live in a SQLite file, so every gunicorn worker
+    records into and renders the same totals. Without one they are kept per
+    process, and each worker exposes only its own.
+    """
+
+    def __init__(self, name='backtest_stage_seconds', buckets=DEFAULT_BUCKETS, path=None):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self.path = path
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, timeout=30)
+            with conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                # One row per stage and bucket; bucket len(buckets) is +Inf
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS stage_seconds (
+                        name TEXT NOT NULL,
+                        stage TEXT NOT NULL,
+                        bucket INTEGER NOT NULL,
+                        count INTEGER NOT NULL,
+                        total REAL NOT NULL,
+                        PRIMARY KEY (name, stage, bucket)
+                    )
+                """)
+            conn.close()
+
+    def _connection(self):
+        # Every span is a write, so each thread keeps its connection open and
+        # commits without fsync; a forked worker opens its own
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def observe(self, stage, seconds):
+        bucket = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        if self.path:
+            with self._connection() as conn:
+                conn.execute("""
+                    INSERT INTO stage_seconds VALUES (?, ?, ?, 1, ?)
+                    ON CONFLICT (name, stage, bucket) DO UPDATE
+                    SET count = count + 1, total = total + excluded.total
+                """, (self.name, stage, bucket, seconds))
+            return
+        with self._lock:
+            counts, total = self._stages.setdefault(stage, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bucket] += 1
+            total[0] += seconds
+
+    def _snapshot(self):
+        """Return {stage: (count per bucket, total seconds)}."""
+        if not self.path:
+            with self._lock:
+                return {stage: (list(counts), total[0]) for stage, (counts, total) in self._stages.items()}
+        stages = {}
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT stage, bucket, count, total FROM stage_seconds WHERE name = ?", (self.name,)
+            ).fetchall()
+        for stage, bucket, count, total in rows:
+            counts, seconds = stages.get(stage, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bucket] += count
+            stages[stage] = (counts, seconds + total)
+        return stages
+
+    def render(self):
+        """Return the histograms in the Prometheus text exposition format."""
+        lines = [
+            f'# HELP {self.name} Time spent in each stage of a backtest request.',
+            f'# TYPE {self.name} histogram'
+        ]
+        stages = self._snapshot()
+        for stage in sorted(stages):
+            counts, total = stages[stage]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            count = sum(counts)
+            lines.append(f'{self.name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{self.name}_count{{stage="{stage}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+class StageTimer:
+    """Collects named timing spans for one request and feeds the histograms."""
+
+    def __init__(self, histograms=None):
+        self.histograms = histograms
+        self.timings = {}
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        if self.histograms is not None:
+            self.histograms.observe(stage, seconds)
+
+    def as_ms(self):
+        """Return the collected spans in milliseconds."""
+        return {stage: round(seconds * 1000, 3) for stage, seconds in self.timings.items()}
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+def request_hash(payload):
+    """Canonical hash of a request payload, used to deduplicate submissions."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class JobQueue:
+    """Runs backtest jobs on a bounded thread pool and persists their state.
+
+    Job rows live in the application database, so status and results survive a
+    worker restart. ``runner`` is called as runner(payload, progress) and must
+    return a JSON-serializable result.
+
+    A running job records the process that claimed it and a heartbeat that
+    process refreshes every ``heartbeat_seconds``. Only jobs whose heartbeat
+    is older than ``stale_seconds`` are taken over by another process, and a
+    process whose job was taken over discards its result.
+    """
+
+    def __init__(self, app, db, job_model, runner, max_workers=2, heartbeat_seconds=15, stale_seconds=60):
+        self.app = app
+        self.db = db
+        self.job_model = job_model
+        self.runner = runner
+        self.max_workers = max_workers
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self._executor = None
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._heartbeat = None
+        self._lock = threading.Lock()
+
+    @property
+    def owner(self):
+        # Evaluated on use, so a forked worker reports its own pid
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def executor(self):
+        # Created on first use so each forked worker process gets its own pool
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='backtest-job'
+                )
+                self._heartbeat = threading.Event()
+                threading.Thread(
+                    target=self._beat, args=(self._heartbeat,), name='backtest-job-heartbeat', daemon=True
+                ).start()
+            return self._executor
+
+    def _beat(self, stopped):
+        while not stopped.wait(self.heartbeat_seconds):
+            with self._running_lock:
+                job_ids = list(self._running)
+            if not job_ids:
+                continue
+            with self.app.app_context():
+                try:
+                    self.job_model.query.filter(
+                        self.job_model.id.in_(job_ids),
+                        self.job_model.owner == self.owner
+                    ).update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+                    self.db.session.commit()
+                except Exception as e:
+                    self.db.session.rollback()
+                    self.app.logger.error(f"Backtest job heartbeat failed: {str(e)}")
+
+    def submit(self, payload):
+        """Queue a job, returning an identical in-flight job instead if one exists."""
+        digest = request_hash(payload)
+        existing = self.job_model.query.filter(
+            self.job_model.request_hash == digest,
+            self.job_model.status.in_(ACTIVE_STATUSES)
+        ).first()
+        if existing:
+            return existing, False
+
+        job = self.job_model(request_hash=digest, request=payload, status='queued')
+        self.db.session.add(job)
+        self.db.session.commit()
+
+        self.executor.submit(self._run, job.id)
+        return job, True
+
+    def resume_pending(self):
+        """Pick up queued jobs and running jobs whose process stopped heartbeating.
+
+        Safe to call from every worker as it boots: a job another live process
+        is running keeps its owner, and each queued job is claimed by one
+        process only.
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        reclaimed = self.job_model.query.filter(
+            self.job_model.status == 'running',
+            self.db.or_(self.job_model.heartbeat_at.is_(None), self.job_model.heartbeat_at < stale_before)
+        ).update({'status': 'queued', 'owner': None}, synchronize_session=False)
+        self.db.session.commit()
+        if reclaimed:
+            self.app.logger.info(f"Requeued {reclaimed} backtest jobs abandoned by a stopped worker")
+
+        pending = [job_id for job_id, in self.db.session.query(self.job_model.id).filter_by(status='queued')]
+        for job_id in pending:
+            self.executor.submit(self._run, job_id)
+        return len(pending)
+
+    def _update_owned(self, job_id, values):
+        # Writes are dropped once another process has taken the job over
+        updated = self.job_model.query.filter_by(id=job_id, owner=self.owner, status='running').update(
+            dict(values, updated_at=datetime.utcnow()), synchronize_session=False
+        )
+        self.db.session.commit()
+        return updated
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            # Claim the job atomically so two workers never run the same one
+            now = datetime.utcnow()
+            claimed = self.job_model.query.filter_by(id=job_id, status='queued').update(
+                {'status': 'running', 'owner': self.owner, 'heartbeat_at': now, 'updated_at': now},
+                synchronize_session=False
+            )
+            self.db.session.commit()
+            if not claimed:
+                return
+            request = self.db.session.get(self.job_model, job_id).request
+
+            def progress(bars_processed, total_bars, stage):
+                self._update_owned(job_id, {
+                    'bars_processed': bars_processed,
+                    'total_bars': total_bars,
+                    'stage': stage,
+                    'heartbeat_at': datetime.utcnow()
+                })
+
+            with self._running_lock:
+                self._running.add(job_id)
+            try:
+                values = {'result': self.runner(request, progress), 'status': 'completed', 'stage': 'done'}
+            except Exception as e:
+                self.app.logger.error(f"Backtest job {job_id} failed: {str(e)}", exc_info=True)
+                self.db.session.rollback()
+                values = {'status': 'failed', 'error': str(e)}
+            finally:
+                with self._running_lock:
+                    self._running.discard(job_id)
+
+            if not self._update_owned(job_id, values):
+                self.app.logger.warning(f"Backtest job {job_id} was taken over by another worker; result discarded")
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+                self._heartbeat.set()
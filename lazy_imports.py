@@ -0,0 +1,35 @@
+import importlib
+import importlib.util
+import sys
+
+def lazy_import(name):
+    """Return a module that is only executed on first attribute access.
+
+    Lets the web app import without paying for pandas, numpy and ta until a
+    request needs them. A module that is already loaded is returned as is.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+def load_now(*names):
+    """Force lazily imported modules to load, skipping ones that are not installed."""
+    loaded = []
+    for name in names:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            continue
+        # Any attribute access runs a pending lazy load
+        getattr(module, '__file__', None)
+        loaded.append(name)
+    return loaded
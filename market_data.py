@@ -0,0 +1,409 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close']
+
+# yfinance period strings mapped to how far back they reach
+PERIODS = {
+    '1d': timedelta(days=1),
+    '5d': timedelta(days=5),
+    '1mo': timedelta(days=31),
+    '3mo': timedelta(days=92),
+    '6mo': timedelta(days=183),
+    '1y': timedelta(days=366),
+    '2y': timedelta(days=731),
+    '5y': timedelta(days=1827),
+    '10y': timedelta(days=3653),
+}
+
+INTERVALS = {
+    '1m': timedelta(minutes=1),
+    '2m': timedelta(minutes=2),
+    '5m': timedelta(minutes=5),
+    '15m': timedelta(minutes=15),
+    '30m': timedelta(minutes=30),
+    '60m': timedelta(hours=1),
+    '90m': timedelta(minutes=90),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+    '5d': timedelta(days=5),
+    '1wk': timedelta(weeks=1),
+    '1mo': timedelta(days=30),
+    '3mo': timedelta(days=91),
+}
+
+def yf_downloader(symbol, interval, period=None, start=None):
+    """Download bars from Yahoo Finance."""
+    import yfinance as yf  # Deferred so the store can be used offline
+
+    if start is not None:
+        return yf.download(symbol, start=start, interval=interval, progress=False)
+    return yf.download(symbol, period=period, interval=interval, progress=False)
+
+def period_start(period, now):
+    """Return the earliest timestamp a yfinance period covers, or None for 'max'."""
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return datetime(now.year, 1, 1)
+    if period not in PERIODS:
+        raise ValueError(f"Unsupported period: {period}")
+    return now - PERIODS[period]
+
+UNITS_PER_SECOND = {'s': 1, 'ms': 10 ** 3, 'us': 10 ** 6, 'ns': 10 ** 9}
+
+def epoch_seconds(index):
+    """Epoch seconds of a DatetimeIndex as int64; naive timestamps are taken as UTC."""
+    index = pd.DatetimeIndex(index)
+    # asi8 counts units since the epoch in UTC, for naive and aware indexes alike
+    return index.asi8 // UNITS_PER_SECOND[index.unit]
+
+def _normalize_frame(df):
+    """Flatten a downloaded frame to the stored bar columns with a UTC index."""
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    df = df[[col for col in BAR_COLUMNS if col in df.columns]]
+    index = pd.DatetimeIndex(df.index)
+    df = df.set_axis(index.tz_convert('UTC') if index.tz is not None else index.tz_localize('UTC'), axis=0)
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+class CompactBars:
+    """One (symbol, interval) history packed into a single NumPy record array.
+
+    Timestamps are int64 epoch seconds and prices use ``price_dtype`` (float32
+    by default, about 7 significant digits), so a year of 1-minute bars takes
+    roughly 15 MB. The array can be saved as a .npy file and memory-mapped, in
+    which case pages are shared through the OS cache and only the slices a
+    request touches become resident. With float64 prices a mapped history can
+    be handed to the backtest without copying (see to_frame).
+    """
+
+    def __init__(self, records):
+        self.records = records
+
+    @classmethod
+    def from_frame(cls, frame, price_dtype='float32'):
+        columns = [col for col in BAR_COLUMNS if col in frame.columns]
+        dtype = np.dtype([('ts', np.int64)] + [
+            (col, price_dtype if col in PRICE_COLUMNS else np.float64) for col in columns
+        ])
+        records = np.empty(len(frame), dtype=dtype)
+        records['ts'] = (frame.index - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+        for col in columns:
+            records[col] = frame[col].to_numpy(dtype=float)
+        return cls(records)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        # A copy-on-write mapping shares pages with every process mapping the
+        # file, while still giving pandas the writable buffers it expects
+        return cls(np.load(path, mmap_mode='c' if mmap else None))
+
+    def merge(self, other):
+        """Return these bars updated with ``other``'s, which win on equal timestamps."""
+        merged = np.concatenate([self.records, other.records])
+        merged = merged[np.argsort(merged['ts'], kind='stable')]
+        last = np.append(merged['ts'][1:] != merged['ts'][:-1], True)
+        return CompactBars(merged[last])
+
+    def save(self, path):
+        # Write to a temporary file first so readers never see a partial array
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, self.records)
+        os.replace(tmp_path, path)
+
+    @property
+    def nbytes(self):
+        return self.records.nbytes
+
+    def __len__(self):
+        return len(self.records)
+
+    def to_frame(self, start_ts=None, tz_aware=True, copy=True):
+        """Return the bars from ``start_ts`` onward as a float64 DataFrame.
+
+        With ``copy=False`` and float64 prices the frame's columns are strided
+        views of the records, so a memory-mapped history is used in place.
+        Such a frame must be treated as read-only.
+        """
+        ts = self.records['ts']
+        first = 0 if start_ts is None else int(np.searchsorted(ts, start_ts, side='left'))
+        index = pd.DatetimeIndex(pd.to_datetime(ts[first:], unit='s', utc=True), name='Date')
+        if not tz_aware:
+            index = index.tz_localize(None)
+
+        columns = [col for col in self.records.dtype.names if col != 'ts']
+        # structured_to_unstructured cannot shape an empty slice, so no rows take the copy path
+        if not copy and first < len(ts) and all(self.records.dtype[col] == np.float64 for col in columns):
+            from numpy.lib import recfunctions
+            values = recfunctions.structured_to_unstructured(self.records[columns][first:], copy=False)
+            return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+        # Indicators run on float64 copies, so stored precision is the only loss
+        return pd.DataFrame(
+            {col: self.records[col][first:].astype(np.float64) for col in columns},
+            index=index
+        )
+
+class BarStore:
+    """Persistent OHLCV store keyed by (symbol, interval) with an LRU of hot frames.
+
+    Bars live in a SQLite table. A request for any period is answered as a slice
+    of the stored history; only the bars after the last stored one are fetched
+    once the newest bar is older than one interval. Hot histories are kept as
+    CompactBars; with ``memmap_dir`` set they are also written there as .npy
+    files and memory-mapped, so long intraday histories are shared between
+    worker processes instead of being loaded into each one. The first process
+    to need a history writes its file, new bars are merged into it in place
+    of a rebuild, and every process notices a replaced file on its next read.
+    With ``price_dtype='float64'`` frames are served straight from the mapping.
+    """
+
+    def __init__(self, path, downloader=yf_downloader, max_frames=16, clock=datetime.utcnow,
+                 price_dtype='float32', memmap_dir=None):
+        self.path = path
+        self.downloader = downloader
+        self.max_frames = max_frames
+        self.clock = clock
+        self.price_dtype = price_dtype
+        self.memmap_dir = memmap_dir
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if memmap_dir:
+            os.makedirs(memmap_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, adj_close REAL, volume REAL,
+                    PRIMARY KEY (symbol, interval, ts)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bar_coverage (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    covered_from INTEGER,
+                    fetched_at INTEGER NOT NULL,
+                    tz_aware INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, interval)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_bars(self, symbol, period, interval):
+        """Return the bars for a yfinance-style period.
+
+        Frames served from a shared mapping are read-only views; anything else
+        is a private copy.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported interval: {interval}")
+
+        now = self.clock()
+        start = period_start(period, now)
+
+        # One lock per key, so different symbols can download concurrently
+        with self._key_lock(symbol, interval):
+            coverage = self._coverage(symbol, interval)
+            if coverage is None or not self._covers(coverage, start):
+                self._fetch_full(symbol, interval, period, start, now)
+            elif now - datetime.utcfromtimestamp(coverage['fetched_at']) >= INTERVALS[interval]:
+                self._fetch_tail(symbol, interval, now)
+
+            bars, tz_aware = self._bars(symbol, interval)
+
+        start_ts = None if start is None else int(pd.Timestamp(start, tz='UTC').timestamp())
+        return bars.to_frame(start_ts, tz_aware, copy=not self.memmap_dir)
+
+    def history(self, symbol, interval):
+        """Return the full stored history for a key without fetching, or None if it is not stored."""
+        if self._coverage(symbol, interval) is None:
+            return None
+        with self._key_lock(symbol, interval):
+            bars, tz_aware = self._bars(symbol, interval)
+        return bars.to_frame(None, tz_aware, copy=not self.memmap_dir)
+
+    def keys(self):
+        """List the stored (symbol, interval) pairs."""
+        with self._connect() as conn:
+            return [tuple(row) for row in conn.execute(
+                "SELECT symbol, interval FROM bar_coverage ORDER BY symbol, interval"
+            )]
+
+    def _key_lock(self, symbol, interval):
+        with self._lock:
+            return self._key_locks.setdefault((symbol, interval), threading.Lock())
+
+    def _covers(self, coverage, start):
+        if coverage['covered_from'] is None:
+            return True
+        if start is None:
+            return False
+        return coverage['covered_from'] <= int(pd.Timestamp(start, tz='UTC').timestamp())
+
+    def _coverage(self, symbol, interval):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT covered_from, fetched_at, tz_aware FROM bar_coverage WHERE symbol = ? AND interval = ?",
+                (symbol, interval)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'covered_from': row[0], 'fetched_at': row[1], 'tz_aware': bool(row[2])}
+
+    def _fetch_full(self, symbol, interval, period, start, now):
+        raw = self.downloader(symbol, interval, period=period)
+        tz_aware = getattr(raw.index, 'tz', None) is not None
+        df = _normalize_frame(raw)
+        covered_from = None if start is None else int(pd.Timestamp(start, tz='UTC').timestamp())
+
+        with self._connect() as conn:
+            conn.execute("DELETE FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval))
+            self._write_bars(conn, symbol, interval, df)
+            self._write_coverage(conn, symbol, interval, covered_from, now, tz_aware)
+        self._invalidate(symbol, interval)
+
+    def _fetch_tail(self, symbol, interval, now):
+        coverage = self._coverage(symbol, interval)
+        with self._connect() as conn:
+            last_ts = conn.execute(
+                "SELECT MAX(ts) FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval)
+            ).fetchone()[0]
+
+        # Re-fetch from the last stored bar, since it may have been incomplete
+        start = datetime.utcfromtimestamp(last_ts) if last_ts is not None else now - INTERVALS[interval]
+        raw = self.downloader(symbol, interval, start=start.strftime('%Y-%m-%d'))
+        df = _normalize_frame(raw)
+
+        with self._connect() as conn:
+            self._write_bars(conn, symbol, interval, df)
+            self._write_coverage(conn, symbol, interval, coverage['covered_from'], now, coverage['tz_aware'])
+        if not df.empty:
+            self._invalidate(symbol, interval, appended=df)
+
+    def _write_bars(self, conn, symbol, interval, df):
+        if df.empty:
+            return
+        columns = df.reindex(columns=BAR_COLUMNS)
+        timestamps = (df.index - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+        # SQLite stores NaN as NULL, so missing columns round-trip as empty
+        rows = zip(
+            [symbol] * len(df), [interval] * len(df), timestamps.tolist(),
+            *(columns[col].astype(float).tolist() for col in BAR_COLUMNS)
+        )
+        conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def _write_coverage(self, conn, symbol, interval, covered_from, now, tz_aware):
+        conn.execute(
+            "INSERT OR REPLACE INTO bar_coverage VALUES (?, ?, ?, ?, ?)",
+            (symbol, interval, covered_from, int(pd.Timestamp(now, tz='UTC').timestamp()), int(tz_aware))
+        )
+
+    def _memmap_path(self, symbol, interval):
+        return os.path.join(self.memmap_dir, f"{quote(symbol, safe='')}_{interval}.npy")
+
+    def _file_stamp(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _invalidate(self, symbol, interval, appended=None):
+        with self._lock:
+            self._frames.pop((symbol, interval), None)
+        if not self.memmap_dir:
+            return
+
+        # Merge freshly appended bars into the shared file rather than making
+        # the next reader rebuild the whole history from SQLite
+        path = self._memmap_path(symbol, interval)
+        if appended is not None and os.path.exists(path):
+            bars = CompactBars.load(path)
+            tail = CompactBars.from_frame(appended, self.price_dtype)
+            if tail.records.dtype == bars.records.dtype:
+                bars.merge(tail).save(path)
+                return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _bars(self, symbol, interval):
+        """Return the full stored history for a key, loading it into the LRU if needed."""
+        key = (symbol, interval)
+        tz_aware = self._coverage(symbol, interval)['tz_aware']
+        memmap_path = self._memmap_path(symbol, interval) if self.memmap_dir else None
+        # Another process may have replaced the shared file since it was mapped
+        stamp = self._file_stamp(memmap_path) if memmap_path else None
+        with self._lock:
+            if key in self._frames and self._frames[key][1] == stamp:
+                self._frames.move_to_end(key)
+                return self._frames[key][0], tz_aware
+
+        if stamp is not None:
+            bars = CompactBars.load(memmap_path)
+        else:
+            bars = CompactBars.from_frame(self._read_frame(symbol, interval), self.price_dtype)
+            if memmap_path:
+                bars.save(memmap_path)
+                stamp = self._file_stamp(memmap_path)
+                bars = CompactBars.load(memmap_path)
+
+        with self._lock:
+            self._frames[key] = (bars, stamp)
+            if len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+        return bars, tz_aware
+
+    def _read_frame(self, symbol, interval):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT ts, open, high, low, close, adj_close, volume FROM bars "
+                "WHERE symbol = ? AND interval = ? ORDER BY ts",
+                (symbol, interval)
+            ).fetchall()
+
+        frame = pd.DataFrame(rows, columns=['ts'] + BAR_COLUMNS)
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop('ts'), unit='s', utc=True))
+        frame.index.name = 'Date'
+        return frame.dropna(axis=1, how='all')
+
+    def get_many(self, symbols, period, interval, max_workers=8):
+        """Load several symbols concurrently, returning {symbol: frame or exception}."""
+        def load(symbol):
+            try:
+                return self.get_bars(symbol, period, interval)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as executor:
+            return dict(zip(symbols, executor.map(load, symbols)))
+
+    def clear_memory(self):
+        """Drop the in-process LRU, keeping the on-disk store."""
+        with self._lock:
+            self._frames.clear()
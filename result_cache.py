@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from backtest import ENGINE_VERSION
+
+# Bump when the results table changes; older cache files are emptied on open
+SCHEMA_VERSION = 2
+
+def strategy_key(data, symbol, period, interval):
+    """Canonical hash of the parts of a request, and the engine version, that determine its result."""
+    normalized = {
+        'engine': ENGINE_VERSION,
+        'indicators': data.get('indicators', []),
+        'entry_conditions': data.get('entry_conditions', []),
+        'exit_conditions': data.get('exit_conditions', []),
+        'execution': data.get('execution'),
+        'symbol': symbol,
+        'period': period,
+        'interval': interval,
+        'equity_curve_points': data.get('equity_curve_points', 0),
+    }
+    canonical = json.dumps(normalized, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class ResultCache:
+    """Bounded cache of full backtest responses shared across worker processes.
+
+    Entries are keyed by the strategy hash plus the timestamp of the last bar
+    of the dataset, so a new bar arriving makes older entries unreachable;
+    they are dropped on the next write for the same strategy. Each entry also
+    records the dataset fingerprint, so revised bars with an unchanged last
+    timestamp are a miss rather than a stale hit. Storage is a
+    SQLite file, so every gunicorn worker sees the same entries and counters.
+    """
+
+    def __init__(self, path, max_entries=1000):
+        self.path = path
+        self.max_entries = max_entries
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS results")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    strategy_hash TEXT NOT NULL,
+                    last_bar INTEGER NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (strategy_hash, last_bar)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_results_accessed_at ON results (accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.executemany(
+                "INSERT OR IGNORE INTO counters VALUES (?, 0)",
+                [('hits',), ('misses',), ('evictions',)]
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _bump(self, conn, name, amount=1):
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def get(self, strategy_hash, last_bar, fingerprint):
+        """Return the cached response for a strategy and dataset, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload FROM results WHERE strategy_hash = ? AND last_bar = ? AND fingerprint = ?",
+                (strategy_hash, last_bar, fingerprint)
+            ).fetchone()
+            if row is None:
+                self._bump(conn, 'misses')
+                return None
+
+            conn.execute(
+                "UPDATE results SET accessed_at = ? WHERE strategy_hash = ? AND last_bar = ?",
+                (time.time(), strategy_hash, last_bar)
+            )
+            self._bump(conn, 'hits')
+        return json.loads(row[0])
+
+    def put(self, strategy_hash, last_bar, fingerprint, payload):
+        """Store a response, dropping stale entries for the same strategy."""
+        with self._connect() as conn:
+            stale = conn.execute(
+                "DELETE FROM results WHERE strategy_hash = ? AND last_bar < ?",
+                (strategy_hash, last_bar)
+            ).rowcount
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (strategy_hash, last_bar, fingerprint, json.dumps(payload, default=float), time.time())
+            )
+            evicted = conn.execute("""
+                DELETE FROM results WHERE rowid IN (
+                    SELECT rowid FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,)).rowcount
+            self._bump(conn, 'evictions', stale + evicted)
+
+    def stats(self):
+        """Return hit/miss counters aggregated across all processes."""
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'hit_rate': round(counters['hits'] / lookups * 100, 2) if lookups else 0,
+            'evictions': counters['evictions'],
+            'entries': entries,
+            'max_entries': self.max_entries
+        }
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results")
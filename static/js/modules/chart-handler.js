@@ -1,6 +1,20 @@
+// Epoch milliseconds for the date strings used in trades ('YYYY-MM-DD' or 'YYYY-MM-DD HH:MM', UTC)
+function toTime(date) {
+    if (typeof date === 'number') return date;
+    const iso = String(date).replace(' ', 'T');
+    return Date.parse(iso.length > 10 && !iso.endsWith('Z') ? iso + 'Z' : iso);
+}
+
+function formatTime(ms, withTime) {
+    const iso = new Date(ms).toISOString();
+    return withTime ? iso.slice(0, 16).replace('T', ' ') : iso.slice(0, 10);
+}
+
 export class ChartHandler {
     constructor() {
         this.priceChart = null;
+        // Visible window in epoch seconds; null shows the whole history
+        this.zoomRange = null;
         this.initialize();
     }
 
@@ -11,20 +25,25 @@ export class ChartHandler {
         this.priceChart = new Chart(ctx, {
             type: 'line',
             data: {
-                labels: [],
                 datasets: [{
                     label: 'BTC-USD',
                     data: [],
                     borderColor: 'rgb(75, 192, 192)',
+                    pointRadius: 0,
                     tension: 0.1,
                     fill: false
                 }]
             },
             options: {
                 responsive: true,
+                // Points arrive as sorted {x, y} pairs already downsampled by the server
+                parsing: false,
+                normalized: true,
+                animation: false,
                 interaction: {
                     intersect: false,
-                    mode: 'index'
+                    mode: 'nearest',
+                    axis: 'x'
                 },
                 plugins: {
                     title: {
@@ -33,6 +52,7 @@ export class ChartHandler {
                     },
                     tooltip: {
                         callbacks: {
+                            title: (items) => items.length ? formatTime(items[0].parsed.x, this.showsTime()) : '',
                             label: function(context) {
                                 return `$${context.parsed.y.toLocaleString()}`;
                             }
@@ -40,6 +60,13 @@ export class ChartHandler {
                     }
                 },
                 scales: {
+                    x: {
+                        type: 'linear',
+                        ticks: {
+                            maxTicksLimit: 8,
+                            callback: (value) => formatTime(value, this.showsTime())
+                        }
+                    },
                     y: {
                         beginAtZero: false,
                         ticks: {
@@ -53,20 +80,35 @@ export class ChartHandler {
         });
 
         this.setupTimeframeHandlers();
+        this.setupZoomHandlers();
         this.fetchInitialData();
     }
 
+    showsTime() {
+        const interval = document.getElementById('timeframe-interval')?.value || '1d';
+        return /^\d+[mh]$/.test(interval);
+    }
+
     async fetchPriceData() {
         const timeframePeriod = document.getElementById('timeframe-period')?.value || '1y';
         const timeframeInterval = document.getElementById('timeframe-interval')?.value || '1d';
 
         console.log(`Fetching price data for period: ${timeframePeriod}, interval: ${timeframeInterval}`);
 
+        // Ask for about one point per pixel; the server downsamples anything longer
+        const params = {
+            period: timeframePeriod,
+            interval: timeframeInterval,
+            format: 'columns',
+            width: Math.max(100, Math.round(this.priceChart.canvas.clientWidth || 1000))
+        };
+        if (this.zoomRange) {
+            params.start = this.zoomRange.start;
+            params.end = this.zoomRange.end;
+        }
+
         try {
-            const response = await fetch('/api/fetch-btc-data?' + new URLSearchParams({
-                period: timeframePeriod,
-                interval: timeframeInterval
-            }));
+            const response = await fetch('/api/fetch-btc-data?' + new URLSearchParams(params));
             const data = await response.json();
             this.updateChart(data);
         } catch (error) {
@@ -76,14 +118,53 @@ export class ChartHandler {
 
     updateChart(data) {
         if (!this.priceChart) return;
+        if (data.status === 'error') {
+            console.error('Error fetching price data:', data.message);
+            return;
+        }
 
-        console.log(`Updating chart with ${data.labels?.length || 0} data points`);
+        console.log(`Updating chart with ${data.points} of ${data.total_points} data points`);
 
-        this.priceChart.data.labels = data.labels;
-        this.priceChart.data.datasets[0].data = data.prices;
+        const timestamps = data.timestamps;
+        this.priceChart.data.datasets[0].data = data.prices.map((price, i) => ({
+            x: timestamps[i] * 1000,
+            y: price
+        }));
+        const xScale = this.priceChart.options.scales.x;
+        xScale.min = this.zoomRange ? this.zoomRange.start * 1000 : undefined;
+        xScale.max = this.zoomRange ? this.zoomRange.end * 1000 : undefined;
         this.priceChart.update();
     }
 
+    setupZoomHandlers() {
+        // Drag across the chart to zoom into a range, double-click to zoom back out
+        const canvas = this.priceChart.canvas;
+        let dragStart = null;
+
+        canvas.addEventListener('mousedown', (event) => {
+            dragStart = event.offsetX;
+        });
+        canvas.addEventListener('mouseup', (event) => {
+            if (dragStart === null) return;
+            const left = Math.min(dragStart, event.offsetX);
+            const right = Math.max(dragStart, event.offsetX);
+            dragStart = null;
+            if (right - left < 5) return;
+
+            const xScale = this.priceChart.scales.x;
+            this.zoomRange = {
+                start: Math.floor(xScale.getValueForPixel(left) / 1000),
+                end: Math.ceil(xScale.getValueForPixel(right) / 1000)
+            };
+            this.fetchPriceData();
+        });
+        canvas.addEventListener('dblclick', () => {
+            if (!this.zoomRange) return;
+            this.zoomRange = null;
+            this.fetchPriceData();
+        });
+    }
+
     addTradeMarkers(trades) {
         if (!this.priceChart) {
             console.warn('Chart not initialized');
@@ -101,7 +182,7 @@ export class ChartHandler {
         const buyMarkers = {
             label: 'Entry Points',
             data: trades.map(t => ({
-                x: t.entry_date,
+                x: toTime(t.entry_date),
                 y: t.entry_price
             })),
             backgroundColor: 'rgb(34, 197, 94)', // green-500
@@ -115,7 +196,7 @@ export class ChartHandler {
         const sellMarkers = {
             label: 'Exit Points',
             data: trades.map(t => ({
-                x: t.exit_date,
+                x: toTime(t.exit_date),
                 y: t.exit_price
             })),
             backgroundColor: 'rgb(239, 68, 68)', // red-500
@@ -150,11 +231,15 @@ export class ChartHandler {
         const timeframePeriodEl = document.getElementById('timeframe-period');
         const timeframeIntervalEl = document.getElementById('timeframe-interval');
 
+        const reload = () => {
+            this.zoomRange = null;
+            this.fetchPriceData();
+        };
         if (timeframePeriodEl) {
-            timeframePeriodEl.addEventListener('change', () => this.fetchPriceData());
+            timeframePeriodEl.addEventListener('change', reload);
         }
         if (timeframeIntervalEl) {
-            timeframeIntervalEl.addEventListener('change', () => this.fetchPriceData());
+            timeframeIntervalEl.addEventListener('change', reload);
         }
     }
 
@@ -0,0 +1,401 @@
+import math
+from collections import deque
+
+from backtest import (
+    compile_strategy, date_format, summarize_trades, execution_settings, entry_fill, exit_fill,
+    trade_returns, mark_to_market, exit_levels, level_hits, level_exit_prices
+)
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+NAN = float('nan')
+
+def _div(numerator, denominator):
+    """Float division with pandas semantics for a zero denominator."""
+    if denominator == 0:
+        if numerator == 0 or math.isnan(numerator):
+            return NAN
+        return math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+class _RollingSum:
+    """Compensated (Kahan) sum over a fixed window of values."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def _add(self, x):
+        y = x - self.compensation
+        t = self.total + y
+        self.compensation = (t - self.total) - y
+        self.total = t
+
+    def update(self, x):
+        self.values.append(x)
+        self._add(x)
+        if len(self.values) > self.window:
+            self._add(-self.values.popleft())
+
+    @property
+    def full(self):
+        return len(self.values) == self.window
+
+    def sum(self):
+        return self.total if self.full else NAN
+
+    def mean(self):
+        return self.total / self.window if self.full else NAN
+
+class _RollingVariance:
+    """Online mean/variance over a fixed window (add/remove Welford updates)."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.ssqdm = 0.0
+
+    def update(self, x):
+        self.values.append(x)
+        n = len(self.values)
+        delta = x - self.mean
+        self.mean += delta / n
+        self.ssqdm += delta * (x - self.mean)
+
+        if n > self.window:
+            old = self.values.popleft()
+            n -= 1
+            delta = old - self.mean
+            self.mean -= delta / n
+            self.ssqdm -= delta * (old - self.mean)
+
+    def std(self):
+        if len(self.values) < self.window:
+            return NAN
+        return math.sqrt(max(self.ssqdm, 0.0) / self.window)
+
+class _RollingExtreme:
+    """Rolling min or max over a fixed window using a monotonic deque."""
+
+    def __init__(self, window, mode):
+        self.window = window
+        self.better = (lambda a, b: a <= b) if mode == 'min' else (lambda a, b: a >= b)
+        self.items = deque()
+        self.count = 0
+
+    def update(self, x):
+        while self.items and self.better(x, self.items[-1][1]):
+            self.items.pop()
+        self.items.append((self.count, x))
+        if self.items[0][0] <= self.count - self.window:
+            self.items.popleft()
+        self.count += 1
+
+    def value(self):
+        return self.items[0][1] if self.count >= self.window else NAN
+
+class _EWM:
+    """Exponentially weighted mean with adjust=False, matching pandas ewm().mean()."""
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = None
+        self.count = 0
+
+    def update(self, x):
+        if math.isnan(x):
+            return self.current()
+        self.count += 1
+        if self.value is None:
+            self.value = x
+        else:
+            self.value = (1 - self.alpha) * self.value + self.alpha * x
+        return self.current()
+
+    def current(self):
+        return self.value if self.value is not None and self.count >= self.min_periods else NAN
+
+class SMAState:
+    def __init__(self, params):
+        self.period = params.get('Period', 20)
+        self.window = _RollingSum(self.period)
+
+    def update(self, bar):
+        self.window.update(bar['Close'])
+        return {f'SMA_{self.period}': self.window.mean()}
+
+class EMAState:
+    def __init__(self, params):
+        self.period = params.get('Period', 20)
+        self.ema = _EWM(2 / (self.period + 1), self.period)
+
+    def update(self, bar):
+        return {f'EMA_{self.period}': self.ema.update(bar['Close'])}
+
+class RSIState:
+    def __init__(self, params):
+        self.period = params.get('Period', 14)
+        self.up = _EWM(1 / self.period, self.period)
+        self.down = _EWM(1 / self.period, self.period)
+        self.prev_close = None
+
+    def update(self, bar):
+        diff = bar['Close'] - self.prev_close if self.prev_close is not None else NAN
+        self.prev_close = bar['Close']
+
+        # NaN diffs count as no movement, as in ta's where(diff > 0, 0.0)
+        emaup = self.up.update(diff if diff > 0 else 0.0)
+        emadn = self.down.update(-diff if diff < 0 else 0.0)
+        if emadn == 0:
+            rsi = 100.0
+        elif math.isnan(emaup) or math.isnan(emadn):
+            rsi = NAN
+        else:
+            rsi = 100 - (100 / (1 + emaup / emadn))
+        return {f'RSI_{self.period}': rsi}
+
+class MACDState:
+    def __init__(self, params):
+        fast = params.get('Fast Period', 12)
+        slow = params.get('Slow Period', 26)
+        signal = params.get('Signal Period', 9)
+        self.fast = _EWM(2 / (fast + 1), fast)
+        self.slow = _EWM(2 / (slow + 1), slow)
+        self.signal = _EWM(2 / (signal + 1), signal)
+
+    def update(self, bar):
+        macd = self.fast.update(bar['Close']) - self.slow.update(bar['Close'])
+        return {'MACD': macd, 'MACD_Signal': self.signal.update(macd)}
+
+class BBState:
+    def __init__(self, params):
+        self.std_dev = params.get('StdDev', 2)
+        self.mean = _RollingSum(params.get('Period', 20))
+        self.variance = _RollingVariance(params.get('Period', 20))
+
+    def update(self, bar):
+        self.mean.update(bar['Close'])
+        self.variance.update(bar['Close'])
+        mavg = self.mean.mean()
+        mstd = self.variance.std()
+        return {
+            'BB_Upper': mavg + self.std_dev * mstd,
+            'BB_Middle': mavg,
+            'BB_Lower': mavg - self.std_dev * mstd
+        }
+
+class StochState:
+    def __init__(self, params):
+        k_period = params.get('K Period', 14)
+        self.lowest = _RollingExtreme(k_period, 'min')
+        self.highest = _RollingExtreme(k_period, 'max')
+        self.smooth = _RollingSum(params.get('D Period', 3))
+        self.smooth_nans = deque(maxlen=params.get('D Period', 3))
+
+    def update(self, bar):
+        self.lowest.update(bar['Low'])
+        self.highest.update(bar['High'])
+        smin, smax = self.lowest.value(), self.highest.value()
+        stoch_k = 100 * _div(bar['Close'] - smin, smax - smin)
+
+        # A NaN anywhere in the smoothing window makes %D NaN
+        self.smooth_nans.append(not math.isfinite(stoch_k))
+        self.smooth.update(stoch_k if math.isfinite(stoch_k) else 0.0)
+        stoch_d = NAN if any(self.smooth_nans) else self.smooth.mean()
+        return {'Stoch_K': stoch_k, 'Stoch_D': stoch_d}
+
+class ATRState:
+    def __init__(self, params):
+        self.period = params.get('Period', 14)
+        self.prev_close = None
+        self.warmup = []
+        self.atr = 0.0
+        self.count = 0
+
+    def update(self, bar):
+        ranges = [bar['High'] - bar['Low']]
+        if self.prev_close is not None:
+            ranges += [abs(bar['High'] - self.prev_close), abs(bar['Low'] - self.prev_close)]
+        true_range = max(ranges)
+        self.prev_close = bar['Close']
+        self.count += 1
+
+        # ta seeds ATR with the mean of the first window and reports 0 before it
+        if self.count < self.period:
+            self.warmup.append(true_range)
+        elif self.count == self.period:
+            self.warmup.append(true_range)
+            self.atr = float(np.mean(self.warmup))
+        else:
+            self.atr = (self.atr * (self.period - 1) + true_range) / float(self.period)
+        return {'ATR': self.atr}
+
+class OBVState:
+    def __init__(self, params):
+        self.obv = 0.0
+        self.prev_close = None
+
+    def update(self, bar):
+        falling = self.prev_close is not None and bar['Close'] < self.prev_close
+        self.obv += -bar['Volume'] if falling else bar['Volume']
+        self.prev_close = bar['Close']
+        return {'OBV': self.obv}
+
+class VWAPState:
+    def __init__(self, params, window=14):
+        self.price_volume = _RollingSum(window)
+        self.volume = _RollingSum(window)
+
+    def update(self, bar):
+        typical_price = (bar['High'] + bar['Low'] + bar['Close']) / 3.0
+        self.price_volume.update(typical_price * bar['Volume'])
+        self.volume.update(bar['Volume'])
+        return {'VWAP': _div(self.price_volume.sum(), self.volume.sum())}
+
+INDICATOR_STATES = {
+    'sma': SMAState,
+    'ema': EMAState,
+    'rsi': RSIState,
+    'macd': MACDState,
+    'bb': BBState,
+    'stoch': StochState,
+    'atr': ATRState,
+    'obv': OBVState,
+    'vwap': VWAPState,
+}
+
+class StreamingBacktest:
+    """Incremental backtest that consumes bars one at a time.
+
+    Every indicator keeps O(1) rolling state, conditions are evaluated on the
+    previous and current bar only, and the trade ledger and equity curve are
+    extended in place, so each new bar costs the same regardless of how much
+    history has been processed. Signals and metrics match generate_signals and
+    calculate_metrics run over the same bars, including the strategy's
+    execution model.
+    """
+
+    def __init__(self, strategy, interval='1d'):
+        self.strategy = strategy
+        self.interval = interval
+        self.execution = execution_settings(strategy.get('execution'))
+        self.states = [
+            INDICATOR_STATES[ind['type'].lower()](ind.get('params', {}))
+            for ind in strategy['indicators']
+            if ind['type'].lower() in INDICATOR_STATES
+        ]
+        self.dag, self.entry_root, self.exit_root = compile_strategy(strategy)
+
+        self.prev_row = None
+        self.position = 0
+        self.bars = 0
+        self.days_in_market = 0
+        self.last_close = None
+        self.last_date = None
+
+        self.entry_price = None
+        self.entry_date = None
+        self.levels = None
+        self.returns = []
+        self.trades = []
+
+        # Equity after the last closed trade, and marked to market at the last bar
+        self.settled = 1.0
+        self.equity = 1.0
+        self.running_max = 1.0
+        self.worst_drawdown = 0.0
+
+    def update(self, timestamp, bar):
+        """Process one closed bar and return its signal (1 buy, -1 sell, 0 none)."""
+        row = {'Open': bar.get('Open', NAN), 'High': bar['High'], 'Low': bar['Low'],
+               'Close': bar['Close'], 'Volume': bar.get('Volume', NAN)}
+        for state in self.states:
+            row.update(state.update(row))
+
+        signal = 0
+        date = timestamp.strftime(date_format(self.interval))
+        if self.position == 0:
+            if self._evaluate(self.entry_root, row):
+                signal = 1
+                self.position = 1
+                self.entry_price = float(entry_fill(row['Close'], self.execution))
+                self.entry_date = date
+                self.levels = exit_levels(self.entry_price, self.execution)
+        else:
+            # Levels are checked against the bar's range before the exit conditions at its close
+            exit_price = self._level_exit(row)
+            if exit_price is None and self._evaluate(self.exit_root, row):
+                exit_price = row['Close']
+            if exit_price is not None:
+                signal = -1
+                self.position = 0
+                self.settled *= 1 + self._close_trade(exit_price, date, self.trades, self.returns)
+
+        if self.position == 1:
+            mark = mark_to_market(row['Close'], self.entry_price, self.execution)
+            self.equity = self.settled * (1 + self.execution['position_size'] * mark)
+        else:
+            self.equity = self.settled
+        self.running_max = max(self.running_max, self.equity)
+        self.worst_drawdown = min(self.worst_drawdown, (self.equity - self.running_max) / self.running_max)
+
+        self.days_in_market += self.position
+        self.bars += 1
+        self.prev_row = row
+        self.last_close = row['Close']
+        self.last_date = timestamp
+        return signal
+
+    def update_frame(self, df):
+        """Process a batch of bars in order, returning their signals."""
+        columns = [col for col in ['Open', 'High', 'Low', 'Close', 'Volume'] if col in df.columns]
+        records = df[columns].to_dict('records')
+        return [self.update(timestamp, bar) for timestamp, bar in zip(df.index, records)]
+
+    def _evaluate(self, root, row):
+        # Conditions only ever look one bar back, so two rows are enough
+        rows = [self.prev_row, row] if self.prev_row is not None else [row]
+        return bool(self.dag.evaluate(
+            [root], lambda config, col: [r.get(col, NAN) for r in rows], len(rows)
+        )[0][-1])
+
+    def _level_exit(self, row):
+        """Raw exit price if the bar reached the stop-loss or take-profit, else None."""
+        if not self.execution['has_stops']:
+            return None
+        stop, target = self.levels
+        stop_hit, target_hit = level_hits(row['High'], row['Low'], stop, target, self.execution)
+        if not (stop_hit or target_hit):
+            return None
+        return float(level_exit_prices(row['Open'], stop, target, stop_hit, target_hit, NAN, self.execution))
+
+    def _close_trade(self, exit_price, exit_date, trades, returns):
+        """Record a trade exiting at the raw ``exit_price``; returns its return on equity."""
+        exit_price = exit_fill(exit_price, self.execution)
+        trade_return = trade_returns(self.entry_price, exit_price, self.execution)
+        equity_return = self.execution['position_size'] * trade_return
+        returns.append(equity_return)
+        trades.append({
+            'entry_date': self.entry_date,
+            'entry_price': round(self.entry_price, 2),
+            'exit_date': exit_date,
+            'exit_price': round(exit_price, 2),
+            'return': round(trade_return * 100, 2)
+        })
+        return equity_return
+
+    def metrics(self):
+        """Return metrics for the bars seen so far, closing any open trade at the last bar."""
+        trades = list(self.trades)
+        returns = list(self.returns)
+        if self.position == 1:
+            # A level reached on the last bar has already closed the trade in update
+            self._close_trade(self.last_close, self.last_date.strftime(date_format(self.interval)), trades, returns)
+
+        max_drawdown = abs(self.worst_drawdown) * 100 if self.bars else 0
+        return summarize_trades(returns, trades, max_drawdown, self.days_in_market, self.bars, self.interval)
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import synthetic_ohlcv  # noqa: E402
+
+HISTORY_BARS = 4000
+# Symbols the offline feed knows; any other symbol downloads no bars
+SYMBOL_SEEDS = {'BTC-USD': 7, 'ETH-USD': 8}
+
+def offline_history(symbol):
+    bars = synthetic_ohlcv(HISTORY_BARS, seed=SYMBOL_SEEDS.get(symbol, 0), freq='D')
+    return bars if symbol in SYMBOL_SEEDS else bars.iloc[:0]
+
+@pytest.fixture(scope='session')
+def webapp(tmp_path_factory):
+    """The Flask app on temporary databases, served synthetic daily bars offline."""
+    directory = tmp_path_factory.mktemp('app')
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('DATABASE_URL', f"sqlite:///{directory / 'strategies.db'}")
+        patch.setenv('MARKET_DATA_DB', str(directory / 'market_data.db'))
+        patch.setenv('MARKET_DATA_MMAP_DIR', '')
+        patch.setenv('RESULT_CACHE_DB', str(directory / 'result_cache.db'))
+        patch.setenv('METRICS_DB', str(directory / 'metrics.db'))
+        patch.setenv('INDICATOR_STORE_DIR', '')
+        patch.setenv('PROFILE_DIR', str(directory / 'profiles'))
+        import app as webapp
+    from market_data import BarStore
+
+    last_bar = offline_history('BTC-USD').index[-1].to_pydatetime()
+    # Memory-mapped float64 histories, as the app serves them by default
+    webapp.bar_store = BarStore(
+        str(directory / 'bars.db'),
+        downloader=lambda symbol, interval, period=None, start=None: offline_history(symbol),
+        clock=lambda: last_bar,
+        price_dtype='float64',
+        memmap_dir=str(directory / 'bars')
+    )
+    webapp.result_cache.max_entries = 0
+    webapp.indicator_refresher = None
+    return webapp
@@ -0,0 +1,84 @@
+"""Request handling of the JSON API against the offline bar feed."""
+import pytest
+
+from backtest import MAX_MONTE_CARLO_TRADES, backtest_strategies
+
+SMA_CROSS = {
+    'indicators': [{'type': 'sma', 'params': {'Period': 20}}],
+    'entry_conditions': [{'type': 'indicator-compare', 'indicator': 'sma', 'condition': 'crosses-above'}],
+    'exit_conditions': [{'type': 'indicator-compare', 'indicator': 'sma', 'condition': 'crosses-below'}],
+}
+TIMEFRAME = {'period': '1y', 'interval': '1d'}
+
+@pytest.fixture
+def client(webapp):
+    return webapp.app.test_client()
+
+@pytest.mark.parametrize('symbol', ['ETH-USD', ' eth-usd '])
+def test_batch_backtests_the_requested_symbol(webapp, client, symbol):
+    response = client.post('/api/backtest-batch', json={
+        'symbol': symbol, 'strategies': [SMA_CROSS], 'timeframe': TIMEFRAME
+    }).get_json()
+    expected = backtest_strategies(webapp.bar_store.get_bars('ETH-USD', '1y', '1d'), [SMA_CROSS], '1d')[0]
+    assert response['results'][0] == expected
+    assert response['results'][0] != backtest_strategies(
+        webapp.bar_store.get_bars('BTC-USD', '1y', '1d'), [SMA_CROSS], '1d'
+    )[0]
+
+def test_sweep_backtests_the_requested_symbol(client):
+    body = dict(SMA_CROSS, timeframe=TIMEFRAME, max_workers=1, parameter_ranges=[
+        {'indicator': 'sma', 'param': 'Period', 'values': [10, 20]}
+    ])
+    eth = client.post('/api/sweep', json=dict(body, symbol='ETH-USD')).get_json()
+    btc = client.post('/api/sweep', json=body).get_json()
+    assert eth['status'] == btc['status'] == 'success'
+    assert eth['results'] != btc['results']
+
+def test_unknown_symbol_is_a_bad_request(client):
+    response = client.post('/api/backtest', json=dict(SMA_CROSS, symbol='NOPE', timeframe=TIMEFRAME))
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'No data available for the specified timeframe'
+
+def test_monte_carlo_caps_the_trade_count(client):
+    trades = [{'return': 1.0}] * (MAX_MONTE_CARLO_TRADES + 1)
+    response = client.post('/api/monte-carlo', json={'trades': trades, 'simulations': 10})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('max_workers', ['lots', [4]])
+def test_sweep_rejects_a_malformed_worker_count(client, max_workers):
+    body = dict(SMA_CROSS, timeframe=TIMEFRAME, max_workers=max_workers, parameter_ranges=[
+        {'indicator': 'sma', 'param': 'Period', 'values': [10, 20]}
+    ])
+    response = client.post('/api/sweep', json=body)
+    assert response.status_code == 400
+
+def test_worker_count_is_capped(webapp):
+    assert webapp.parse_workers(10 ** 6) == webapp.SWEEP_WORKERS
+    assert webapp.parse_workers('0') == 1
+    assert webapp.parse_workers(None) == webapp.SWEEP_WORKERS
+
+def test_walk_forward_caps_the_window_count(client):
+    body = dict(SMA_CROSS, timeframe=TIMEFRAME, walk_forward={'train_bars': 20, 'test_bars': 1})
+    response = client.post('/api/walk-forward', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('Walk-forward has')
+
+def test_leaderboard_pages_cover_every_strategy_once(webapp, client):
+    Strategy = webapp.Strategy
+    scores = [3.0, None, 1.0, 3.0, None, -2.0, 1.0, None]
+    with webapp.app.app_context():
+        webapp.db.session.execute(Strategy.__table__.insert(), [
+            {'id': f'lb-{k}', 'name': f'strategy {k}', 'config': {}, 'total_return': score}
+            for k, score in enumerate(scores)
+        ])
+        webapp.db.session.commit()
+
+    ids, cursor = [], None
+    while True:
+        page = client.get('/api/leaderboard', query_string={'limit': 3, **({'cursor': cursor} if cursor else {})})
+        body = page.get_json()
+        ids += [row['id'] for row in body['strategies']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert ids == ['lb-3', 'lb-0', 'lb-6', 'lb-2', 'lb-5', 'lb-7', 'lb-4', 'lb-1']
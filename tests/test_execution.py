@@ -0,0 +1,101 @@
+"""Execution rules of execute_positions and calculate_metrics against hand-computed fills."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import calculate_metrics, execute_positions
+
+FLAT = (100, 101, 99, 100)
+
+def bars(*rows, n=6):
+    """Daily (open, high, low, close) bars, flat at 100 unless given as {bar: row}."""
+    overrides = dict(rows[0]) if rows else {}
+    frame = pd.DataFrame([overrides.get(i, FLAT) for i in range(n)], columns=['Open', 'High', 'Low', 'Close'],
+                         index=pd.date_range('2024-01-01', periods=n, freq='D'), dtype=float)
+    frame['Volume'] = 1000.0
+    return frame
+
+def run(df, entries, exits, execution=None):
+    """Transitions and metrics for entry and exit signals on the given bars."""
+    entry_mask, exit_mask = np.zeros(len(df), dtype=bool), np.zeros(len(df), dtype=bool)
+    entry_mask[entries] = True
+    exit_mask[exits] = True
+    transitions = execute_positions(df, entry_mask, exit_mask, execution)
+    metrics = calculate_metrics(df, {'signal': transitions}, '1d', execution=execution)
+    return transitions.tolist(), metrics
+
+@pytest.mark.parametrize('rows,execution,exit_price', [
+    # The stop at 95 lies inside bar 2's range
+    ({2: (99, 100, 94, 96)}, {'stop_loss': 0.05}, 95.0),
+    # Bar 2 opens at 90, below the stop at 95, and fills at its open
+    ({2: (90, 91, 88, 89)}, {'stop_loss': 0.05}, 90.0),
+    # The target at 110 lies above bar 2's open of 105
+    ({2: (105, 112, 104, 108)}, {'take_profit': 0.1}, 110.0),
+    # Bar 2 opens at 115, above the target at 110, and fills at its open
+    ({2: (115, 116, 113, 114)}, {'take_profit': 0.1}, 115.0),
+    # Bar 2 reaches the stop at 94 and the target at 112: the stop is assumed first
+    ({2: (100, 112, 94, 100)}, {'stop_loss': 0.06, 'take_profit': 0.12}, 94.0),
+])
+def test_long_level_fills(rows, execution, exit_price):
+    transitions, metrics = run(bars(rows), [1], [], execution)
+    assert transitions == [0, 1, -1, 0, 0, 0]
+    trade = metrics['trades'][0]
+    assert (trade['entry_price'], trade['exit_price']) == (100.0, exit_price)
+    assert trade['return'] == round(exit_price - 100, 2)
+
+def test_short_level_fills():
+    # Short from 100: the stop is at 105 and the target at 90
+    execution = {'direction': 'short', 'stop_loss': 0.05, 'take_profit': 0.1}
+    transitions, metrics = run(bars({2: (101, 106, 100, 104)}), [1], [], execution)
+    assert transitions == [0, 1, -1, 0, 0, 0]
+    assert (metrics['trades'][0]['exit_price'], metrics['trades'][0]['return']) == (105.0, -5.0)
+
+    transitions, metrics = run(bars({2: (95, 96, 89, 91)}), [1], [], execution)
+    assert (metrics['trades'][0]['exit_price'], metrics['trades'][0]['return']) == (90.0, 10.0)
+
+def test_levels_are_not_checked_on_the_entry_bar():
+    # Bar 1's low of 90 would hit the stop at 95, but the trade was only opened at its close
+    df = bars({1: (100, 101, 90, 100), 3: (99, 100, 94, 96)})
+    transitions, _ = run(df, [1], [], {'stop_loss': 0.05})
+    assert transitions == [0, 1, 0, -1, 0, 0]
+
+def test_short_return_sign():
+    df = bars({3: (90, 91, 89, 90)})
+    _, long = run(df, [1], [3])
+    _, short = run(df, [1], [3], {'direction': 'short'})
+    assert long['trades'][0]['return'] == -10.0
+    assert short['trades'][0]['return'] == 10.0
+    assert (long['total_return'], short['total_return']) == (-10.0, 10.0)
+    assert (long['win_rate'], short['win_rate']) == (0, 100.0)
+
+def test_commission_and_slippage():
+    df = bars({3: (110, 111, 109, 110)})
+    execution = {'commission': 0.001, 'slippage': 0.01}
+
+    # Long: buy at 100 * 1.01 = 101 paying 0.1%, sell at 110 * 0.99 = 108.9 paying 0.1%
+    _, long = run(df, [1], [3], execution)
+    cost, proceeds = 101 * 1.001, 108.9 * 0.999
+    assert (long['trades'][0]['entry_price'], long['trades'][0]['exit_price']) == (101.0, 108.9)
+    assert long['trades'][0]['return'] == round((proceeds - cost) / cost * 100, 2) == 7.61
+
+    # Short: sell at 100 * 0.99 = 99 receiving 99.9%, buy back at 110 * 1.01 = 111.1 paying 100.1%
+    _, short = run(df, [1], [3], dict(execution, direction='short'))
+    assert (short['trades'][0]['entry_price'], short['trades'][0]['exit_price']) == (99.0, 111.1)
+    assert short['trades'][0]['return'] == round((99 * 0.999 - 111.1 * 1.001) / 99 * 100, 2) == -12.43
+
+def test_position_size_scales_equity_not_trades():
+    # +10% from bar 1 to 2, then -10% from bar 3 to 4, each on half the equity
+    df = bars({2: (110, 111, 109, 110), 4: (90, 91, 89, 90)})
+    _, metrics = run(df, [1, 3], [2, 4], {'position_size': 0.5})
+    assert [trade['return'] for trade in metrics['trades']] == [10.0, -10.0]
+    # Equity 1.05 after the first trade and 1.05 * 0.95 = 0.9975 after the second
+    assert metrics['total_return'] == -0.25
+    assert metrics['max_drawdown'] == 5.0
+
+def test_no_reopen_on_the_stop_bar():
+    # The stop closes the trade on bar 2, which also has an entry signal; the next trade opens on bar 3
+    df = bars({2: (99, 100, 94, 96)})
+    transitions, metrics = run(df, [1, 2, 3], [], {'stop_loss': 0.05})
+    assert transitions == [0, 1, -1, 1, 0, 0]
+    assert metrics['total_trades'] == 2
+    assert metrics['trades'][1]['entry_date'] == '2024-01-04'
@@ -0,0 +1,74 @@
+"""Parsing and evaluation of condition chains compiled into the expression DAG."""
+import numpy as np
+import pytest
+
+from expressions import ExpressionDAG
+
+STRATEGY = {'indicators': [{'type': 'sma', 'params': {'Period': 3}}]}
+TRUE = {'type': 'compare', 'left': 1, 'condition': 'is-above', 'right': 0}
+FALSE = {'type': 'compare', 'left': 0, 'condition': 'is-above', 'right': 1}
+AND, OR, NOT = {'type': 'and'}, {'type': 'or'}, {'type': 'not'}
+
+COLUMNS = {
+    'Close': np.array([1.0, 2.0, 3.0, 2.0, 1.0, 4.0]),
+    'SMA_3': np.array([np.nan, np.nan, 2.0, 2.5, 2.0, 2.0]),
+}
+
+def evaluate(components, n=1):
+    dag = ExpressionDAG()
+    root = dag.add(components, STRATEGY)
+    return dag.evaluate([root], lambda config, column: COLUMNS[column][:n], n)[0].tolist()
+
+def group(*components):
+    return {'type': 'group', 'conditions': list(components)}
+
+def sma(condition):
+    return {'type': 'indicator-compare', 'indicator': 'sma', 'condition': condition}
+
+@pytest.mark.parametrize('components,expected', [
+    ([TRUE, OR, FALSE, AND, FALSE], True),
+    ([FALSE, AND, FALSE, OR, TRUE], True),
+    ([FALSE, AND, TRUE, OR, TRUE, AND, FALSE], False),
+    ([NOT, FALSE, AND, TRUE], True),
+    ([NOT, NOT, FALSE, OR, FALSE], False),
+    ([TRUE, AND, NOT, TRUE, OR, FALSE], False),
+])
+def test_precedence(components, expected):
+    assert evaluate(components) == [expected]
+
+def test_groups_override_precedence():
+    assert evaluate([group(TRUE, OR, FALSE), AND, FALSE]) == [False]
+    assert evaluate([NOT, group(TRUE, AND, FALSE)]) == [True]
+    assert evaluate([NOT, group(FALSE, OR, group(TRUE, AND, TRUE))]) == [False]
+
+@pytest.mark.parametrize('components,message', [
+    ([TRUE, NOT], "'not' must come before a condition"),
+    ([TRUE, NOT, AND, TRUE], "'not' must come before a condition"),
+    ([NOT, AND, TRUE], "'and' must follow a condition"),
+    ([OR, TRUE], "'or' must follow a condition"),
+    ([TRUE, TRUE], "Conditions must be joined by 'and' or 'or'"),
+])
+def test_misplaced_operators_are_rejected(components, message):
+    with pytest.raises(ValueError, match=message):
+        ExpressionDAG().add(components, STRATEGY)
+
+def test_equivalent_chains_share_nodes():
+    dag = ExpressionDAG()
+    root = dag.add([sma('is-above'), AND, TRUE], STRATEGY)
+    assert dag.add([TRUE, AND, sma('is-above')], STRATEGY) == root
+    assert dag.add([group(sma('is-above'), AND, TRUE)], STRATEGY) == root
+    assert dag.add([NOT, NOT, sma('is-above'), AND, TRUE], STRATEGY) == root
+
+    size = len(dag.nodes)
+    dag.add([sma('is-above'), OR, NOT, group(sma('is-above'), AND, TRUE)], STRATEGY)
+    # Only the negation and the disjunction are new
+    assert len(dag.nodes) == size + 2
+
+def test_negation_never_fires_on_warm_up_bars():
+    n = len(COLUMNS['Close'])
+    assert evaluate([NOT, sma('is-above')], n) == [False, False, False, True, True, False]
+    # A cross also needs the previous bar's value
+    assert evaluate([NOT, sma('crosses-above')], n) == [False, False, False, True, True, False]
+    assert evaluate([NOT, group(sma('is-above'), OR, FALSE)], n) == [False, False, False, True, True, False]
+    # A known False operand decides a conjunction whatever the other one is
+    assert evaluate([NOT, group(sma('is-above'), AND, FALSE)], n) == [True] * n
@@ -0,0 +1,154 @@
+"""The indicator store must serve the values calculate_indicators gives over the requested window."""
+import time
+
+import numpy as np
+import pytest
+
+from backtest import backtest_strategies, calculate_indicators, indicator_spec
+from conftest import offline_history
+from indicator_store import IndicatorRefresher, IndicatorStore, warmup_bars
+
+SYMBOL = 'BTC-USD'
+
+# Every kind of indicator the store can hold, beyond the default catalogue
+CATALOGUE = (
+    [{'type': 'sma', 'params': {'Period': period}} for period in (5, 10, 20, 50, 100, 200)]
+    + [{'type': 'ema', 'params': {'Period': period}} for period in (5, 10, 20, 50, 100, 200)]
+    + [
+        {'type': 'rsi', 'params': {'Period': 14}},
+        {'type': 'macd', 'params': {'Fast Period': 12, 'Slow Period': 26, 'Signal Period': 9}},
+        {'type': 'bb', 'params': {'Period': 20, 'StdDev': 2}},
+        {'type': 'atr', 'params': {'Period': 14}},
+    ]
+)
+
+STRATEGIES = [
+    {
+        'indicators': [{'type': 'sma', 'params': {'Period': 200}}],
+        'entry_conditions': [{'type': 'indicator-compare', 'indicator': 'sma', 'condition': 'crosses-above'}],
+        'exit_conditions': [{'type': 'indicator-compare', 'indicator': 'sma', 'condition': 'crosses-below'}],
+    },
+    {
+        'indicators': [
+            {'type': 'ema', 'params': {'Period': 20}},
+            {'type': 'rsi', 'params': {'Period': 14, 'Overbought': 60, 'Oversold': 40}},
+            {'type': 'macd', 'params': {'Fast Period': 12, 'Slow Period': 26, 'Signal Period': 9}},
+        ],
+        'entry_conditions': [
+            {'type': 'indicator-compare', 'indicator': 'ema', 'condition': 'crosses-above'},
+            {'type': 'or'},
+            {'type': 'indicator-compare', 'indicator': 'rsi', 'condition': 'crosses-below'},
+        ],
+        'exit_conditions': [{'type': 'indicator-compare', 'indicator': 'macd', 'condition': 'crosses-below'}],
+    },
+]
+
+@pytest.fixture(scope='module')
+def history():
+    return offline_history(SYMBOL)
+
+@pytest.fixture
+def store(tmp_path, history):
+    store = IndicatorStore(str(tmp_path / 'indicators'), lambda symbol, interval: history, CATALOGUE)
+    store.refresh(SYMBOL, '1d')
+    return store
+
+def assert_window_values(store, window, config):
+    columns = store.columns(SYMBOL, '1d', window, config)
+    assert columns is not None
+    expected = calculate_indicators(window.copy(), config)
+    for col, values in columns.items():
+        np.testing.assert_allclose(values, expected[col].to_numpy(dtype=float), rtol=1e-9, atol=1e-9)
+
+@pytest.mark.parametrize('config', CATALOGUE, ids=lambda config: config['type'])
+@pytest.mark.parametrize('start,stop', [(0, 4000), (600, 4000), (500, 3700)])
+def test_columns_match_the_window(store, history, config, start, stop):
+    assert_window_values(store, history.iloc[start:stop], config)
+
+def test_appended_bars_are_recomputed_incrementally(tmp_path, history):
+    bars = {'frame': history.iloc[:3500]}
+    store = IndicatorStore(str(tmp_path / 'indicators'), lambda symbol, interval: bars['frame'], CATALOGUE)
+    assert store.refresh(SYMBOL, '1d') == 3500
+
+    bars['frame'] = history
+    assert store.refresh(SYMBOL, '1d') == 500
+    assert store.refresh(SYMBOL, '1d') == 0
+    for config in CATALOGUE:
+        assert_window_values(store, history.iloc[500:], config)
+
+def test_window_shorter_than_warmup_is_not_served(store, history):
+    config = {'type': 'ema', 'params': {'Period': 200}}
+    window = history.iloc[-warmup_bars(indicator_spec(config)):]
+    assert store.columns(SYMBOL, '1d', window, config) is None
+    assert store.stats()['misses'] == 0
+
+def test_revised_bars_are_a_miss(store, history):
+    revised = history.iloc[1000:].copy()
+    revised.iloc[-1, revised.columns.get_loc('Close')] += 1
+    assert store.columns(SYMBOL, '1d', revised, {'type': 'sma', 'params': {'Period': 20}}) is None
+    assert store.stats()['misses'] == 1
+
+def test_refresher_wakes_before_its_period(tmp_path, history):
+    store = IndicatorStore(str(tmp_path / 'indicators'), lambda symbol, interval: history)
+    refresher = IndicatorRefresher(store, lambda: [(SYMBOL, '1d')], interval_seconds=3600)
+    refresher.start()
+    try:
+        refresher.wake()
+        deadline = time.monotonic() + 30
+        while store.stats()['refreshes'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        refresher.stop()
+    assert store.stats()['refreshes'] == 1
+
+@pytest.mark.parametrize('strategy', STRATEGIES, ids=['sma_200', 'ema_rsi_macd'])
+def test_backtest_paths_agree(webapp, history, tmp_path, strategy):
+    client = webapp.app.test_client()
+    timeframe = {'period': '2y', 'interval': '1d'}
+    webapp.bar_store.get_bars(SYMBOL, 'max', '1d')
+    window = webapp.bar_store.get_bars(SYMBOL, '2y', '1d')
+    assert len(window) < len(history)
+
+    store = IndicatorStore(str(tmp_path / 'indicators'), webapp.bar_store.history, CATALOGUE)
+    store.refresh(SYMBOL, '1d')
+    webapp.indicator_store = store
+    webapp.indicator_cache.clear()
+    with_store = client.post('/api/backtest', json=dict(strategy, timeframe=timeframe)).get_json()
+    assert store.stats()['hits'] == len(strategy['indicators'])
+    # Columns read from the store are cached for the dataset like computed ones
+    client.post('/api/backtest', json=dict(strategy, timeframe=timeframe))
+    assert store.stats()['hits'] == len(strategy['indicators'])
+
+    webapp.indicator_store = None
+    without_store = client.post('/api/backtest', json=dict(strategy, timeframe=timeframe)).get_json()
+    batch = client.post('/api/backtest-batch', json={'strategies': [strategy], 'timeframe': timeframe}).get_json()
+
+    expected = backtest_strategies(window, [strategy], '1d')[0]
+    assert expected['total_trades'] > 0
+    assert with_store['strategy_metrics'] == expected
+    assert without_store['strategy_metrics'] == expected
+    assert batch['results'][0] == expected
+
+class Refresher:
+    def __init__(self):
+        self.wakes = 0
+
+    def wake(self):
+        self.wakes += 1
+
+def test_short_windows_skip_the_store(webapp, tmp_path, monkeypatch):
+    client = webapp.app.test_client()
+    store = IndicatorStore(str(tmp_path / 'indicators'), webapp.bar_store.history, CATALOGUE)
+    store.refresh(SYMBOL, '1d')
+    refresher = Refresher()
+    monkeypatch.setattr(webapp, 'indicator_store', store)
+    monkeypatch.setattr(webapp, 'indicator_refresher', refresher)
+    webapp.indicator_cache.clear()
+
+    # A year of daily bars is shorter than EMA 200's warm-up
+    strategy = dict(STRATEGIES[0], indicators=[{'type': 'ema', 'params': {'Period': 200}}])
+    strategy['entry_conditions'] = [dict(strategy['entry_conditions'][0], indicator='ema')]
+    strategy['exit_conditions'] = [dict(strategy['exit_conditions'][0], indicator='ema')]
+    response = client.post('/api/backtest', json=dict(strategy, timeframe={'period': '1y', 'interval': '1d'}))
+    assert response.status_code == 200
+    assert store.stats()['hits'] == store.stats()['misses'] == refresher.wakes == 0
@@ -0,0 +1,40 @@
+"""Stage histograms must report the same totals from every worker process."""
+import multiprocessing
+
+import pytest
+
+from instrumentation import StageHistograms
+
+BUCKETS = (0.1, 1)
+
+def observe_in_worker(path):
+    histograms = StageHistograms(buckets=BUCKETS, path=path)
+    for seconds in (0.05, 0.5, 5):
+        histograms.observe('signals', seconds)
+
+@pytest.mark.parametrize('shared', [False, True])
+def test_render(tmp_path, shared):
+    histograms = StageHistograms(buckets=BUCKETS, path=str(tmp_path / 'metrics.db') if shared else None)
+    for seconds in (0.05, 0.5, 0.5, 5):
+        histograms.observe('signals', seconds)
+    assert histograms.render().splitlines()[2:] == [
+        'backtest_stage_seconds_bucket{stage="signals",le="0.1"} 1',
+        'backtest_stage_seconds_bucket{stage="signals",le="1"} 3',
+        'backtest_stage_seconds_bucket{stage="signals",le="+Inf"} 4',
+        'backtest_stage_seconds_sum{stage="signals"} 6.050000',
+        'backtest_stage_seconds_count{stage="signals"} 4',
+    ]
+
+def test_workers_share_counts(tmp_path):
+    path = str(tmp_path / 'metrics.db')
+    histograms = StageHistograms(buckets=BUCKETS, path=path)
+    histograms.observe('signals', 0.05)
+
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=observe_in_worker, args=(path,)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+    assert 'backtest_stage_seconds_count{stage="signals"} 7' in histograms.render()
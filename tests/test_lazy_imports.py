@@ -0,0 +1,63 @@
+"""Importing the web app must leave the heavy libraries unloaded until a request needs them."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmark import synthetic_ohlcv
+from indicator_store import IndicatorStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A lazy module sits in sys.modules before it runs, so look for its submodules instead
+CHECK = """
+import json
+import sys
+
+import app
+
+print(json.dumps([
+    name for name in ('pandas', 'numpy', 'ta')
+    if any(module.startswith(name + '.') for module in sys.modules)
+]))
+"""
+
+def loaded_after_import(env):
+    output = subprocess.run(
+        [sys.executable, '-c', CHECK], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True, timeout=120
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+@pytest.fixture
+def app_env(tmp_path):
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': ROOT,
+        'DATABASE_URL': f"sqlite:///{tmp_path / 'strategies.db'}",
+        'MARKET_DATA_DB': str(tmp_path / 'market_data.db'),
+        'MARKET_DATA_MMAP_DIR': str(tmp_path / 'bars'),
+        'RESULT_CACHE_DB': str(tmp_path / 'result_cache.db'),
+        'METRICS_DB': str(tmp_path / 'metrics.db'),
+        'PROFILE_DIR': str(tmp_path / 'profiles'),
+        'INDICATOR_STORE_DIR': '',
+    })
+    return env
+
+def test_import_app_without_indicator_store(app_env):
+    assert loaded_after_import(app_env) == []
+
+def test_import_app_with_populated_indicator_store(app_env, tmp_path):
+    directory = tmp_path / 'indicators'
+    store = IndicatorStore(str(directory), lambda symbol, interval: synthetic_ohlcv(300, freq='D'))
+    assert store.refresh('BTC-USD', '1d') == 300
+
+    app_env['INDICATOR_STORE_DIR'] = str(directory)
+    app_env['INDICATOR_CATALOGUE'] = json.dumps([{'type': 'sma', 'params': {'Period': 20}}])
+    assert loaded_after_import(app_env) == []
+
+def test_store_construction_does_no_io(tmp_path):
+    IndicatorStore(str(tmp_path / 'indicators'), lambda symbol, interval: None)
+    assert not (tmp_path / 'indicators').exists()
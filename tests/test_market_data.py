@@ -0,0 +1,118 @@
+"""BarStore behaviour against a fake downloader, without network access."""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_data import BarStore
+
+class FakeFeed:
+    """Daily bars up to the store's clock, recording every download."""
+
+    def __init__(self, now):
+        self.now = now
+        self.calls = []
+        index = pd.date_range('2018-01-01', '2021-12-31', freq='D', tz='UTC', name='Date')
+        close = 100 + np.arange(len(index), dtype=float)
+        self.bars = pd.DataFrame({
+            'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+            'Adj Close': close, 'Volume': np.full(len(index), 1000.0)
+        }, index=index)
+
+    def clock(self):
+        return self.now
+
+    def __call__(self, symbol, interval, period=None, start=None):
+        self.calls.append({'symbol': symbol, 'interval': interval, 'period': period, 'start': start})
+        visible = self.bars[self.bars.index <= pd.Timestamp(self.now, tz='UTC')]
+        if start is not None:
+            return visible[visible.index >= pd.Timestamp(start, tz='UTC')]
+        return visible[visible.index > pd.Timestamp(self.now - timedelta(days=731), tz='UTC')]
+
+@pytest.fixture(params=['sqlite', 'memmap'])
+def store(request, tmp_path):
+    feed = FakeFeed(datetime(2020, 6, 1, 12))
+    memmap_dir = str(tmp_path / 'bars') if request.param == 'memmap' else None
+    bar_store = BarStore(str(tmp_path / 'bars.db'), downloader=feed, clock=feed.clock,
+                         price_dtype='float64', memmap_dir=memmap_dir)
+    return bar_store, feed
+
+def test_repeat_request_is_served_from_the_store(store, tmp_path):
+    bar_store, feed = store
+    first = bar_store.get_bars('BTC-USD', '1y', '1d')
+    second = bar_store.get_bars('BTC-USD', '1y', '1d')
+    assert len(feed.calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+    # The store persists across instances
+    reopened = BarStore(bar_store.path, downloader=feed, clock=feed.clock,
+                        price_dtype='float64', memmap_dir=bar_store.memmap_dir)
+    pd.testing.assert_frame_equal(reopened.get_bars('BTC-USD', '1y', '1d'), first)
+    assert len(feed.calls) == 1
+
+def test_shorter_period_is_a_slice(store):
+    bar_store, feed = store
+    two_years = bar_store.get_bars('BTC-USD', '2y', '1d')
+    one_month = bar_store.get_bars('BTC-USD', '1mo', '1d')
+    assert len(feed.calls) == 1
+    assert one_month.index[0] >= pd.Timestamp(feed.now - timedelta(days=31), tz='UTC')
+    pd.testing.assert_frame_equal(one_month, two_years.loc[one_month.index[0]:])
+
+def test_longer_period_refetches_in_full(store):
+    bar_store, feed = store
+    bar_store.get_bars('BTC-USD', '1mo', '1d')
+    bar_store.get_bars('BTC-USD', '1y', '1d')
+    assert [call['period'] for call in feed.calls] == ['1mo', '1y']
+
+def test_stale_store_fetches_only_the_tail(store):
+    bar_store, feed = store
+    before = bar_store.get_bars('BTC-USD', '1y', '1d')
+    last_bar = before.index[-1]
+
+    feed.now += timedelta(days=3)
+    after = bar_store.get_bars('BTC-USD', '1y', '1d')
+    assert len(feed.calls) == 2
+    assert feed.calls[1]['period'] is None
+    assert feed.calls[1]['start'] == last_bar.strftime('%Y-%m-%d')
+    assert after.index[-1] == last_bar + timedelta(days=3)
+    pd.testing.assert_frame_equal(after.loc[:last_bar].iloc[-200:], before.iloc[-200:])
+
+    # Fresh again until another interval passes
+    bar_store.get_bars('BTC-USD', '1y', '1d')
+    assert len(feed.calls) == 2
+
+def test_tail_fetch_replaces_revised_bars(store):
+    bar_store, feed = store
+    before = bar_store.get_bars('BTC-USD', '1y', '1d')
+    last_bar = before.index[-1]
+
+    # The last stored bar was still forming and closed at a different price
+    feed.bars.loc[last_bar, 'Close'] = 1.0
+    feed.now += timedelta(days=1)
+    after = bar_store.get_bars('BTC-USD', '1y', '1d')
+    assert after.loc[last_bar, 'Close'] == 1.0
+    assert not after.index.duplicated().any()
+    assert after.index[-1] == last_bar + timedelta(days=1)
+
+def test_symbols_and_intervals_are_separate_keys(store):
+    bar_store, feed = store
+    bar_store.get_bars('BTC-USD', '1y', '1d')
+    bar_store.get_bars('ETH-USD', '1y', '1d')
+    bar_store.get_bars('BTC-USD', '1y', '1wk')
+    assert [(call['symbol'], call['interval']) for call in feed.calls] == [
+        ('BTC-USD', '1d'), ('ETH-USD', '1d'), ('BTC-USD', '1wk')
+    ]
+    assert sorted(bar_store.keys()) == [('BTC-USD', '1d'), ('BTC-USD', '1wk'), ('ETH-USD', '1d')]
+
+def test_unsupported_interval_is_rejected(store):
+    bar_store, _ = store
+    with pytest.raises(ValueError):
+        bar_store.get_bars('BTC-USD', '1y', '7m')
+
+def test_empty_download_is_an_empty_frame(store):
+    bar_store, feed = store
+    feed.bars = feed.bars.iloc[:0]
+    df = bar_store.get_bars('NOPE', '1y', '1d')
+    assert df.empty
+    assert bar_store.history('NOPE', '1d').empty
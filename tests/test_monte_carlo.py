@@ -0,0 +1,19 @@
+"""Monte Carlo resampling must not depend on how the simulations are chunked."""
+import numpy as np
+import pytest
+
+from backtest import MAX_MONTE_CARLO_TRADES, monte_carlo_trades
+
+RETURNS = np.random.default_rng(3).normal(0.002, 0.02, 500)
+
+@pytest.mark.parametrize('method', ['bootstrap', 'shuffle'])
+@pytest.mark.parametrize('chunk_cells', [1, 7 * len(RETURNS), 10 ** 9])
+def test_chunking_leaves_results_unchanged(method, chunk_cells):
+    expected = monte_carlo_trades(RETURNS, simulations=300, method=method, seed=11)
+    assert monte_carlo_trades(
+        RETURNS, simulations=300, method=method, seed=11, chunk_cells=chunk_cells
+    ) == expected
+
+def test_too_many_trades_is_rejected():
+    with pytest.raises(ValueError):
+        monte_carlo_trades(np.zeros(MAX_MONTE_CARLO_TRADES + 1), simulations=10)
@@ -0,0 +1,32 @@
+"""Cached backtest responses must never outlive the engine or the bars that produced them."""
+import sqlite3
+
+import result_cache
+from result_cache import ResultCache, strategy_key
+
+REQUEST = {'indicators': [{'type': 'sma', 'params': {'Period': 20}}], 'entry_conditions': [], 'exit_conditions': []}
+
+def test_engine_version_is_part_of_the_key(monkeypatch):
+    key = strategy_key(REQUEST, 'BTC-USD', '1y', '1d')
+    monkeypatch.setattr(result_cache, 'ENGINE_VERSION', result_cache.ENGINE_VERSION + 1)
+    assert strategy_key(REQUEST, 'BTC-USD', '1y', '1d') != key
+
+def test_revised_bars_are_a_miss(tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.db'))
+    cache.put('key', 100, 'before', {'total_return': 1})
+    assert cache.get('key', 100, 'before') == {'total_return': 1}
+    assert cache.get('key', 100, 'after') is None
+
+    cache.put('key', 100, 'after', {'total_return': 2})
+    assert cache.get('key', 100, 'after') == {'total_return': 2}
+    assert cache.stats()['entries'] == 1
+
+def test_older_cache_files_are_emptied(tmp_path):
+    path = str(tmp_path / 'results.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE results (strategy_hash TEXT, last_bar INTEGER, payload TEXT, accessed_at REAL)")
+        conn.execute("INSERT INTO results VALUES ('key', 100, '{}', 0)")
+    cache = ResultCache(path)
+    assert cache.stats()['entries'] == 0
+    cache.put('key', 100, 'fingerprint', {})
+    assert cache.get('key', 100, 'fingerprint') == {}
@@ -0,0 +1,61 @@
+"""The vectorized signal engine must match the per-bar reference loop."""
+import random
+
+import numpy as np
+import pytest
+
+from backtest import calculate_indicators, generate_signals, generate_signals_loop
+from benchmark import synthetic_ohlcv
+
+INDICATORS = [
+    {'type': 'sma', 'params': {'Period': 10}},
+    {'type': 'ema', 'params': {'Period': 30}},
+    {'type': 'vwap', 'params': {}},
+    {'type': 'rsi', 'params': {'Period': 14, 'Overbought': 60, 'Oversold': 40}},
+    {'type': 'macd', 'params': {'Fast Period': 12, 'Slow Period': 26, 'Signal Period': 9}},
+]
+CONDITIONS = ['crosses-above', 'crosses-below', 'is-above', 'is-below']
+
+def random_chain(rng, close):
+    components = []
+    for k in range(rng.randint(1, 4)):
+        if k:
+            components.append({'type': rng.choice(['and', 'or'])})
+        if rng.random() < 0.25:
+            level = float(np.percentile(close, rng.uniform(20, 80)))
+            components.append({'type': 'price-level', 'condition': rng.choice(CONDITIONS),
+                               'params': {'Value': level}})
+        else:
+            components.append({'type': 'indicator-compare', 'condition': rng.choice(CONDITIONS),
+                               'indicator': rng.choice(INDICATORS)['type']})
+    return components
+
+@pytest.fixture(scope='module')
+def frame():
+    # Indicator warm-up leaves NaN in the first rows of every column
+    df = synthetic_ohlcv(600, seed=3, freq='D')
+    for indicator in INDICATORS:
+        df = calculate_indicators(df, indicator)
+    assert df[['SMA_10', 'EMA_30', 'RSI_14', 'MACD_Signal']].iloc[:10].isna().any().all()
+    return df
+
+@pytest.mark.parametrize('seed', range(40))
+def test_vectorized_matches_loop(frame, seed):
+    rng = random.Random(seed)
+    strategy = {
+        'indicators': INDICATORS,
+        'entry_conditions': random_chain(rng, frame['Close']),
+        'exit_conditions': random_chain(rng, frame['Close']),
+    }
+    vectorized = generate_signals(frame, strategy)['signal'].to_numpy()
+    loop = generate_signals_loop(frame, strategy)['signal'].to_numpy()
+    np.testing.assert_array_equal(vectorized, loop)
+
+def test_missing_indicator_never_fires(frame):
+    strategy = {
+        'indicators': [],
+        'entry_conditions': [{'type': 'indicator-compare', 'indicator': 'sma', 'condition': 'is-above'}],
+        'exit_conditions': [],
+    }
+    assert not generate_signals(frame, strategy)['signal'].any()
+    assert not generate_signals_loop(frame, strategy)['signal'].any()
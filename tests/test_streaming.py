@@ -0,0 +1,89 @@
+"""StreamingBacktest must reproduce the batch backtest exactly, bar by bar."""
+import numpy as np
+import pytest
+
+from backtest import calculate_indicators, calculate_metrics, generate_signals
+from benchmark import synthetic_ohlcv
+from streaming import StreamingBacktest
+
+BARS = 240
+
+STRATEGIES = {
+    'sma_cross': {
+        'indicators': [{'type': 'sma', 'params': {'Period': 20}}],
+        'entry_conditions': [{'type': 'indicator-compare', 'indicator': 'sma', 'condition': 'crosses-above'}],
+        'exit_conditions': [{'type': 'indicator-compare', 'indicator': 'sma', 'condition': 'crosses-below'}],
+    },
+    'rsi_or_macd': {
+        'indicators': [
+            {'type': 'rsi', 'params': {'Period': 14, 'Overbought': 60, 'Oversold': 40}},
+            {'type': 'macd', 'params': {'Fast Period': 12, 'Slow Period': 26, 'Signal Period': 9}},
+        ],
+        'entry_conditions': [
+            {'type': 'indicator-compare', 'indicator': 'rsi', 'condition': 'is-below'},
+            {'type': 'or'},
+            {'type': 'indicator-compare', 'indicator': 'macd', 'condition': 'crosses-above'},
+        ],
+        'exit_conditions': [{'type': 'indicator-compare', 'indicator': 'rsi', 'condition': 'crosses-above'}],
+    },
+    'ema_and_vwap': {
+        'indicators': [{'type': 'ema', 'params': {'Period': 10}}, {'type': 'vwap', 'params': {}}],
+        'entry_conditions': [
+            {'type': 'indicator-compare', 'indicator': 'ema', 'condition': 'is-above'},
+            {'type': 'and'},
+            {'type': 'indicator-compare', 'indicator': 'vwap', 'condition': 'is-above'},
+        ],
+        'exit_conditions': [{'type': 'indicator-compare', 'indicator': 'ema', 'condition': 'crosses-below'}],
+    },
+}
+
+EXECUTIONS = {
+    'default': None,
+    'costs': {'commission': 0.001, 'slippage': 0.0005},
+    'stops': {'stop_loss': 0.01, 'take_profit': 0.015, 'commission': 0.001, 'position_size': 0.5},
+    'short': {'direction': 'short', 'stop_loss': 0.01, 'slippage': 0.0005},
+}
+
+@pytest.fixture(scope='module')
+def bars():
+    return synthetic_ohlcv(BARS, seed=11, freq='D')
+
+def batch_run(df, strategy, bars_seen, equity_points=0):
+    """Batch backtest over the first ``bars_seen`` bars, as the API runs it."""
+    frame = df.iloc[:bars_seen].copy()
+    for indicator in strategy['indicators']:
+        frame = calculate_indicators(frame, indicator)
+    signals = generate_signals(frame, strategy)
+    metrics = calculate_metrics(frame, signals, '1d', equity_points=equity_points,
+                                execution=strategy.get('execution'))
+    return signals['signal'].to_numpy(), metrics
+
+@pytest.mark.parametrize('execution', EXECUTIONS)
+@pytest.mark.parametrize('name', STRATEGIES)
+def test_streaming_matches_batch_bar_by_bar(bars, name, execution):
+    strategy = dict(STRATEGIES[name], execution=EXECUTIONS[execution])
+    signals, full = batch_run(bars, strategy, BARS, equity_points=BARS)
+    assert full['total_trades'] > 0
+
+    stream = StreamingBacktest(strategy, '1d')
+    equity = []
+    for i, (timestamp, bar) in enumerate(zip(bars.index, bars.to_dict('records'))):
+        assert stream.update(timestamp, bar) == signals[i], f"signal differs at bar {i}"
+        equity.append(round(stream.equity, 6))
+        # Metrics at every bar equal a batch run over the bars seen so far, trades included
+        assert stream.metrics() == batch_run(bars, strategy, i + 1)[1], f"metrics differ at bar {i}"
+
+    assert equity == full['equity_curve']['equity']
+    full.pop('equity_curve')
+    assert stream.metrics() == full
+
+def test_update_frame_matches_update(bars):
+    strategy = dict(STRATEGIES['rsi_or_macd'], execution=EXECUTIONS['stops'])
+    one_by_one = StreamingBacktest(strategy, '1d')
+    signals = [one_by_one.update(timestamp, bar) for timestamp, bar in zip(bars.index, bars.to_dict('records'))]
+
+    framed = StreamingBacktest(strategy, '1d')
+    half = BARS // 2
+    assert framed.update_frame(bars.iloc[:half]) + framed.update_frame(bars.iloc[half:]) == signals
+    assert framed.metrics() == one_by_one.metrics()
+    np.testing.assert_array_equal(signals, batch_run(bars, strategy, BARS)[0])